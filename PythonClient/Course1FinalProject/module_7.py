@@ -31,7 +31,7 @@ import configparser
 sys.path.append(os.path.abspath(sys.path[0] + '/..'))
 import live_plotter as lv   # Custom live plotting library
 from carla            import sensor
-from carla.client     import make_carla_client, VehicleControl
+from carla.client     import make_carla_client
 from carla.settings   import CarlaSettings
 from carla.tcp        import TCPConnectionError
 from carla.controller import utils
@@ -196,18 +196,13 @@ def send_control_command(client, throttle, steer, brake,
         hand_brake: Whether the hand brake is engaged
         reverse: Whether the sim car is in the reverse gear
     """
-    control = VehicleControl()
     # Clamp all values within their limits
     steer = np.fmax(np.fmin(steer, 1.0), -1.0)
     throttle = np.fmax(np.fmin(throttle, 1.0), 0)
     brake = np.fmax(np.fmin(brake, 1.0), 0)
 
-    control.steer = steer
-    control.throttle = throttle
-    control.brake = brake
-    control.hand_brake = hand_brake
-    control.reverse = reverse
-    client.send_control(control)
+    client.send_control(steer=steer, throttle=throttle, brake=brake,
+                        hand_brake=hand_brake, reverse=reverse)
 
 def create_controller_output_dir(output_folder):
     if not os.path.exists(output_folder):
@@ -0,0 +1,312 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""CARLA Client based on asyncio (requires Python 3.6+)."""
+
+import asyncio
+import logging
+import struct
+
+from . import control
+from . import measurements as measurements_module
+from . import sensor_parsers
+from . import tcp
+
+from .client import CarlaClient
+from .client import carla_protocol
+
+
+def _discard_result(task):
+    if not task.cancelled():
+        task.exception()
+
+
+class AsyncTCPClient(object):
+    """
+    asyncio counterpart of tcp.TCPClient. Errors occurred during networking
+    operations are raised as tcp.TCPConnectionError.
+    """
+
+    def __init__(self, host, port, timeout):
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._logprefix = '(%s:%s) ' % (self._host, self._port)
+
+    async def connect(self, connection_attempts=10, retry_delay=1.0, max_retry_delay=1.0, deadline=None):
+        """
+        Try to establish a connection to the given host:port, retrying as
+        tcp.TCPClient.connect.
+        """
+        connection_attempts = max(1, connection_attempts)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        delay = retry_delay
+        error = None
+        for attempt in range(1, connection_attempts + 1):
+            timeout = self._timeout
+            if deadline is not None:
+                timeout = max(0.001, min(timeout, start + deadline - loop.time()))
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._host, self._port),
+                    timeout)
+                logging.debug('%sconnected', self._logprefix)
+                return
+            except (OSError, asyncio.TimeoutError) as exception:
+                error = exception
+                logging.debug('%sconnection attempt %d: %s', self._logprefix, attempt, error)
+            if attempt == connection_attempts:
+                break
+            if deadline is not None and loop.time() + delay > start + deadline:
+                break
+            await asyncio.sleep(delay)
+            delay = min(2.0 * delay, max_retry_delay)
+        self._reraise_exception_as_tcp_error('failed to connect', error)
+
+    def disconnect(self):
+        """Disconnect any active connection."""
+        if self._writer is not None:
+            logging.debug('%sdisconnecting', self._logprefix)
+            self._writer.close()
+            self._reader = None
+            self._writer = None
+
+    def connected(self):
+        """Return whether there is an active connection."""
+        return self._writer is not None
+
+    async def write(self, message):
+        """Send message to the server."""
+        if self._writer is None:
+            raise tcp.TCPConnectionError(self._logprefix + 'not connected')
+        self._writer.write(struct.pack('<L', len(message)))
+        self._writer.write(message)
+        try:
+            await asyncio.wait_for(self._writer.drain(), self._timeout)
+        except (OSError, asyncio.TimeoutError) as exception:
+            self._reraise_exception_as_tcp_error('failed to write data', exception)
+
+    async def read(self):
+        """Read a message from the server."""
+        # Kept, the client may be disconnected meanwhile (reading then fails).
+        reader = self._reader
+        if reader is None:
+            raise tcp.TCPConnectionError(self._logprefix + 'not connected')
+        try:
+            header = await asyncio.wait_for(reader.readexactly(4), self._timeout)
+            length = struct.unpack('<L', header)[0]
+            return await asyncio.wait_for(reader.readexactly(length), self._timeout)
+        except asyncio.IncompleteReadError:
+            raise tcp.TCPConnectionError(self._logprefix + 'connection closed')
+        except (OSError, asyncio.TimeoutError) as exception:
+            self._reraise_exception_as_tcp_error('failed to read data', exception)
+
+    def _reraise_exception_as_tcp_error(self, message, exception):
+        raise tcp.TCPConnectionError('%s%s: %s' % (self._logprefix, message, exception))
+
+
+class AsyncCarlaClient(object):
+    """
+    The CARLA client on top of asyncio streams. Offers the same interface than
+    client.CarlaClient as coroutines. The world, stream and control channels
+    are independent, so a control can be sent while the next frame is being
+    received.
+
+        async with AsyncCarlaClient('localhost', 2000) as carla_client:
+            await carla_client.load_settings(settings)
+            await carla_client.start_episode(0)
+            async for measurements, sensor_data in carla_client.frames():
+                await carla_client.send_control(...)
+
+    If lazy_measurements is True the measurements are returned as a
+    measurements.LazyMeasurements.
+    """
+
+    def __init__(self, host, world_port, timeout=15, lazy_measurements=False):
+        self._world_client = AsyncTCPClient(host, world_port, timeout)
+        self._stream_client = AsyncTCPClient(host, world_port + 1, timeout)
+        self._control_client = AsyncTCPClient(host, world_port + 2, timeout)
+        self._timeout = timeout
+        self._current_settings = None
+        self._is_episode_requested = False
+        self._sensors = {}
+        self._lazy_measurements = lazy_measurements
+        self._control_encoder = control.ControlEncoder()
+        # The frame being received in advance by "frames".
+        self._next_frame = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.disconnect()
+
+    async def connect(self, connection_attempts=10):
+        """
+        Try to establish a connection to a CARLA server at the given host:port.
+        """
+        await self._world_client.connect(connection_attempts)
+
+    def disconnect(self):
+        """Disconnect from server."""
+        self._cancel_next_frame()
+        self._control_client.disconnect()
+        self._stream_client.disconnect()
+        self._world_client.disconnect()
+
+    def connected(self):
+        """Return whether there is an active connection."""
+        return self._world_client.connected()
+
+    async def load_settings(self, carla_settings):
+        """
+        Load new settings and request a new episode based on these settings.
+
+        Return a protobuf object holding the scene description.
+        """
+        self._current_settings = carla_settings
+        return await self._request_new_episode(carla_settings)
+
+    async def start_episode(self, player_start_index):
+        """
+        Start the new episode at the player start given by the
+        player_start_index, see CarlaClient.start_episode.
+        """
+        if self._current_settings is None:
+            raise RuntimeError('no settings loaded, cannot start episode')
+
+        # if no new settings are loaded, request new episode with previous
+        if not self._is_episode_requested:
+            await self._request_new_episode(self._current_settings)
+
+        try:
+            pb_message = carla_protocol.EpisodeStart()
+            pb_message.player_start_spot_index = player_start_index
+            await self._world_client.write(pb_message.SerializeToString())
+            # Wait for EpisodeReady.
+            data = await self._world_client.read()
+            if not data:
+                raise RuntimeError('failed to read data from server')
+            pb_message = carla_protocol.EpisodeReady()
+            pb_message.ParseFromString(data)
+            if not pb_message.ready:
+                raise RuntimeError('cannot start episode: server failed to start episode')
+            # We can start the agent clients now.
+            await asyncio.gather(
+                self._connect_agent_client(self._stream_client),
+                self._connect_agent_client(self._control_client))
+        finally:
+            self._is_episode_requested = False
+
+    async def _connect_agent_client(self, agent_client):
+        await agent_client.connect(
+            connection_attempts=1000,
+            retry_delay=CarlaClient.RECONNECT_DELAY,
+            max_retry_delay=CarlaClient.RECONNECT_MAX_DELAY,
+            deadline=self._timeout)
+
+    async def read_data(self):
+        """
+        Read the data sent from the server this frame. Return a pair
+        containing the protobuf object containing the measurements followed
+        by the raw data of the sensors.
+        """
+        data = await self._stream_client.read()
+        if not data:
+            raise RuntimeError('failed to read data from server')
+        if self._lazy_measurements:
+            pb_message = measurements_module.LazyMeasurements(data)
+        else:
+            pb_message = carla_protocol.Measurements()
+            pb_message.ParseFromString(data)
+        sensor_data = {}
+        while True:
+            data = await self._stream_client.read()
+            if not data:
+                break
+            name, value = self._parse_sensor_data(data)
+            sensor_data[name] = value
+        return pb_message, sensor_data
+
+    async def frames(self):
+        """
+        Asynchronous iterator over the frames of the current episode. The
+        next frame is already being received while the current one is
+        processed. Stopping the iteration leaves the stream in an undefined
+        state, a new episode must be started afterwards.
+        """
+        self._next_frame = asyncio.ensure_future(self.read_data())
+        try:
+            while True:
+                frame = await self._next_frame
+                self._next_frame = asyncio.ensure_future(self.read_data())
+                yield frame
+        finally:
+            self._cancel_next_frame()
+
+    async def send_control(self, *args, **kwargs):
+        """
+        Send the VehicleControl to be applied this frame.
+
+        If synchronous mode was requested, the server will pause the simulation
+        until this message is received.
+        """
+        if isinstance(args[0] if args else None, carla_protocol.Control):
+            message = self._control_encoder.encode_message(args[0])
+        else:
+            message = self._control_encoder.encode(
+                kwargs.get('steer', 0.0),
+                kwargs.get('throttle', 0.0),
+                kwargs.get('brake', 0.0),
+                kwargs.get('hand_brake', False),
+                kwargs.get('reverse', False))
+        await self._control_client.write(bytes(message))
+
+    async def _request_new_episode(self, carla_settings):
+        """
+        Internal function to request a new episode. Prepare the client for a new
+        episode by disconnecting agent clients.
+        """
+        # Disconnect agent clients.
+        self._cancel_next_frame()
+        self._stream_client.disconnect()
+        self._control_client.disconnect()
+        # Send new episode request.
+        pb_message = carla_protocol.RequestNewEpisode()
+        pb_message.ini_file = str(carla_settings)
+        await self._world_client.write(pb_message.SerializeToString())
+        # Read scene description.
+        data = await self._world_client.read()
+        if not data:
+            raise RuntimeError('failed to read data from server')
+        pb_message = carla_protocol.SceneDescription()
+        pb_message.ParseFromString(data)
+        self._sensors = sensor_parsers.make_sensor_parsers(pb_message.sensors)
+        self._is_episode_requested = True
+        return pb_message
+
+    def _cancel_next_frame(self):
+        """
+        Cancel the frame received in advance by "frames", if any. Also done on
+        disconnect and on new episodes, since an iterator its consumer broke
+        out of is only finalized later.
+        """
+        task = self._next_frame
+        self._next_frame = None
+        if task is None:
+            return
+        # A failed read of a frame nobody waits for is not an error, its
+        # exception is retrieved so that it is not logged. The cancellation
+        # may come too late to stop the read.
+        task.cancel()
+        task.add_done_callback(_discard_result)
+
+    def _parse_sensor_data(self, data):
+        return sensor_parsers.parse_sensor_data(self._sensors, data)
@@ -7,11 +7,14 @@
 """CARLA Client."""
 
 import logging
-import struct
+import time
 
 from contextlib import contextmanager
 
-from . import sensor
+from . import control
+from . import measurements as measurements_module
+from . import prefetch
+from . import sensor_parsers
 from . import tcp
 from . import util
 
@@ -20,11 +23,6 @@ try:
 except ImportError:
     raise RuntimeError('cannot import "carla_server_pb2.py", run the protobuf compiler to generate this file')
 
-try:
-    import numpy
-except ImportError:
-    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
-
 
 VehicleControl = carla_protocol.Control
 
@@ -37,15 +35,82 @@ def make_carla_client(host, world_port, timeout=15):
 
 
 class CarlaClient(object):
-    """The CARLA client. Manages communications with the CARLA server."""
-
-    def __init__(self, host, world_port, timeout=15):
-        self._world_client = tcp.TCPClient(host, world_port, timeout)
-        self._stream_client = tcp.TCPClient(host, world_port + 1, timeout)
-        self._control_client = tcp.TCPClient(host, world_port + 2, timeout)
+    """
+    The CARLA client. Manages communications with the CARLA server.
+
+    Sensor data is received in place and handed to the parsers without
+    copies. If reuse_buffers is True the receive buffers are recycled every
+    frame, the data returned by "read_data" is then only valid until the next
+    call to "read_data".
+
+    If prefetch_frames is greater than zero, frames are received and parsed in
+    a background thread into a ring of that size, see prefetch.FramePrefetcher
+    for the policies available. Meant for asynchronous mode, where the server
+    does not wait for the client.
+
+    If lazy_measurements is True, "read_data" returns the measurements as a
+    measurements.LazyMeasurements, the non-player agents are only decoded if
+    accessed.
+
+    If low_latency is True, controls and requests are sent without delay
+    (TCP_NODELAY). stream_receive_buffer_size sets the kernel receive buffer
+    of the stream socket (e.g. STREAM_RECEIVE_BUFFER_SIZE, large enough for
+    several camera images); by default the system sizes it, which on Linux
+    is usually best as a fixed size disables its autotuning.
+
+    The stream and control sockets are connected again on every episode start
+    (the server drops them when a new episode is requested), retrying with
+    an exponential backoff starting at RECONNECT_DELAY seconds for at most
+    reconnect_deadline seconds, by default the timeout. The time taken by
+    each phase of the last episode start is given by "episode_start_timings".
+    """
+
+    RECONNECT_DELAY = 0.001
+    RECONNECT_MAX_DELAY = 0.25
+
+    # A receive buffer size for the stream socket to hold several camera
+    # images, the system may cap it.
+    STREAM_RECEIVE_BUFFER_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, host, world_port, timeout=15, reuse_buffers=False,
+                 prefetch_frames=0, prefetch_policy=prefetch.DROP_OLDEST,
+                 lazy_measurements=False, low_latency=False, reconnect_deadline=None,
+                 stream_receive_buffer_size=None):
+        if reuse_buffers and prefetch_frames > 0:
+            raise ValueError('reuse_buffers cannot be used with prefetched frames')
+        self._world_client = tcp.TCPClient(host, world_port, timeout, low_latency=low_latency)
+        self._stream_client = tcp.TCPClient(
+            host,
+            world_port + 1,
+            timeout,
+            buffer_pool=tcp.BufferPool() if reuse_buffers else None,
+            low_latency=low_latency,
+            receive_buffer_size=stream_receive_buffer_size)
+        self._control_client = tcp.TCPClient(host, world_port + 2, timeout, low_latency=low_latency)
         self._current_settings = None
         self._is_episode_requested = False
         self._sensors = {}
+        self._prefetch_frames = prefetch_frames
+        self._prefetch_policy = prefetch_policy
+        self._prefetcher = None
+        self._lazy_measurements = lazy_measurements
+        self._control_encoder = control.ControlEncoder()
+        self._reconnect_deadline = timeout if reconnect_deadline is None else reconnect_deadline
+        self._episode_start_timings = {}
+
+    @property
+    def prefetcher(self):
+        """The FramePrefetcher of the current episode, None if disabled."""
+        return self._prefetcher
+
+    @property
+    def episode_start_timings(self):
+        """
+        Seconds taken by each phase of the last episode start, a dict with
+        the keys "settings_upload", "scene_description", "episode_ready" and
+        "socket_reconnect".
+        """
+        return self._episode_start_timings
 
     def connect(self, connection_attempts=10):
         """
@@ -55,6 +120,7 @@ class CarlaClient(object):
 
     def disconnect(self):
         """Disconnect from server."""
+        self._stop_prefetching()
         self._control_client.disconnect()
         self._stream_client.disconnect()
         self._world_client.disconnect()
@@ -93,6 +159,7 @@ class CarlaClient(object):
             self._request_new_episode(self._current_settings)
 
         try:
+            start = time.time()
             pb_message = carla_protocol.EpisodeStart()
             pb_message.player_start_spot_index = player_start_index
             self._world_client.write(pb_message.SerializeToString())
@@ -104,9 +171,18 @@ class CarlaClient(object):
             pb_message.ParseFromString(data)
             if not pb_message.ready:
                 raise RuntimeError('cannot start episode: server failed to start episode')
+            ready = time.time()
             # We can start the agent clients now.
-            self._stream_client.connect()
-            self._control_client.connect()
+            self._connect_agent_client(self._stream_client)
+            self._connect_agent_client(self._control_client)
+            self._episode_start_timings['episode_ready'] = ready - start
+            self._episode_start_timings['socket_reconnect'] = time.time() - ready
+            logging.debug('episode start timings: %s', self._episode_start_timings)
+            if self._prefetch_frames > 0:
+                self._prefetcher = prefetch.FramePrefetcher(
+                    self._read_frame,
+                    self._prefetch_frames,
+                    self._prefetch_policy).start()
             # Set again the status for no episode requested
         finally:
             self._is_episode_requested = False
@@ -117,12 +193,22 @@ class CarlaClient(object):
         started. Return a pair containing the protobuf object containing the
         measurements followed by the raw data of the sensors.
         """
+        if self._prefetcher is not None:
+            return self._prefetcher.get()
+        return self._read_frame()
+
+    def _read_frame(self):
+        # Give back the buffers of the previous frame.
+        self._stream_client.recycle_buffers()
         # Read measurements.
-        data = self._stream_client.read()
+        data = self._stream_client.read_view()
         if not data:
             raise RuntimeError('failed to read data from server')
-        pb_message = carla_protocol.Measurements()
-        pb_message.ParseFromString(data)
+        if self._lazy_measurements:
+            pb_message = measurements_module.LazyMeasurements(data)
+        else:
+            pb_message = carla_protocol.Measurements()
+            pb_message.ParseFromString(data)
         # Read sensor data.
         return pb_message, dict(x for x in self._read_sensor_data())
 
@@ -134,15 +220,15 @@ class CarlaClient(object):
         until this message is received.
         """
         if isinstance(args[0] if args else None, carla_protocol.Control):
-            pb_message = args[0]
+            message = self._control_encoder.encode_message(args[0])
         else:
-            pb_message = carla_protocol.Control()
-            pb_message.steer = kwargs.get('steer', 0.0)
-            pb_message.throttle = kwargs.get('throttle', 0.0)
-            pb_message.brake = kwargs.get('brake', 0.0)
-            pb_message.hand_brake = kwargs.get('hand_brake', False)
-            pb_message.reverse = kwargs.get('reverse', False)
-        self._control_client.write(pb_message.SerializeToString())
+            message = self._control_encoder.encode(
+                kwargs.get('steer', 0.0),
+                kwargs.get('throttle', 0.0),
+                kwargs.get('brake', 0.0),
+                kwargs.get('hand_brake', False),
+                kwargs.get('reverse', False))
+        self._control_client.write(message)
 
     def _request_new_episode(self, carla_settings):
         """
@@ -150,83 +236,51 @@ class CarlaClient(object):
         episode by disconnecting agent clients.
         """
         # Disconnect agent clients.
+        self._stop_prefetching()
         self._stream_client.disconnect()
         self._control_client.disconnect()
         # Send new episode request.
+        start = time.time()
         pb_message = carla_protocol.RequestNewEpisode()
         pb_message.ini_file = str(carla_settings)
         self._world_client.write(pb_message.SerializeToString())
+        uploaded = time.time()
         # Read scene description.
         data = self._world_client.read()
         if not data:
             raise RuntimeError('failed to read data from server')
         pb_message = carla_protocol.SceneDescription()
         pb_message.ParseFromString(data)
-        self._sensors = dict((sensor.id, sensor) \
-            for sensor in _make_sensor_parsers(pb_message.sensors))
+        self._sensors = sensor_parsers.make_sensor_parsers(pb_message.sensors)
         self._is_episode_requested = True
+        self._episode_start_timings = {
+            'settings_upload': uploaded - start,
+            'scene_description': time.time() - uploaded
+        }
         return pb_message
 
+    def _connect_agent_client(self, agent_client):
+        # The attempts are bounded by the deadline.
+        agent_client.connect(
+            connection_attempts=1000,
+            retry_delay=self.RECONNECT_DELAY,
+            max_retry_delay=self.RECONNECT_MAX_DELAY,
+            deadline=self._reconnect_deadline)
+
+    def _stop_prefetching(self):
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            # Unblock the receiving thread.
+            self._stream_client.disconnect()
+            self._prefetcher.join()
+            self._prefetcher = None
+
     def _read_sensor_data(self):
         while True:
-            data = self._stream_client.read()
+            data = self._stream_client.read_view()
             if not data:
-                raise StopIteration
+                return
             yield self._parse_sensor_data(data)
 
     def _parse_sensor_data(self, data):
-        sensor_id = struct.unpack('<L', data[0:4])[0]
-        parser = self._sensors[sensor_id]
-        return parser.name, parser.parse_raw_data(data[4:])
-
-
-def _make_sensor_parsers(sensors):
-    image_types = ['None', 'SceneFinal', 'Depth', 'SemanticSegmentation']
-    getimgtype = lambda id: image_types[id] if len(image_types) > id else 'Unknown'
-    getint32 = lambda data, index: struct.unpack('<L', data[index*4:index*4+4])[0]
-    getint64 = lambda data, index: struct.unpack('<Q', data[index*4:index*4+8])[0]
-    getfloat = lambda data, index: struct.unpack('<f', data[index*4:index*4+4])[0]
-
-    def parse_image(data):
-        frame_number = getint64(data, 0)
-        width = getint32(data, 2)
-        height = getint32(data, 3)
-        image_type = getimgtype(getint32(data, 4))
-        fov = getfloat(data, 5)
-        return sensor.Image(frame_number, width, height, image_type, fov, data[24:])
-
-    def parse_lidar(data):
-        frame_number = getint64(data, 0)
-        horizontal_angle = getfloat(data, 2)
-        channels = getint32(data, 3)
-        header_size = 16
-        point_count_by_channel = numpy.frombuffer(
-            data[header_size:header_size+channels*4],
-            dtype=numpy.dtype('uint32'))
-        points = numpy.frombuffer(
-            data[header_size+channels*4:],
-            dtype=numpy.dtype('f4'))
-        points = numpy.reshape(points, (int(points.shape[0]/3), 3))
-        return sensor.LidarMeasurement(
-            frame_number,
-            horizontal_angle,
-            channels,
-            point_count_by_channel,
-            sensor.PointCloud(frame_number, points))
-
-    class SensorDefinition(object):
-        def __init__(self, s):
-            self.id = s.id
-            self.name = s.name
-            self.type = s.type
-            self.parse_raw_data = lambda x: x
-
-    for s in sensors:
-        sensor_def = SensorDefinition(s)
-        if sensor_def.type == carla_protocol.Sensor.CAMERA:
-            sensor_def.parse_raw_data = parse_image
-        elif sensor_def.type == carla_protocol.Sensor.LIDAR_RAY_CAST:
-            sensor_def.parse_raw_data = parse_lidar
-        else:
-            logging.error('unknown sensor type %s', sensor_def.type)
-        yield sensor_def
+        return sensor_parsers.parse_sensor_data(self._sensors, data)
@@ -0,0 +1,61 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Fast encoding of the control messages sent to the CARLA server."""
+
+import struct
+
+
+# Wire format of carla_protocol.Control: tag byte followed by a 32-bit float
+# for steer (1), throttle (2) and brake (3); tag byte followed by a varint for
+# hand_brake (4) and reverse (5). As in proto3, fields at zero are omitted.
+_FLOAT_FIELD = struct.Struct('<Bf')
+_STEER_TAG = 0x0d
+_THROTTLE_TAG = 0x15
+_BRAKE_TAG = 0x1d
+_HAND_BRAKE = b'\x20\x01'
+_REVERSE = b'\x28\x01'
+
+_MAX_CONTROL_SIZE = 3 * _FLOAT_FIELD.size + len(_HAND_BRAKE) + len(_REVERSE)
+
+
+class ControlEncoder(object):
+    """
+    Serializes controls straight into a preallocated buffer, producing the
+    same bytes as carla_protocol.Control.SerializeToString without building a
+    message.
+
+    "encode" returns a memoryview to the internal buffer, only valid until the
+    next call.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray(_MAX_CONTROL_SIZE)
+        self._view = memoryview(self._buffer)
+
+    def encode(self, steer=0.0, throttle=0.0, brake=0.0, hand_brake=False, reverse=False):
+        buf = self._buffer
+        size = 0
+        if steer:
+            _FLOAT_FIELD.pack_into(buf, size, _STEER_TAG, steer)
+            size += _FLOAT_FIELD.size
+        if throttle:
+            _FLOAT_FIELD.pack_into(buf, size, _THROTTLE_TAG, throttle)
+            size += _FLOAT_FIELD.size
+        if brake:
+            _FLOAT_FIELD.pack_into(buf, size, _BRAKE_TAG, brake)
+            size += _FLOAT_FIELD.size
+        if hand_brake:
+            buf[size:size + 2] = _HAND_BRAKE
+            size += 2
+        if reverse:
+            buf[size:size + 2] = _REVERSE
+            size += 2
+        return self._view[:size]
+
+    def encode_message(self, control):
+        """Encode the fields of a carla_protocol.Control."""
+        return self.encode(control.steer, control.throttle, control.brake, control.hand_brake, control.reverse)
@@ -0,0 +1,396 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Recorded frames stored as fixed-stride arrays, read back memory-mapped.
+
+A dataset is a folder with:
+
+    dataset.json            the episodes, sensors and columns of the dataset
+    index.bin               int32 (N, 2), episode and frame number of each row
+    <sensor>.bin            uint8 (N, height, width, 4), BGRA images
+    <sensor>.present.bin    bool (N,), whether the row has an image
+    <column>.column.bin     float64 (N,), a measurement or control
+
+Row i of every file belongs to the same frame, so any frame of any sensor
+is at a fixed offset and reading it needs no decoding.
+"""
+
+import csv
+import glob
+import json
+import os
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
+
+from . import sensor
+from . import sensor_recorder
+
+
+_METADATA = 'dataset.json'
+_INDEX = 'index.bin'
+
+
+def _sensor_filename(path, name):
+    return os.path.join(path, name + '.bin')
+
+
+def _present_filename(path, name):
+    return os.path.join(path, name + '.present.bin')
+
+
+def _column_filename(path, name):
+    return os.path.join(path, name + '.column.bin')
+
+
+def _describe(image):
+    if not isinstance(image, sensor.Image):
+        raise ValueError('DatasetWriter: only images can be stored')
+    return {'width': image.width, 'height': image.height, 'type': image.type, 'fov': image.fov}
+
+
+class DatasetWriter(object):
+    """
+    Writes a dataset to path, frame by frame.
+
+        writer = DatasetWriter('dataset')
+        writer.add_frame('episode', frame, sensor_data, {'steer': ...})
+        writer.close()
+
+    The sensors are given as a dict of descriptions by name, dicts with the
+    keys "width", "height", "type" and "fov", and the columns as a list of
+    names. If not given they are the ones of the first frame added.
+    """
+
+    def __init__(self, path, sensors=None, columns=None):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._path = path
+        self._episodes = []
+        self._episode_ids = {}
+        self._sensors = None
+        self._columns = None
+        self._files = {}
+        self._frames = 0
+        self._files[_INDEX] = open(os.path.join(path, _INDEX), 'wb')
+        if sensors is not None and columns is not None:
+            self._open(sensors, columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add_frame(self, episode, frame_number, sensor_data, values=None):
+        """
+        Append a frame of episode. sensor_data is a dict of sensor.Image by
+        sensor name, values a dict of numbers by column name; missing images
+        are stored as zeros and missing values as NaN.
+        """
+        values = {} if values is None else values
+        if self._sensors is None:
+            self._open(
+                dict((name, _describe(image)) for name, image in sensor_data.items()),
+                sorted(values.keys()))
+        episode_id = self._episode_ids.get(episode, None)
+        if episode_id is None:
+            episode_id = len(self._episodes)
+            self._episodes.append(episode)
+            self._episode_ids[episode] = episode_id
+        self._files[_INDEX].write(numpy.array([episode_id, frame_number], dtype=numpy.int32).tobytes())
+        for name, description in self._sensors.items():
+            image = sensor_data.get(name, None)
+            size = 4 * description['width'] * description['height']
+            if image is None:
+                self._files[name].write(b'\x00' * size)
+            elif (image.width, image.height) != (description['width'], description['height']):
+                raise ValueError('DatasetWriter: image size of sensor %r changed' % name)
+            else:
+                self._files[name].write(image.raw_data)
+            self._files[name + '.present'].write(b'\x00' if image is None else b'\x01')
+        row = numpy.array([values.get(name, numpy.nan) for name in self._columns], dtype=numpy.float64)
+        for name, value in zip(self._columns, row):
+            self._files[name + '.column'].write(value.tobytes())
+        self._frames += 1
+
+    def close(self):
+        """Close the files and write the metadata."""
+        for fd in self._files.values():
+            fd.close()
+        self._files = {}
+        metadata = {
+            'frames': self._frames,
+            'episodes': self._episodes,
+            'sensors': self._sensors if self._sensors is not None else {},
+            'columns': self._columns if self._columns is not None else []
+        }
+        with open(os.path.join(self._path, _METADATA), 'w') as fd:
+            json.dump(metadata, fd, indent=2, sort_keys=True)
+
+    def _open(self, sensors, columns):
+        self._sensors = dict(sensors)
+        for name in sorted(self._sensors):
+            self._files[name] = open(_sensor_filename(self._path, name), 'wb')
+            self._files[name + '.present'] = open(_present_filename(self._path, name), 'wb')
+        self._columns = list(columns)
+        for name in self._columns:
+            self._files[name + '.column'] = open(_column_filename(self._path, name), 'wb')
+
+
+class Dataset(object):
+    """
+    Read-only access to a dataset written by DatasetWriter. Every array
+    returned is a numpy.memmap (or a view of one), the data is read from
+    disk on access.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        with open(os.path.join(path, _METADATA)) as fd:
+            metadata = json.load(fd)
+        self._frames = metadata['frames']
+        self._episodes = metadata['episodes']
+        self._sensors = metadata['sensors']
+        self._columns = metadata['columns']
+        # Memory maps by file name, made on first access.
+        self._maps = {}
+        self._index = self._map(os.path.join(path, _INDEX), numpy.int32, (2,))
+        self._rows = None
+
+    def __len__(self):
+        return self._frames
+
+    @property
+    def episodes(self):
+        """Names of the episodes, in the order they were added."""
+        return self._episodes
+
+    @property
+    def sensors(self):
+        """Names of the sensors."""
+        return sorted(self._sensors.keys())
+
+    @property
+    def columns(self):
+        """Names of the columns."""
+        return self._columns
+
+    @property
+    def index(self):
+        """int32 (N, 2) array of the episode (as index in "episodes") and frame number of each row."""
+        return self._index
+
+    def row(self, episode, frame_number):
+        """Row of the frame of an episode, given by name."""
+        if self._rows is None:
+            self._rows = dict(
+                ((self._episodes[episode_id], number), row)
+                for row, (episode_id, number) in enumerate(self._index.tolist()))
+        return self._rows[(episode, frame_number)]
+
+    def episode_rows(self, episode):
+        """Array of the rows of an episode, given by name."""
+        return numpy.flatnonzero(self._index[:, 0] == self._episodes.index(episode))
+
+    def images(self, name):
+        """uint8 (N, height, width, 4) array of the BGRA images of a sensor."""
+        description = self._sensors[name]
+        return self._map(
+            _sensor_filename(self._path, name),
+            numpy.uint8,
+            (description['height'], description['width'], 4))
+
+    def present(self, name):
+        """bool (N,) array, whether each row has an image of a sensor."""
+        return self._map(_present_filename(self._path, name), numpy.bool_)
+
+    def column(self, name):
+        """float64 (N,) array of a column."""
+        if name not in self._columns:
+            raise KeyError(name)
+        return self._map(_column_filename(self._path, name), numpy.float64)
+
+    def image(self, name, row):
+        """The sensor.Image of a sensor at a row, its raw data is not copied."""
+        description = self._sensors[name]
+        return sensor.Image(
+            int(self._index[row, 1]),
+            description['width'],
+            description['height'],
+            description['type'],
+            description['fov'],
+            self.images(name)[row].reshape(-1))
+
+    def batches(self, batch_size, sensors=None, columns=None, shuffle=False, seed=None):
+        """
+        Generate batches of rows, as dicts of arrays by sensor and column
+        name plus the "index" of the rows. By default all the sensors and
+        columns are included. Batches in order are views of the memory-mapped
+        arrays, shuffled ones are copies.
+        """
+        sensors = self.sensors if sensors is None else sensors
+        columns = self.columns if columns is None else columns
+        arrays = [('index', self._index)]
+        arrays += [(name, self.images(name)) for name in sensors]
+        arrays += [(name, self.column(name)) for name in columns]
+        if shuffle:
+            order = numpy.random.RandomState(seed).permutation(self._frames)
+        for start in range(0, self._frames, batch_size):
+            if shuffle:
+                # Sorted rows make the reads sequential.
+                rows = numpy.sort(order[start:start + batch_size])
+                yield dict((name, numpy.take(array, rows, axis=0)) for name, array in arrays)
+            else:
+                yield dict((name, array[start:start + batch_size]) for name, array in arrays)
+
+    def _map(self, filename, dtype, shape=()):
+        array = self._maps.get(filename, None)
+        if array is None:
+            if self._frames == 0:
+                array = numpy.zeros((0,) + shape, dtype=dtype)
+            else:
+                array = numpy.memmap(filename, dtype=dtype, mode='r', shape=(self._frames,) + shape)
+            self._maps[filename] = array
+        return array
+
+
+# ==============================================================================
+# -- Conversion ----------------------------------------------------------------
+# ==============================================================================
+
+
+def _load_image(filename, image_type):
+    from PIL import Image as PImage
+    rgb = numpy.asarray(PImage.open(filename).convert('RGB'))
+    bgra = numpy.empty(rgb.shape[:2] + (4,), dtype=numpy.uint8)
+    bgra[:, :, :3] = rgb[:, :, ::-1]
+    bgra[:, :, 3] = 255
+    return sensor.Image(0, rgb.shape[1], rgb.shape[0], image_type, 90.0, bgra.tobytes())
+
+
+class _EpisodeImages(object):
+    """
+    The images of an episode folder of a benchmark recording, one file per
+    image or raw containers of sensor_recorder, loaded frame by frame.
+    """
+
+    def __init__(self, folder, sensor_types):
+        self._sensor_types = sensor_types
+        self._containers = {}
+        self._files = {}
+        for filename in sorted(glob.glob(os.path.join(folder, '*.raw'))):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            self._containers[name] = filename
+        for sensor_folder in sorted(glob.glob(os.path.join(folder, '*', ''))):
+            name = os.path.basename(os.path.dirname(sensor_folder))
+            files = {}
+            for filename in os.listdir(sensor_folder):
+                if filename.startswith('image_') and not filename.endswith('.ply'):
+                    number = int(filename[len('image_'):].split('.')[0])
+                    files[number] = os.path.join(sensor_folder, filename)
+            self._files[name] = files
+        self._readers = dict(
+            (name, enumerate(sensor_recorder.read_raw_images(filename)))
+            for name, filename in self._containers.items())
+        self._next = {}
+
+    def first_images(self):
+        """The first image of each sensor."""
+        images = {}
+        for name, filename in self._containers.items():
+            for image in sensor_recorder.read_raw_images(filename):
+                images[name] = image
+                break
+        for name, files in self._files.items():
+            if files:
+                images[name] = _load_image(files[min(files)], self._sensor_types.get(name, 'SceneFinal'))
+        return images
+
+    def get(self, frame_number):
+        """
+        Dict of sensor.Image by sensor name of a frame, frames must be asked
+        in increasing order.
+        """
+        images = {}
+        for name, reader in self._readers.items():
+            # Frames of a container are numbered by position.
+            number, image = self._next.get(name, (-1, None))
+            while number < frame_number:
+                number, image = next(reader, (float('inf'), None))
+            self._next[name] = (number, image)
+            if number == frame_number:
+                images[name] = image
+        for name, files in self._files.items():
+            filename = files.get(frame_number, None)
+            if filename is not None:
+                images[name] = _load_image(filename, self._sensor_types.get(name, 'SceneFinal'))
+        return images
+
+
+def _episode_name(values):
+    # Same name than DrivingBenchmark._run_episode gives to the first
+    # repetition.
+    return '%d_%d_%d.%d' % (values['weather'], values['exp_id'], values['start_point'], values['end_point'])
+
+
+def _episode_folder(results_path, values):
+    """The images folder of the episode of a row of measurements.csv."""
+    folder = os.path.join(results_path, '_images', 'episode_' + _episode_name(values))
+    rep = int(values['rep'])
+    if rep == 0:
+        return folder
+    if not os.path.isdir(folder + '_%d' % rep) and os.path.isdir(folder):
+        # Older recordings saved every repetition to the same folder.
+        raise ValueError(
+            'convert_benchmark_results: the images of repetition %d of episode %s were not saved apart'
+            % (rep, _episode_name(values)))
+    return folder + '_%d' % rep
+
+
+def convert_benchmark_results(results_path, dataset_path, sensor_types=None):
+    """
+    Convert the recording of a driving benchmark, the folder created under
+    "_benchmarks_results", to a dataset at dataset_path. The columns are the
+    ones of measurements.csv, images are taken from the "_images" folder
+    (image files or raw containers). The type of the images of each sensor
+    can be given in the sensor_types dict, "SceneFinal" by default.
+
+    Return the number of frames converted.
+    """
+    sensor_types = {} if sensor_types is None else sensor_types
+    with open(os.path.join(results_path, 'measurements.csv')) as fd:
+        rows = [dict((key, float(value)) for key, value in row.items()) for row in csv.DictReader(fd)]
+
+    def episode_images(values):
+        return _EpisodeImages(_episode_folder(results_path, values), sensor_types)
+
+    def episode_name(values):
+        return '%s_%d' % (_episode_name(values), values['rep'])
+
+    # The sensors of the dataset are the ones found in any episode.
+    sensors = {}
+    episodes = dict((episode_name(values), values) for values in rows)
+    for episode in sorted(episodes):
+        for name, image in episode_images(episodes[episode]).first_images().items():
+            sensors.setdefault(name, image)
+    sensors = dict((name, _describe(image)) for name, image in sensors.items())
+    columns = sorted(rows[0].keys()) if rows else []
+
+    with DatasetWriter(dataset_path, sensors, columns) as writer:
+        episode_key = None
+        for values in rows:
+            key = tuple(values[name] for name in ('exp_id', 'rep', 'weather', 'start_point', 'end_point'))
+            if key != episode_key:
+                episode_key = key
+                frame_number = 0
+                images = episode_images(values)
+            writer.add_frame(episode_name(values), frame_number, images.get(frame_number), values)
+            frame_number += 1
+    return len(rows)
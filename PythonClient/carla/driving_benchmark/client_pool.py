@@ -0,0 +1,245 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+
+import collections
+import logging
+import multiprocessing
+import pickle
+import socket
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from carla.client import CarlaClient
+from carla.client import VehicleControl
+from carla.client import carla_protocol
+from carla.settings import CarlaSettings
+from carla.tcp import TCPConnectionError
+
+
+def _pack_episode(episode):
+    """
+    The protobuf classes cannot be pickled, send the measurements and
+    controls of an episode serialized.
+    """
+    (initial_distance, time_out, result, reward_vec, control_vec,
+     final_time, remaining_distance) = episode
+    return (initial_distance, time_out, result,
+            [x.SerializeToString() for x in reward_vec],
+            [x.SerializeToString() for x in control_vec],
+            final_time, remaining_distance)
+
+
+def _unpack_episode(data):
+    (initial_distance, time_out, result, reward_vec, control_vec,
+     final_time, remaining_distance) = data
+
+    def parse(message_type, message):
+        pb_message = message_type()
+        pb_message.ParseFromString(message)
+        return pb_message
+
+    return (initial_distance, time_out, result,
+            [parse(carla_protocol.Measurements.PlayerMeasurements, x) for x in reward_vec],
+            [parse(VehicleControl, x) for x in control_vec],
+            final_time, remaining_distance)
+
+
+# Messages of the workers, (worker id, kind, work item index, payload).
+_DONE = 'done'
+_SERVER_FAILED = 'server failed'
+_FAILED = 'failed'
+
+# Seconds between checks of the workers still being alive.
+_POLL_INTERVAL = 1.0
+
+
+class RemoteTraceback(Exception):
+    """The traceback of an exception raised in a worker process."""
+
+    def __init__(self, text):
+        super(RemoteTraceback, self).__init__(text)
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+def _picklable(exception):
+    try:
+        pickle.loads(pickle.dumps(exception))
+        return exception
+    except Exception:
+        return None
+
+
+def _run_worker(worker_id, host, port, timeout, connection_attempts, benchmark, experiment_suite, agent,
+                work_queue, result_queue):
+    """
+    Worker process: run on the server at host:port the episodes taken from
+    its work_queue until a None is found, and put their results in
+    result_queue.
+
+    Connection errors are reported as a failure of the server, any other
+    exception (e.g. a bug of the agent) with its traceback to be raised again
+    by the pool.
+    """
+    index = None
+    client = CarlaClient(host, port, timeout)
+    try:
+        client.connect(connection_attempts)
+        # Hack to fix for the issue 310, we force a reset, so it does not get
+        #  the positions on first server reset.
+        client.load_settings(CarlaSettings())
+        client.start_episode(0)
+
+        experiments = experiment_suite.get_experiments()
+        loaded_experiment = None
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            index, experiment_index, pose, rep = item
+            experiment = experiments[experiment_index]
+            if experiment_index != loaded_experiment:
+                positions = client.load_settings(
+                    experiment.conditions).player_start_spots
+                loaded_experiment = experiment_index
+            episode = benchmark._run_episode(
+                experiment_suite, agent, client, experiment, positions, pose, rep)
+            result_queue.put((worker_id, _DONE, index, _pack_episode(episode)))
+            index = None
+    except (TCPConnectionError, socket.error) as exception:
+        result_queue.put((worker_id, _SERVER_FAILED, index, '%s:%s: %s' % (host, port, exception)))
+    except Exception as exception:
+        result_queue.put((worker_id, _FAILED, index, (_picklable(exception), traceback.format_exc())))
+    finally:
+        client.disconnect()
+
+
+def _reraise(payload):
+    """Raise again the exception of a worker, caused by its traceback."""
+    exception, text = payload
+    cause = RemoteTraceback(text)
+    if exception is None:
+        # The exception could not be sent back.
+        exception = RuntimeError(text.strip().splitlines()[-1])
+    exception.__cause__ = cause
+    raise exception
+
+
+class CarlaClientPool(object):
+    """
+    A pool of CARLA servers to run benchmark episodes in parallel, each server
+    is driven by its own worker process.
+
+    Servers are given as a list of (host, world_port) pairs.
+    """
+
+    def __init__(self, servers, timeout=15, connection_attempts=10):
+        if not servers:
+            raise ValueError('CarlaClientPool: at least one server is needed')
+        self._servers = list(servers)
+        self._timeout = timeout
+        self._connection_attempts = connection_attempts
+
+    @property
+    def servers(self):
+        return self._servers
+
+    def run_episodes(self, benchmark, experiment_suite, agent, work_items):
+        """
+        Run the (experiment index, pose, repetition) work items with
+        benchmark._run_episode on the servers of the pool.
+
+        Generate (work item index, episode results) pairs in the order of
+        work_items, as soon as all the previous items are done. The episode
+        of a server that fails, or whose worker dies, is run again by the
+        remaining ones; if every server fails a TCPConnectionError is raised.
+        Any other exception of a worker is raised again here, with the
+        traceback of the worker as its cause.
+        """
+        work_queues = [multiprocessing.Queue() for _ in self._servers]
+        result_queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_run_worker,
+                args=(worker_id, host, port, self._timeout, self._connection_attempts, benchmark,
+                      experiment_suite, agent, work_queues[worker_id], result_queue))
+            for worker_id, (host, port) in enumerate(self._servers)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        # Each worker is given one item at a time, so the item of a worker
+        # that dies is known.
+        pending = collections.deque(range(len(work_items)))
+        in_flight = {}
+        alive = set(range(len(workers)))
+
+        def dispatch():
+            for worker_id in sorted(alive):
+                if pending and worker_id not in in_flight:
+                    index = pending.popleft()
+                    in_flight[worker_id] = index
+                    experiment_index, pose, rep = work_items[index]
+                    work_queues[worker_id].put((index, experiment_index, pose, rep))
+
+        def fail(worker_id, error):
+            logging.error(error)
+            alive.discard(worker_id)
+            index = in_flight.pop(worker_id, None)
+            if index is not None:
+                pending.appendleft(index)
+            if not alive:
+                raise TCPConnectionError('all the servers of the pool failed: ' + error)
+            dispatch()
+
+        try:
+            dispatch()
+            finished = {}
+            next_index = 0
+            while next_index < len(work_items):
+                try:
+                    message = result_queue.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    message = None
+                if message is not None:
+                    worker_id, kind, index, payload = message
+                    if kind == _FAILED:
+                        _reraise(payload)
+                    elif kind == _SERVER_FAILED:
+                        fail(worker_id, payload)
+                    else:
+                        del in_flight[worker_id]
+                        dispatch()
+                        finished[index] = _unpack_episode(payload)
+                        while next_index in finished:
+                            yield next_index, finished.pop(next_index)
+                            next_index += 1
+                # Workers report their failures and then exit normally, the
+                # ones killed (e.g. out of memory) cannot.
+                for worker_id in sorted(alive):
+                    worker = workers[worker_id]
+                    if not worker.is_alive() and worker.exitcode != 0:
+                        host, port = self._servers[worker_id]
+                        fail(worker_id, '%s:%s: worker died with exit code %s' % (host, port, worker.exitcode))
+        finally:
+            # Let the idle workers finish, the ones still busy are killed.
+            for worker_id, worker in enumerate(workers):
+                if worker_id in in_flight:
+                    worker.terminate()
+                else:
+                    work_queues[worker_id].put(None)
+            for worker in workers:
+                worker.join(self._timeout)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
@@ -10,6 +10,7 @@ import logging
 import math
 import time
 
+from carla import sensor_recorder
 from carla.client import VehicleControl
 from carla.client import make_carla_client
 from carla.driving_benchmark.metrics import Metrics
@@ -18,6 +19,7 @@ from carla.settings import CarlaSettings
 from carla.tcp import TCPConnectionError
 
 from . import results_printer
+from .client_pool import CarlaClientPool
 from .recording import Recording
 
 
@@ -41,7 +43,8 @@ class DrivingBenchmark(object):
             name_to_save='Test',
             continue_experiment=False,
             save_images=False,
-            distance_for_success=2.0
+            distance_for_success=2.0,
+            image_format=sensor_recorder.PNG
     ):
 
         self.__metaclass__ = abc.ABCMeta
@@ -54,7 +57,8 @@ class DrivingBenchmark(object):
         # The object used to record the benchmark and to able to continue after
         self._recording = Recording(name_to_save=name_to_save,
                                     continue_experiment=continue_experiment,
-                                    save_images=save_images
+                                    save_images=save_images,
+                                    image_format=image_format
                                     )
 
         # We have a default planner instantiated that produces high level commands
@@ -83,66 +87,54 @@ class DrivingBenchmark(object):
         metrics_object = Metrics(experiment_suite.metrics_parameters,
                                  experiment_suite.dynamic_tasks)
 
-        # Function return the current pose and task for this benchmark.
-        start_pose, start_experiment = self._recording.get_pose_and_experiment(
-            experiment_suite.get_number_of_poses_task())
-
         logging.info('START')
 
-        for experiment in experiment_suite.get_experiments()[int(start_experiment):]:
+        current_experiment = None
+        for experiment, pose, rep in self._get_work_items(experiment_suite):
 
-            positions = client.load_settings(
-                experiment.conditions).player_start_spots
+            if experiment is not current_experiment:
+                current_experiment = experiment
+                positions = client.load_settings(
+                    experiment.conditions).player_start_spots
+                self._recording.log_start(experiment.task)
 
-            self._recording.log_start(experiment.task)
+            episode = self._run_episode(experiment_suite, agent, client,
+                                        experiment, positions, pose, rep)
+            self._write_episode(experiment, pose, rep, episode)
 
-            for pose in experiment.poses[start_pose:]:
-                for rep in range(experiment.repetitions):
+        self._recording.log_end()
 
-                    start_index = pose[0]
-                    end_index = pose[1]
-
-                    client.start_episode(start_index)
-                    # Print information on
-                    logging.info('======== !!!! ==========')
-                    logging.info(' Start Position %d End Position %d ',
-                                 start_index, end_index)
-
-                    self._recording.log_poses(start_index, end_index,
-                                              experiment.Conditions.WeatherId)
-
-                    # Calculate the initial distance for this episode
-                    initial_distance = \
-                        sldist(
-                            [positions[start_index].location.x, positions[start_index].location.y],
-                            [positions[end_index].location.x, positions[end_index].location.y])
-
-                    time_out = experiment_suite.calculate_time_out(
-                        self._get_shortest_path(positions[start_index], positions[end_index]))
-
-                    # running the agent
-                    (result, reward_vec, control_vec, final_time, remaining_distance) = \
-                        self._run_navigation_episode(
-                            agent, client, time_out, positions[end_index],
-                            str(experiment.Conditions.WeatherId) + '_'
-                            + str(experiment.task) + '_' + str(start_index)
-                            + '.' + str(end_index))
-
-                    # Write the general status of the just ran episode
-                    self._recording.write_summary_results(
-                        experiment, pose, rep, initial_distance,
-                        remaining_distance, final_time, time_out, result)
-
-                    # Write the details of this episode.
-                    self._recording.write_measurements_results(experiment, rep, pose, reward_vec,
-                                                               control_vec)
-                    if result > 0:
-                        logging.info('+++++ Target achieved in %f seconds! +++++',
-                                     final_time)
-                    else:
-                        logging.info('----- Timeout! -----')
+        return metrics_object.compute(self._recording.path)
 
-            start_pose = 0
+    def benchmark_agent_in_parallel(self, experiment_suite, agent, client_pool):
+        """
+        Same as benchmark_agent, but the episodes are distributed among the
+        servers of a CarlaClientPool. The results are written in the same
+        order than benchmark_agent would.
+
+        The experiment suite and the agent are sent to the worker processes,
+        so they must be picklable.
+        """
+
+        metrics_object = Metrics(experiment_suite.metrics_parameters,
+                                 experiment_suite.dynamic_tasks)
+
+        logging.info('START')
+
+        work_items = list(self._get_work_items(experiment_suite))
+        experiments = experiment_suite.get_experiments()
+
+        current_experiment = None
+        for index, episode in client_pool.run_episodes(
+                self, experiment_suite, agent,
+                [(experiments.index(experiment), pose, rep)
+                 for experiment, pose, rep in work_items]):
+
+            experiment, pose, rep = work_items[index]
+            if experiment is not current_experiment:
+                current_experiment = experiment
+                self._recording.log_start(experiment.task)
+            self._write_episode(experiment, pose, rep, episode)
 
         self._recording.log_end()
 
@@ -154,6 +146,90 @@ class DrivingBenchmark(object):
         """
         return self._recording.path
 
+    def _get_work_items(self, experiment_suite):
+        """
+        Generate the (experiment, pose, repetition) of every episode left to
+        run, continuing from where the recording stopped.
+        """
+
+        # Function return the current pose and task for this benchmark.
+        start_pose, start_experiment = self._recording.get_pose_and_experiment(
+            experiment_suite.get_number_of_poses_task())
+
+        for experiment in experiment_suite.get_experiments()[int(start_experiment):]:
+            for pose in experiment.poses[start_pose:]:
+                for rep in range(experiment.repetitions):
+                    yield experiment, pose, rep
+            start_pose = 0
+
+    def _run_episode(self, experiment_suite, agent, client, experiment, positions, pose, rep=0):
+        """
+        Start and run the episode of a pose, the settings of the experiment
+        must be already loaded in the client. The images of repetitions
+        other than the first are saved apart, their episode name ends with
+        "_<rep>".
+
+        Returns:
+            The results to be written by _write_episode.
+        """
+
+        start_index = pose[0]
+        end_index = pose[1]
+
+        client.start_episode(start_index)
+        # Print information on
+        logging.info('======== !!!! ==========')
+        logging.info(' Start Position %d End Position %d ',
+                     start_index, end_index)
+
+        # Calculate the initial distance for this episode
+        initial_distance = \
+            sldist(
+                [positions[start_index].location.x, positions[start_index].location.y],
+                [positions[end_index].location.x, positions[end_index].location.y])
+
+        time_out = experiment_suite.calculate_time_out(
+            self._get_shortest_path(positions[start_index], positions[end_index]))
+
+        episode_name = str(experiment.Conditions.WeatherId) + '_' \
+            + str(experiment.task) + '_' + str(start_index) \
+            + '.' + str(end_index)
+        if rep > 0:
+            episode_name += '_' + str(rep)
+
+        # running the agent
+        (result, reward_vec, control_vec, final_time, remaining_distance) = \
+            self._run_navigation_episode(
+                agent, client, time_out, positions[end_index], episode_name)
+
+        return (initial_distance, time_out, result, reward_vec, control_vec,
+                final_time, remaining_distance)
+
+    def _write_episode(self, experiment, pose, rep, episode):
+        """
+        Record the results of an episode returned by _run_episode.
+        """
+
+        (initial_distance, time_out, result, reward_vec, control_vec,
+         final_time, remaining_distance) = episode
+
+        self._recording.log_poses(pose[0], pose[1],
+                                  experiment.Conditions.WeatherId)
+
+        # Write the general status of the just ran episode
+        self._recording.write_summary_results(
+            experiment, pose, rep, initial_distance,
+            remaining_distance, final_time, time_out, result)
+
+        # Write the details of this episode.
+        self._recording.write_measurements_results(experiment, rep, pose, reward_vec,
+                                                   control_vec)
+        if result > 0:
+            logging.info('+++++ Target achieved in %f seconds! +++++',
+                         final_time)
+        else:
+            logging.info('----- Timeout! -----')
+
     def _get_directions(self, current_point, end_point):
         """
         Class that should return the directions to reach a certain goal
@@ -257,23 +333,63 @@ class DrivingBenchmark(object):
             measurement_vec.append(measurements.player_measurements)
             control_vec.append(control)
 
+        # Wait for the images of the episode to be on disk.
+        self._recording.flush_images()
+
         if success:
             return 1, measurement_vec, control_vec, float(
                 current_timestamp - initial_timestamp) / 1000.0, distance
         return 0, measurement_vec, control_vec, time_out, distance
 
 
+def _print_benchmark_summary(benchmark_summary, experiment_suite, path):
+    print("")
+    print("")
+    print("----- Printing results for training weathers (Seen in Training) -----")
+    print("")
+    print("")
+    results_printer.print_summary(benchmark_summary, experiment_suite.train_weathers,
+                                  path)
+
+    print("")
+    print("")
+    print("----- Printing results for test weathers (Unseen in Training) -----")
+    print("")
+    print("")
+
+    results_printer.print_summary(benchmark_summary, experiment_suite.test_weathers,
+                                  path)
+
+
 def run_driving_benchmark(agent,
                           experiment_suite,
                           city_name='Town01',
                           log_name='Test',
                           continue_experiment=False,
                           host='127.0.0.1',
-                          port=2000
+                          port=2000,
+                          servers=None
                           ):
+    """
+    Run the experiment suite with the agent on the server at host:port. If a
+    list of (host, port) servers is given instead, the episodes are run in
+    parallel on all of them.
+    """
     while True:
         try:
 
+            if servers:
+                benchmark = DrivingBenchmark(city_name=city_name,
+                                             name_to_save=log_name + '_'
+                                                          + type(experiment_suite).__name__
+                                                          + '_' + city_name,
+                                             continue_experiment=continue_experiment)
+                benchmark_summary = benchmark.benchmark_agent_in_parallel(
+                    experiment_suite, agent, CarlaClientPool(servers))
+                _print_benchmark_summary(benchmark_summary, experiment_suite,
+                                         benchmark.get_path())
+                break
+
             with make_carla_client(host, port) as client:
                 # Hack to fix for the issue 310, we force a reset, so it does not get
                 #  the positions on first server reset.
@@ -293,22 +409,8 @@ def run_driving_benchmark(agent,
 
                 benchmark_summary = benchmark.benchmark_agent(experiment_suite, agent, client)
 
-                print("")
-                print("")
-                print("----- Printing results for training weathers (Seen in Training) -----")
-                print("")
-                print("")
-                results_printer.print_summary(benchmark_summary, experiment_suite.train_weathers,
-                                              benchmark.get_path())
-
-                print("")
-                print("")
-                print("----- Printing results for test weathers (Unseen in Training) -----")
-                print("")
-                print("")
-
-                results_printer.print_summary(benchmark_summary, experiment_suite.test_weathers,
-                                              benchmark.get_path())
+                _print_benchmark_summary(benchmark_summary, experiment_suite,
+                                         benchmark.get_path())
 
                 break
 
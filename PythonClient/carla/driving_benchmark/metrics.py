@@ -218,12 +218,12 @@ class Metrics(object):
 
         """
 
-        with open(os.path.join(path, 'summary.csv'), "rU") as f:
+        with open(os.path.join(path, 'summary.csv'), "r") as f:
             header = f.readline()
             header = header.split(',')
             header[-1] = header[-1][:-1]
 
-        with open(os.path.join(path, 'measurements.csv'), "rU") as f:
+        with open(os.path.join(path, 'measurements.csv'), "r") as f:
 
             header_metrics = f.readline()
             header_metrics = header_metrics.split(',')
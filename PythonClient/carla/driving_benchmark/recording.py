@@ -1,7 +1,10 @@
 import csv
 import datetime
+import logging
 import os
 
+from carla import sensor_recorder
+
 
 class Recording(object):
 
@@ -9,6 +12,7 @@ class Recording(object):
                  , name_to_save
                  , continue_experiment
                  , save_images
+                 , image_format=sensor_recorder.PNG
                  ):
 
         self._dict_summary = {'exp_id': -1,
@@ -59,10 +63,25 @@ class Recording(object):
         self._internal_log_name = os.path.join(self._path, 'log_' + now.strftime("%Y%m%d%H%M"))
         open(self._internal_log_name, 'w').close()
 
-        # store the save images flag, and already store the format for image saving
+        # store the save images flag, and already store the format for image saving.
+        # The images are saved in background by a SensorRecorder, created on
+        # first use.
         self._save_images = save_images
-        self._image_filename_format = os.path.join(
-            self._path, '_images/episode_{:s}/{:s}/image_{:0>5d}.jpg')
+        self._image_format = image_format
+        self._recorder = None
+        if image_format == sensor_recorder.RAW:
+            # All the frames of a sensor go to a single container.
+            self._image_filename_format = os.path.join(
+                self._path, '_images/episode_{:s}/{:s}.raw')
+        else:
+            self._image_filename_format = os.path.join(
+                self._path, '_images/episode_{:s}/{:s}/image_{:0>5d}')
+
+    def __getstate__(self):
+        # The recorder threads cannot be sent to other processes.
+        state = self.__dict__.copy()
+        state['_recorder'] = None
+        return state
 
     @property
     def path(self):
@@ -202,14 +221,33 @@ class Recording(object):
             line_on_file = 1
         return new_path, line_on_file
 
+    @property
+    def recorder(self):
+        """The SensorRecorder saving the images, None if not used yet."""
+        return self._recorder
+
     def save_images(self, sensor_data, episode_name, frame):
         """
-        Save a image during the experiment
+        Queue the images of a frame to be saved during the experiment,
+        see flush_images.
         """
         if self._save_images:
+            if self._recorder is None:
+                self._recorder = sensor_recorder.SensorRecorder(self._image_format)
             for name, image in sensor_data.items():
-                image.save_to_disk(self._image_filename_format.format(
-                    episode_name, name, frame))
+                self._recorder.save(self._image_filename_format.format(
+                    episode_name, name, frame), image)
+
+    def flush_images(self):
+        """
+        Wait until the images queued are saved, to be called at the end of
+        each episode.
+        """
+        if self._recorder is not None:
+            self._recorder.flush()
+            logging.debug('images saved: %d, dropped: %d, waits for the disk: %d (%.3f s)',
+                          self._recorder.saved, self._recorder.dropped,
+                          self._recorder.blocked, self._recorder.blocked_seconds)
 
     def get_pose_and_experiment(self, number_poses_task):
         """
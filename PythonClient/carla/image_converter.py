@@ -17,7 +17,6 @@ import math
 
 try:
     import numpy
-    from numpy.matlib import repmat
 except ImportError:
     raise RuntimeError('cannot import numpy, make sure numpy package is installed')
 
@@ -34,13 +33,59 @@ def to_bgra_array(image):
     return array
 
 
-def to_rgb_array(image):
-    """Convert a CARLA raw image to a RGB numpy array."""
+def to_rgb_array(image, out=None):
+    """
+    Convert a CARLA raw image to a RGB numpy array. Without "out" it is a
+    view of the raw data with reversed channels (not contiguous); "out" is an
+    optional (height, width, 3) uint8 array to write a contiguous copy to.
+    """
+    return _to_three_channels(image, (2, 1, 0), out)
+
+
+def to_bgr_array(image, out=None):
+    """
+    Convert a CARLA raw image to a BGR numpy array, a view of the raw data
+    or a contiguous copy into "out", see to_rgb_array.
+    """
+    return _to_three_channels(image, (0, 1, 2), out)
+
+
+def to_rgb_batch(images, out=None):
+    """
+    Convert a sequence of CARLA raw images of the same size, e.g. of several
+    cameras or frames, to a contiguous (N, height, width, 3) uint8 RGB array.
+    "out" is an optional array of that shape to write to.
+    """
+    return _to_three_channels_batch(images, (2, 1, 0), out)
+
+
+def to_bgr_batch(images, out=None):
+    """Same as to_rgb_batch with BGR channels."""
+    return _to_three_channels_batch(images, (0, 1, 2), out)
+
+
+def _to_three_channels(image, channels, out):
     array = to_bgra_array(image)
-    # Convert BGRA to RGB.
-    array = array[:, :, :3]
-    array = array[:, :, ::-1]
-    return array
+    if out is None:
+        return array[:, :, :3][:, :, ::-1] if channels[0] == 2 else array[:, :, :3]
+    # A copy per channel is several times faster than copying the strided
+    # view at once.
+    for index, channel in enumerate(channels):
+        out[:, :, index] = array[:, :, channel]
+    return out
+
+
+def _to_three_channels_batch(images, channels, out):
+    if not images:
+        raise ValueError('cannot convert an empty sequence of images')
+    width, height = images[0].width, images[0].height
+    if out is None:
+        out = numpy.empty((len(images), height, width, 3), dtype=numpy.uint8)
+    for index, image in enumerate(images):
+        if (image.width, image.height) != (width, height):
+            raise ValueError('images of a batch must have the same size')
+        _to_three_channels(image, channels, out[index])
+    return out
 
 
 def labels_to_array(image):
@@ -51,112 +96,249 @@ def labels_to_array(image):
     return to_bgra_array(image)[:, :, 2]
 
 
-def labels_to_cityscapes_palette(image):
+# Cityscapes color of each CARLA semantic segmentation label.
+CITYSCAPES_PALETTE = numpy.array([
+    [0, 0, 0],         # None
+    [70, 70, 70],      # Buildings
+    [190, 153, 153],   # Fences
+    [72, 0, 90],       # Other
+    [220, 20, 60],     # Pedestrians
+    [153, 153, 153],   # Poles
+    [157, 234, 50],    # RoadLines
+    [128, 64, 128],    # Roads
+    [244, 35, 232],    # Sidewalks
+    [107, 142, 35],    # Vegetation
+    [0, 0, 255],       # Vehicles
+    [102, 102, 156],   # Walls
+    [220, 220, 0]      # TrafficSigns
+], dtype=numpy.uint8)
+
+
+def make_palette_lut(palette):
+    """
+    Return a 256x3 uint8 lookup table mapping every possible label to a RGB
+    color. palette is either a sequence of colors indexed by label or a dict
+    of colors by label; labels without color are mapped to black.
+    """
+    lut = numpy.zeros((256, 3), dtype=numpy.uint8)
+    if isinstance(palette, dict):
+        for label, color in palette.items():
+            lut[label] = color
+    else:
+        palette = numpy.asarray(palette)
+        lut[:len(palette)] = palette
+    return lut
+
+
+_CITYSCAPES_LUT = make_palette_lut(CITYSCAPES_PALETTE)
+
+
+def labels_to_cityscapes_palette(image, palette=None, out=None):
     """
     Convert an image containing CARLA semantic segmentation labels to
-    Cityscapes palette.
-    """
-    classes = {
-        0: [0, 0, 0],         # None
-        1: [70, 70, 70],      # Buildings
-        2: [190, 153, 153],   # Fences
-        3: [72, 0, 90],       # Other
-        4: [220, 20, 60],     # Pedestrians
-        5: [153, 153, 153],   # Poles
-        6: [157, 234, 50],    # RoadLines
-        7: [128, 64, 128],    # Roads
-        8: [244, 35, 232],    # Sidewalks
-        9: [107, 142, 35],    # Vegetation
-        10: [0, 0, 255],      # Vehicles
-        11: [102, 102, 156],  # Walls
-        12: [220, 220, 0]     # TrafficSigns
-    }
-    array = labels_to_array(image)
-    result = numpy.zeros((array.shape[0], array.shape[1], 3))
-    for key, value in classes.items():
-        result[numpy.where(array == key)] = value
-    return result
-
-
-def depth_to_array(image):
+    Cityscapes palette, as an uint8 RGB array.
+
+    A custom palette can be given, either as accepted by make_palette_lut or
+    as the lookup table it returns (preferred for repeated calls). If given,
+    out is a preallocated (height, width, 3) uint8 array to write to.
+
+    The labels are read in place from the raw image, each pixel takes a
+    single lookup.
+    """
+    if palette is None:
+        lut = _CITYSCAPES_LUT
+    elif isinstance(palette, numpy.ndarray) and palette.shape == (256, 3) and palette.dtype == numpy.uint8:
+        lut = palette
+    else:
+        lut = make_palette_lut(palette)
+    return numpy.take(lut, labels_to_array(image), axis=0, out=out)
+
+
+def depth_to_encoded_array(image, out=None):
+    """
+    Convert an image containing CARLA encoded depth-map to a 2D uint32 array
+    containing the encoded depth of each pixel, B * 256 * 256 + G * 256 + R.
+    "out" is an optional (height, width) uint32 array to write to.
+    """
+    if not isinstance(image, sensor.Image):
+        raise ValueError("Argument must be a carla.sensor.Image")
+    # Read each BGRA pixel as a big-endian uint32, B << 24 | G << 16 | R << 8 | A,
+    # and drop the alpha to get the encoded depth.
+    array = numpy.frombuffer(image.raw_data, dtype=numpy.dtype('>u4'))
+    array = numpy.reshape(array, (image.height, image.width))
+    return numpy.right_shift(array, 8, out=out)
+
+
+def depth_to_array(image, out=None):
     """
     Convert an image containing CARLA encoded depth-map to a 2D array containing
     the depth value of each pixel normalized between [0.0, 1.0].
+    "out" is an optional (height, width) float array to write to, a float32
+    one halves the memory traffic.
     """
-    array = to_bgra_array(image)
-    array = array.astype(numpy.float32)
-    # Apply (R + G * 256 + B * 256 * 256) / (256 * 256 * 256 - 1).
-    normalized_depth = numpy.dot(array[:, :, :3], [65536.0, 256.0, 1.0])
-    normalized_depth /= 16777215.0  # (256.0 * 256.0 * 256.0 - 1.0)
-    return normalized_depth
+    dtype = numpy.float64 if out is None else out.dtype.type
+    # (256.0 * 256.0 * 256.0 - 1.0)
+    return numpy.divide(depth_to_encoded_array(image), dtype(16777215.0), out=out)
+
+
+def depth_to_meters(image, out=None):
+    """
+    Convert an image containing CARLA encoded depth-map to a 2D float32 array
+    containing the depth of each pixel in meters. "out" is an optional
+    (height, width) float array to write to.
+    """
+    dtype = numpy.float32 if out is None else out.dtype.type
+    scale = dtype(DepthProjector.FAR / 16777215.0)
+    return numpy.multiply(depth_to_encoded_array(image), scale, out=out, dtype=dtype)
 
 
-def depth_to_logarithmic_grayscale(image):
+def depth_to_logarithmic_grayscale(image, out=None):
     """
     Convert an image containing CARLA encoded depth-map to a logarithmic
-    grayscale image array.
-    "max_depth" is used to omit the points that are far enough.
+    grayscale image array, as uint8 RGB.
+    "out" is an optional (height, width, 3) uint8 array to write to.
     """
-    normalized_depth = depth_to_array(image)
-    # Convert to logarithmic depth.
-    logdepth = numpy.ones(normalized_depth.shape) + \
-        (numpy.log(normalized_depth) / 5.70378)
-    logdepth = numpy.clip(logdepth, 0.0, 1.0)
-    logdepth *= 255.0
+    # 255 * (1 + log(normalized_depth) / 5.70378), computed in float32 from
+    # the encoded depth as a * log(encoded_depth) + b.
+    logdepth = depth_to_encoded_array(image).astype(numpy.float32)
+    with numpy.errstate(divide='ignore'):
+        numpy.log(logdepth, out=logdepth)
+    logdepth *= numpy.float32(255.0 / 5.70378)
+    logdepth += numpy.float32(255.0 - 255.0 * math.log(16777215.0) / 5.70378)
+    numpy.clip(logdepth, 0.0, 255.0, out=logdepth)
+    if out is None:
+        out = numpy.empty((image.height, image.width, 3), dtype=numpy.uint8)
     # Expand to three colors.
-    return numpy.repeat(logdepth[:, :, numpy.newaxis], 3, axis=2)
+    numpy.copyto(out, logdepth[:, :, numpy.newaxis], casting='unsafe')
+    return out
+
+
+class DepthProjector(object):
+    """
+    Projects depth images of a camera of the given image size and field of
+    view to 3D points relative to the camera. The direction of the ray of
+    each pixel is computed once, projecting an image is then one multiply by
+    its depth.
+
+    Points are in the order of depth_to_local_point_cloud: pixels row by
+    row, both rows and columns reversed.
+    """
+
+    FAR = 1000.0  # max depth in meters.
+
+    def __init__(self, width, height, fov):
+        self.width = width
+        self.height = height
+        self.fov = fov
+        # (Intrinsic) K Matrix, its inverse applied to [u, v, 1] gives the
+        # ray of the pixel, ((u - cx) / f, (v - cy) / f, 1).
+        focal = width / (2.0 * math.tan(fov * math.pi / 360.0))
+        u_coord = numpy.arange(width - 1, -1, -1, dtype=numpy.float64)
+        v_coord = numpy.arange(height - 1, -1, -1, dtype=numpy.float64)
+        ray_x = numpy.empty((height, width))
+        ray_x[:] = (u_coord - width / 2.0) / focal
+        ray_y = numpy.empty((height, width))
+        ray_y[:] = ((v_coord - height / 2.0) / focal)[:, numpy.newaxis]
+        self._ray_x = numpy.reshape(ray_x, width * height)
+        self._ray_y = numpy.reshape(ray_y, width * height)
+
+    @property
+    def rays(self):
+        """The (width * height, 3) array of the ray of each pixel, at depth 1."""
+        return numpy.stack([self._ray_x, self._ray_y, numpy.ones_like(self._ray_x)], axis=1)
+
+    def project(self, normalized_depth, max_depth=0.9, color=None, out=None):
+        """
+        Return the (N, 3) array of points of the pixels of normalized_depth
+        (see depth_to_array) not farther than max_depth, and the (N, 3) array
+        of their color if an image of colors is given.
+
+        If out is given the points are written to it, it must be a float64
+        array of at least width * height points; the returned points are then
+        a view of it.
+        """
+        depth = numpy.reshape(normalized_depth, self.width * self.height)
+        indexes = None
+        if max_depth < depth.max():
+            indexes = numpy.flatnonzero(depth <= max_depth)
+        return self._project(depth, self.FAR, indexes, color, out)
+
+    def project_image(self, image, max_depth=0.9, color=None, out=None):
+        """
+        Same as "project" for a CARLA encoded depth-map, decoded on the fly.
+        """
+        if (image.width, image.height) != (self.width, self.height):
+            raise ValueError('DepthProjector: image size does not match')
+        encoded_depth = numpy.reshape(depth_to_encoded_array(image), self.width * self.height)
+        threshold = _max_encoded_depth(max_depth)
+        indexes = None
+        if threshold < 0:
+            indexes = numpy.empty(0, dtype=numpy.intp)
+        elif threshold < encoded_depth.max():
+            indexes = numpy.flatnonzero(encoded_depth <= threshold)
+        return self._project(encoded_depth, self.FAR / 16777215.0, indexes, color, out)
+
+    def _project(self, depth, scale, indexes, color, out):
+        pixel_length = self.width * self.height
+        if color is not None:
+            color = numpy.reshape(color, (pixel_length, 3))
+        if indexes is None:
+            ray_x = self._ray_x
+            ray_y = self._ray_y
+        else:
+            depth = numpy.take(depth, indexes)
+            ray_x = numpy.take(self._ray_x, indexes)
+            ray_y = numpy.take(self._ray_y, indexes)
+            if color is not None:
+                color = numpy.take(color, indexes, axis=0)
+        count = len(depth)
+        points = numpy.empty((count, 3)) if out is None else out[:count]
+        numpy.multiply(depth, scale, out=points[:, 2])
+        numpy.multiply(ray_x, points[:, 2], out=points[:, 0])
+        numpy.multiply(ray_y, points[:, 2], out=points[:, 1])
+        return points, color
+
+
+def _max_encoded_depth(max_depth):
+    """
+    Largest encoded depth whose normalized value is not greater than
+    max_depth, -1 if there is none.
+    """
+    if max_depth >= 1.0:
+        return 16777215
+    if max_depth < 0.0:
+        return -1
+    encoded = int(max_depth * 16777215.0)
+    while encoded < 16777215 and (encoded + 1) / 16777215.0 <= max_depth:
+        encoded += 1
+    while encoded >= 0 and encoded / 16777215.0 > max_depth:
+        encoded -= 1
+    return encoded
+
+
+_DEPTH_PROJECTORS = {}
+
+
+def get_depth_projector(width, height, fov):
+    """Return the DepthProjector of these camera settings, created once."""
+    key = (width, height, fov)
+    projector = _DEPTH_PROJECTORS.get(key, None)
+    if projector is None:
+        projector = DepthProjector(width, height, fov)
+        _DEPTH_PROJECTORS[key] = projector
+    return projector
 
 
-def depth_to_local_point_cloud(image, color=None, max_depth=0.9):
+def depth_to_local_point_cloud(image, color=None, max_depth=0.9, out=None):
     """
     Convert an image containing CARLA encoded depth-map to a 2D array containing
     the 3D position (relative to the camera) of each pixel and its corresponding
     RGB color of an array.
     "max_depth" is used to omit the points that are far enough.
+    "out" is an optional (width * height, 3) float64 array to write the points
+    to, see DepthProjector.project.
     """
-    far = 1000.0  # max depth in meters.
-    normalized_depth = depth_to_array(image)
-
-    # (Intrinsic) K Matrix
-    k = numpy.identity(3)
-    k[0, 2] = image.width / 2.0
-    k[1, 2] = image.height / 2.0
-    k[0, 0] = k[1, 1] = image.width / \
-        (2.0 * math.tan(image.fov * math.pi / 360.0))
-
-    # 2d pixel coordinates
-    pixel_length = image.width * image.height
-    u_coord = repmat(numpy.r_[image.width-1:-1:-1],
-                     image.height, 1).reshape(pixel_length)
-    v_coord = repmat(numpy.c_[image.height-1:-1:-1],
-                     1, image.width).reshape(pixel_length)
-    if color is not None:
-        color = color.reshape(pixel_length, 3)
-    normalized_depth = numpy.reshape(normalized_depth, pixel_length)
-
-    # Search for pixels where the depth is greater than max_depth to
-    # delete them
-    max_depth_indexes = numpy.where(normalized_depth > max_depth)
-    normalized_depth = numpy.delete(normalized_depth, max_depth_indexes)
-    u_coord = numpy.delete(u_coord, max_depth_indexes)
-    v_coord = numpy.delete(v_coord, max_depth_indexes)
-    if color is not None:
-        color = numpy.delete(color, max_depth_indexes, axis=0)
-
-    # pd2 = [u,v,1]
-    p2d = numpy.array([u_coord, v_coord, numpy.ones_like(u_coord)])
-
-    # P = [X,Y,Z]
-    p3d = numpy.dot(numpy.linalg.inv(k), p2d)
-    p3d *= normalized_depth * far
-
-    # Formating the output to:
-    # [[X1,Y1,Z1,R1,G1,B1],[X2,Y2,Z2,R2,G2,B2], ... [Xn,Yn,Zn,Rn,Gn,Bn]]
-    if color is not None:
-        # numpy.concatenate((numpy.transpose(p3d), color), axis=1)
-        return sensor.PointCloud(
-            image.frame_number,
-            numpy.transpose(p3d),
-            color_array=color)
+    projector = get_depth_projector(image.width, image.height, image.fov)
+    points, color = projector.project_image(image, max_depth, color, out)
     # [[X1,Y1,Z1],[X2,Y2,Z2], ... [Xn,Yn,Zn]]
-    return sensor.PointCloud(image.frame_number, numpy.transpose(p3d))
+    return sensor.PointCloud(image.frame_number, points, color_array=color)
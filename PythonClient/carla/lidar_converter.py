@@ -0,0 +1,91 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Handy conversions for CARLA lidar measurements."""
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed')
+
+
+OCCUPANCY = 'occupancy'
+HEIGHT = 'height'
+
+
+class BirdEyeView(object):
+    """
+    Rasterizes point-clouds, relative to the sensor, to a bird's-eye view
+    uint8 image of size x size pixels of resolution meters each, centered on
+    the sensor. The column of a point grows with x and its row with y, points
+    out of the image are ignored.
+
+    With OCCUPANCY mode, pixels with points are 255 and the rest 0. With
+    HEIGHT mode, pixels with points hold the highest z of their points mapped
+    from height_range to 1-255.
+
+    The image is (size, size), or (size, size, 3) gray RGB if channels is 3,
+    and its buffer is reused by every call to "rasterize".
+    """
+
+    def __init__(self, size=200, resolution=0.5, mode=OCCUPANCY, height_range=(-3.0, 3.0), channels=1):
+        if mode not in (OCCUPANCY, HEIGHT):
+            raise ValueError('BirdEyeView: unknown mode %r' % mode)
+        if channels not in (1, 3):
+            raise ValueError('BirdEyeView: channels must be 1 or 3')
+        self.size = size
+        self.resolution = resolution
+        self.mode = mode
+        self.height_range = height_range
+        shape = (size, size) if channels == 1 else (size, size, channels)
+        self._image = numpy.zeros(shape, dtype=numpy.uint8)
+        # The pixels are set on a single channel and then copied to the
+        # others.
+        self._gray = self._image.reshape(size * size) if channels == 1 else numpy.zeros(size * size, numpy.uint8)
+
+    @property
+    def image(self):
+        """The image of the last rasterized point-cloud."""
+        return self._image
+
+    def rasterize(self, points):
+        """
+        Rasterize an (N, 3) array of points (e.g. LidarMeasurement.data) and
+        return the image.
+        """
+        size = self.size
+        scale = numpy.float32(1.0 / self.resolution)
+        # Shifted by size so the truncation to integers rounds down every
+        # coordinate that may fall in the image, then moved back.
+        offset = numpy.float32(size / 2.0 + size)
+        column = points[:, 0] * scale
+        column += offset
+        column = column.astype(numpy.int32)
+        column -= size
+        row = points[:, 1] * scale
+        row += offset
+        row = row.astype(numpy.int32)
+        row -= size
+        # Negative coordinates are out of range as unsigned too.
+        inside = column.view(numpy.uint32) < size
+        inside &= row.view(numpy.uint32) < size
+        row *= size
+        row += column
+        index = numpy.compress(inside, row)
+        self._gray.fill(0)
+        if self.mode == OCCUPANCY:
+            self._gray[index] = 255
+        else:
+            low, high = self.height_range
+            value = numpy.compress(inside, points[:, 2]) - low
+            value *= 254.0 / (high - low)
+            numpy.clip(value, 0.0, 254.0, out=value)
+            value += 1.0
+            numpy.maximum.at(self._gray, index, value.astype(numpy.uint8))
+        if self._image.ndim == 3:
+            for channel in range(self._image.shape[2]):
+                self._image[:, :, channel] = self._gray.reshape(size, size)
+        return self._image
@@ -0,0 +1,329 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Lazy and columnar decoding of the measurements sent by the CARLA server."""
+
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
+
+from google.protobuf import descriptor_pb2
+from google.protobuf import descriptor_pool
+from google.protobuf import message_factory
+from google.protobuf import symbol_database
+
+try:
+    from . import carla_server_pb2 as carla_protocol
+except ImportError:
+    raise RuntimeError('cannot import "carla_server_pb2.py", run the protobuf compiler to generate this file')
+
+
+def _make_shallow_measurements_class():
+    """
+    Return a message class with the layout of carla_protocol.Measurements but
+    with non_player_agents declared as repeated bytes, parsing it only splits
+    the agents without decoding them.
+    """
+    file_proto = descriptor_pb2.FileDescriptorProto()
+    file_proto.name = 'carla_shallow_measurements.proto'
+    file_proto.package = 'carla_shallow'
+    file_proto.syntax = 'proto3'
+    file_proto.dependency.append(carla_protocol.DESCRIPTOR.name)
+    message_proto = file_proto.message_type.add()
+    carla_protocol.Measurements.DESCRIPTOR.CopyToProto(message_proto)
+    message_proto.name = 'ShallowMeasurements'
+    # The nested types keep referring to the ones of carla_server.proto.
+    del message_proto.nested_type[:]
+    for field in message_proto.field:
+        if field.name == 'non_player_agents':
+            field.type = descriptor_pb2.FieldDescriptorProto.TYPE_BYTES
+            field.ClearField('type_name')
+    pool = descriptor_pool.Default()
+    pool.AddSerializedFile(file_proto.SerializeToString())
+    descriptor = pool.FindMessageTypeByName('carla_shallow.ShallowMeasurements')
+    if hasattr(message_factory, 'GetMessageClass'):
+        return message_factory.GetMessageClass(descriptor)
+    return symbol_database.Default().GetPrototype(descriptor)
+
+
+_ShallowMeasurements = _make_shallow_measurements_class()
+
+
+AgentColumns = namedtuple('AgentColumns', 'location forward_speed extent')
+
+
+class LazyMeasurements(object):
+    """
+    Measurements of a frame with the same fields as carla_protocol.Measurements.
+
+    The player measurements are decoded right away, the non-player agents are
+    decoded on first access to "non_player_agents". "agent_columns" gives the
+    location, forward speed and bounding box extent of every agent as NumPy
+    arrays, agents without speed or bounding box (traffic lights and speed
+    limit signs) have zeros there.
+    """
+
+    def __init__(self, data):
+        self._message = _ShallowMeasurements()
+        self._message.ParseFromString(data)
+        self._non_player_agents = None
+        self._agent_columns = None
+
+    @property
+    def frame_number(self):
+        return self._message.frame_number
+
+    @property
+    def platform_timestamp(self):
+        return self._message.platform_timestamp
+
+    @property
+    def game_timestamp(self):
+        return self._message.game_timestamp
+
+    @property
+    def player_measurements(self):
+        return self._message.player_measurements
+
+    @property
+    def number_of_agents(self):
+        """Number of non-player agents, without decoding them."""
+        return len(self._message.non_player_agents)
+
+    @property
+    def serialized_agents(self):
+        """
+        The non-player agents as serialized carla_protocol.Agent, without
+        decoding them (see AgentArrays.update_serialized).
+        """
+        return self._message.non_player_agents
+
+    @property
+    def non_player_agents(self):
+        if self._non_player_agents is None:
+            agents = []
+            for data in self._message.non_player_agents:
+                agent = carla_protocol.Agent()
+                agent.ParseFromString(data)
+                agents.append(agent)
+            self._non_player_agents = agents
+        return self._non_player_agents
+
+    @property
+    def agent_columns(self):
+        if self._agent_columns is None:
+            self._agent_columns = make_agent_columns(self.non_player_agents)
+        return self._agent_columns
+
+    def to_protobuf(self):
+        """Return the fully decoded carla_protocol.Measurements."""
+        pb_message = carla_protocol.Measurements()
+        pb_message.ParseFromString(self._message.SerializeToString())
+        return pb_message
+
+
+def make_agent_columns(agents):
+    """
+    Return the AgentColumns of a sequence of carla_protocol.Agent: arrays of
+    shape (N, 3) for location and extent, and (N,) for forward speed.
+    """
+    arrays = AgentArrays(len(agents)).update(agents)
+    return AgentColumns(arrays.location, arrays.forward_speed, arrays.extent)
+
+
+# ==============================================================================
+# -- AgentArrays ---------------------------------------------------------------
+# ==============================================================================
+
+
+NO_AGENT = -1
+VEHICLE = 0
+PEDESTRIAN = 1
+TRAFFIC_LIGHT = 2
+SPEED_LIMIT_SIGN = 3
+
+_AGENT_KINDS = {
+    'vehicle': VEHICLE,
+    'pedestrian': PEDESTRIAN,
+    'traffic_light': TRAFFIC_LIGHT,
+    'speed_limit_sign': SPEED_LIMIT_SIGN
+}
+
+
+class AgentArrays(object):
+    """
+    The non-player agents of a frame as a struct of arrays, row i holds the
+    i-th agent of the last update:
+
+        id                   uint32 (N,)
+        kind                 int8 (N,), VEHICLE, PEDESTRIAN, TRAFFIC_LIGHT or
+                             SPEED_LIMIT_SIGN
+        location             float32 (N, 3)
+        yaw                  float32 (N,)
+        forward_speed        float32 (N,)
+        extent               float32 (N, 3), bounding box extent
+        traffic_light_state  int8 (N,), carla_protocol.TrafficLight.State or
+                             -1 for other agents
+
+    Fields an agent does not have are zero, "row" gives the row of an agent
+    id. The arrays are views of storage kept across updates, that only grows
+    when the number of agents does.
+
+    Agents are matched by id with the previous update, whatever their row:
+    static agents (traffic lights and speed limit signs) keep their values
+    and only get their traffic light state updated. "update_serialized" goes
+    further and only decodes the agents whose data changed.
+    """
+
+    def __init__(self, capacity=0):
+        self._count = 0
+        # Row of each agent id, and of each serialized agent if the last
+        # update was "update_serialized".
+        self._rows = {}
+        self._data_rows = {}
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def id(self):
+        return self._id[:self._count]
+
+    @property
+    def kind(self):
+        return self._kind[:self._count]
+
+    @property
+    def location(self):
+        return self._location[:self._count]
+
+    @property
+    def yaw(self):
+        return self._yaw[:self._count]
+
+    @property
+    def forward_speed(self):
+        return self._forward_speed[:self._count]
+
+    @property
+    def extent(self):
+        return self._extent[:self._count]
+
+    @property
+    def traffic_light_state(self):
+        return self._traffic_light_state[:self._count]
+
+    def row(self, agent_id):
+        """Row of an agent id in the last update, raise KeyError if missing."""
+        return self._rows[agent_id]
+
+    def update(self, agents):
+        """
+        Update the arrays with a sequence of carla_protocol.Agent, usually the
+        non_player_agents of the measurements of a frame. Return self.
+        """
+        self._reserve(len(agents))
+        kinds = [agent.WhichOneof('agent') for agent in agents]
+        reused = {}
+        for row, (agent, kind) in enumerate(zip(agents, kinds)):
+            if kind == 'traffic_light' or kind == 'speed_limit_sign':
+                previous = self._rows.get(agent.id, None)
+                if previous is not None and self._kind[previous] == _AGENT_KINDS[kind]:
+                    reused[row] = previous
+        self._move_rows(reused)
+        for row, (agent, kind) in enumerate(zip(agents, kinds)):
+            if row not in reused:
+                self._write_row(row, agent, kind)
+            elif kind == 'traffic_light':
+                self._traffic_light_state[row] = agent.traffic_light.state
+        self._finish(len(agents))
+        self._data_rows = {}
+        return self
+
+    def update_serialized(self, agents):
+        """
+        Same as "update" with a sequence of serialized carla_protocol.Agent,
+        e.g. the "serialized_agents" of LazyMeasurements. Agents whose data
+        did not change since the previous call are not decoded again.
+        """
+        self._reserve(len(agents))
+        reused = {}
+        for row, data in enumerate(agents):
+            previous = self._data_rows.get(data, None)
+            if previous is not None:
+                reused[row] = previous
+        self._move_rows(reused)
+        agent = carla_protocol.Agent()
+        for row, data in enumerate(agents):
+            if row not in reused:
+                agent.ParseFromString(data)
+                self._write_row(row, agent, agent.WhichOneof('agent'))
+        self._finish(len(agents))
+        self._data_rows = dict((data, row) for row, data in enumerate(agents))
+        return self
+
+    def _reserve(self, count):
+        if count > len(self._id):
+            self._allocate(max(count, 2 * len(self._id)), self._count)
+
+    def _move_rows(self, rows):
+        """Copy the rows given as a dict of previous row by new row."""
+        if all(new == previous for new, previous in rows.items()):
+            return
+        new = numpy.fromiter(rows.keys(), dtype=numpy.intp, count=len(rows))
+        previous = numpy.fromiter(rows.values(), dtype=numpy.intp, count=len(rows))
+        for array in self._arrays():
+            # The rows taken are copied before any is overwritten.
+            array[new] = array[previous]
+
+    def _write_row(self, row, agent, kind):
+        self._id[row] = agent.id
+        self._kind[row] = NO_AGENT
+        self._location[row] = 0.0
+        self._yaw[row] = 0.0
+        self._forward_speed[row] = 0.0
+        self._extent[row] = 0.0
+        self._traffic_light_state[row] = -1
+        if kind is None:
+            return
+        body = getattr(agent, kind)
+        kind = _AGENT_KINDS[kind]
+        self._kind[row] = kind
+        location = body.transform.location
+        self._location[row] = (location.x, location.y, location.z)
+        self._yaw[row] = body.transform.rotation.yaw
+        if kind == VEHICLE or kind == PEDESTRIAN:
+            self._forward_speed[row] = body.forward_speed
+            extent = body.bounding_box.extent
+            self._extent[row] = (extent.x, extent.y, extent.z)
+        elif kind == TRAFFIC_LIGHT:
+            self._traffic_light_state[row] = body.state
+
+    def _finish(self, count):
+        self._count = count
+        self._rows = dict((agent_id, row) for row, agent_id in enumerate(self._id[:count].tolist()))
+
+    def _arrays(self):
+        return (self._id, self._kind, self._location, self._yaw, self._forward_speed, self._extent,
+                self._traffic_light_state)
+
+    def _allocate(self, capacity, keep=0):
+        def grow(name, shape, dtype):
+            array = numpy.zeros(shape, dtype=dtype)
+            if keep > 0:
+                array[:keep] = getattr(self, name)[:keep]
+            setattr(self, name, array)
+        grow('_id', capacity, numpy.uint32)
+        grow('_kind', capacity, numpy.int8)
+        grow('_location', (capacity, 3), numpy.float32)
+        grow('_yaw', capacity, numpy.float32)
+        grow('_forward_speed', capacity, numpy.float32)
+        grow('_extent', (capacity, 3), numpy.float32)
+        grow('_traffic_light_state', capacity, numpy.int8)
@@ -90,6 +90,16 @@ class Converter(object):
         else:
             raise ValueError('Invalid node to be converted')
 
+    def convert_world_array_to_pixel(self, world):
+        """
+        Vectorized conversion of world positions to pixels
+        :param world: array of shape (N, 3) with world positions
+        :return: array of shape (N, 2) with pixel coordinates
+        """
+        offset = np.array(self._worldoffset[:3]) - np.array(self._mapoffset[:3])
+        relative_location = np.dot(world, self._worldrotation) + offset
+        return np.floor(relative_location[:, :2] / float(self._pixel_density))
+
     def _node_to_pixel(self, node):
         """
         Conversion from node format (graph) to pixel (image)
@@ -111,6 +111,13 @@ class CarlaMap(object):
         """
         return self._converter.convert_to_pixel(input_data)
 
+    def convert_world_array_to_pixel(self, world):
+        """
+        Receives an array of shape (N, 3) of world positions
+        :return: An array of shape (N, 2) of pixel coordinates
+        """
+        return self._converter.convert_world_array_to_pixel(world)
+
     def convert_to_world(self, input_data):
         """
         Receives a data type (Can Be Pixel or Node )
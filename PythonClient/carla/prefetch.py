@@ -0,0 +1,109 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Background reception of frames for the CARLA client."""
+
+import collections
+import logging
+import threading
+
+
+DROP_OLDEST = 'drop_oldest'
+KEEP_LATEST = 'keep_latest'
+
+
+class FramePrefetcher(object):
+    """
+    Receives and parses frames in a background thread into a bounded ring, so
+    the server never waits for a slow consumer when running in asynchronous
+    mode.
+
+    When the ring is full the oldest frame is dropped. With the DROP_OLDEST
+    policy frames are returned in order; with KEEP_LATEST "get" returns the
+    most recent frame and drops the rest.
+
+    The counters "received", "dropped" and "queued" can be read at any time.
+    """
+
+    def __init__(self, read_frame, max_frames=4, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, KEEP_LATEST):
+            raise ValueError('FramePrefetcher: unknown policy %r' % policy)
+        if max_frames < 1:
+            raise ValueError('FramePrefetcher: max_frames must be positive')
+        self._read_frame = read_frame
+        self._max_frames = max_frames
+        self._policy = policy
+        self._ring = collections.deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._error = None
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def queued(self):
+        """Number of frames waiting to be read."""
+        return len(self._ring)
+
+    def start(self):
+        """Start receiving frames."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FramePrefetcher')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Ask the receiving thread to finish. It may be blocked reading, close
+        the connection before calling "join".
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def join(self):
+        """Wait until the receiving thread finished."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self):
+        """
+        Return the next frame according to the policy, waiting for it if none
+        is queued. Errors occurred while receiving are raised here.
+        """
+        with self._condition:
+            while not self._ring and self._error is None and self._running:
+                self._condition.wait()
+            if not self._ring:
+                raise self._error if self._error is not None else RuntimeError('frame prefetching stopped')
+            if self._policy == KEEP_LATEST:
+                self.dropped += len(self._ring) - 1
+                frame = self._ring.pop()
+                self._ring.clear()
+                return frame
+            return self._ring.popleft()
+
+    def _run(self):
+        while self._running:
+            try:
+                frame = self._read_frame()
+            except Exception as exception:
+                with self._condition:
+                    if self._running:
+                        logging.debug('frame prefetching failed: %s', exception)
+                        self._error = exception
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                if len(self._ring) >= self._max_frames:
+                    self._ring.popleft()
+                    self.dropped += 1
+                self._ring.append(frame)
+                self.received += 1
+                self._condition.notify_all()
@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Projection of the bounding boxes of the agents to camera images."""
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
+
+from . import sensor
+from . import transform
+
+
+# The 8 corners of a box of extent 1, i.e. of side 2.
+_UNIT_BOX_CORNERS = numpy.array(
+    [[x, y, z] for x in (-1.0, 1.0) for y in (-1.0, 1.0) for z in (-1.0, 1.0)])
+
+
+def camera_intrinsics(camera):
+    """The 3x3 intrinsic (K) matrix of a sensor.Camera."""
+    width = camera.ImageSizeX
+    height = camera.ImageSizeY
+    focal = width / (2.0 * math.tan(camera.FOV * math.pi / 360.0))
+    return numpy.array([
+        [focal, 0.0, width / 2.0],
+        [0.0, focal, height / 2.0],
+        [0.0, 0.0, 1.0]])
+
+
+def agent_boxes(agents):
+    """
+    Return the ids, the (N, 4, 4) box to world matrices and the (N, 3)
+    extents of the bounding boxes of the vehicles and pedestrians of a
+    sequence of carla_protocol.Agent (e.g. the non_player_agents of the
+    measurements of a frame).
+    """
+    ids = []
+    values = []
+    for agent in agents:
+        kind = agent.WhichOneof('agent')
+        if kind != 'vehicle' and kind != 'pedestrian':
+            continue
+        body = getattr(agent, kind)
+        location = body.transform.location
+        rotation = body.transform.rotation
+        box_location = body.bounding_box.transform.location
+        box_rotation = body.bounding_box.transform.rotation
+        extent = body.bounding_box.extent
+        ids.append(agent.id)
+        values.append((
+            location.x, location.y, location.z,
+            rotation.pitch, rotation.yaw, rotation.roll,
+            box_location.x, box_location.y, box_location.z,
+            box_rotation.pitch, box_rotation.yaw, box_rotation.roll,
+            extent.x, extent.y, extent.z))
+    values = numpy.array(values, dtype=numpy.float64).reshape(-1, 15)
+    matrices = transform.compose(
+        transform.transform_matrices(values[:, 0:3], values[:, 3:6]),
+        transform.transform_matrices(values[:, 6:9], values[:, 9:12]))
+    return numpy.array(ids, dtype=numpy.uint32), matrices, values[:, 12:15]
+
+
+class BoxProjector(object):
+    """
+    Projects 3D bounding boxes in world frame to the image of a sensor.Camera
+    attached to the player, all the boxes at once.
+
+    Pixel coordinates follow the convention of the depth images projected by
+    image_converter.depth_to_local_point_cloud, so a point projected here
+    falls on the pixel whose depth gives it back.
+    """
+
+    def __init__(self, camera, near=0.1, far=None):
+        self.width = camera.ImageSizeX
+        self.height = camera.ImageSizeY
+        self.intrinsics = camera_intrinsics(camera)
+        self.near = near
+        self.far = far
+        self._to_world = sensor.SensorToWorld(camera)
+        self._from_world = numpy.empty((4, 4))
+
+    def world_to_camera(self, player_transform):
+        """
+        Return the 4x4 world to camera matrix for player_transform, a
+        transform.Transform or the transform of the player measurements. The
+        array is reused by the next call.
+        """
+        return transform.rigid_inverses(self._to_world.matrix(player_transform), out=self._from_world)
+
+    def corners(self, player_transform, box_matrices, extents):
+        """
+        Return the (N, 8, 3) corners, in camera frame, of the boxes of (N, 4, 4)
+        box to world matrices and (N, 3) extents (see agent_boxes).
+        """
+        # Scaling the box to camera matrices by the extents maps the corners
+        # of the unit box straight to camera frame.
+        matrices = transform.compose(self.world_to_camera(player_transform), box_matrices)
+        matrices[:, :3, :3] *= numpy.asarray(extents)[:, numpy.newaxis, :]
+        return transform.apply_transforms(matrices, _UNIT_BOX_CORNERS)
+
+    def project_points(self, points):
+        """
+        Return the (..., 2) pixel coordinates (column, row) of (..., 3) points
+        in camera frame. Points at depth 0 or behind the camera give
+        meaningless coordinates.
+        """
+        focal = self.intrinsics[0, 0]
+        pixels = numpy.empty(points.shape[:-1] + (2,))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            inverse_depth = focal / points[..., 2]
+            # Both columns and rows are reversed, see DepthProjector.
+            numpy.multiply(points[..., 0], inverse_depth, out=pixels[..., 0])
+            numpy.subtract(self.width - 1 - self.intrinsics[0, 2], pixels[..., 0], out=pixels[..., 0])
+            numpy.multiply(points[..., 1], inverse_depth, out=pixels[..., 1])
+            numpy.subtract(self.height - 1 - self.intrinsics[1, 2], pixels[..., 1], out=pixels[..., 1])
+        return pixels
+
+    def project(self, player_transform, box_matrices, extents):
+        """
+        Project the boxes of (N, 4, 4) box to world matrices and (N, 3)
+        extents (see agent_boxes) to the image. Return
+
+            pixels   float64 (N, 8, 2), the (column, row) of each corner
+            boxes    float64 (N, 4), the 2D box (column_min, row_min,
+                     column_max, row_max) of each box, clipped to the image
+            visible  bool (N,), whether the box is in the view frustum
+
+        Boxes with a corner closer than near (e.g. behind the camera), farther
+        than far if given, or whose 2D box falls out of the image are not
+        visible, and their pixels and 2D boxes are meaningless.
+        """
+        corners = self.corners(player_transform, box_matrices, extents)
+        depth = corners[..., 2]
+        visible = depth.min(axis=1) > self.near
+        if self.far is not None:
+            visible &= depth.max(axis=1) < self.far
+        pixels = self.project_points(corners)
+        boxes = numpy.concatenate([pixels.min(axis=1), pixels.max(axis=1)], axis=1)
+        visible &= boxes[:, 0] < self.width
+        visible &= boxes[:, 1] < self.height
+        visible &= boxes[:, 2] >= 0.0
+        visible &= boxes[:, 3] >= 0.0
+        numpy.clip(boxes[:, 0::2], 0.0, self.width - 1, out=boxes[:, 0::2])
+        numpy.clip(boxes[:, 1::2], 0.0, self.height - 1, out=boxes[:, 1::2])
+        return pixels, boxes, visible
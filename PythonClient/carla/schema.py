@@ -0,0 +1,151 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Declarative fields of the settings and sensor descriptions: the classes
+take their __slots__, defaults, type checks and INI serialization from a
+tuple of Fields.
+"""
+
+import numbers
+import operator
+
+from collections import namedtuple
+
+
+# A setting: its name, the type its values must be an instance of (None is
+# always accepted, and skipped in the INI), its default value and the INI
+# section it is written to (None if it is not written).
+Field = namedtuple('Field', 'name type default section')
+
+
+# Section of the sensor fields, written to a "CARLA/Sensor/<name>" section
+# per sensor.
+SENSOR = 'CARLA/Sensor'
+
+# Types for Field.type, numbers accept any integer or real number type (e.g.
+# NumPy ones) but no conversion is done.
+BOOL = bool
+INTEGER = numbers.Integral
+REAL = numbers.Real
+STRING = str
+
+
+def index(fields):
+    """Dict of the fields by name."""
+    return dict((field.name, field) for field in fields)
+
+
+def set_defaults(obj):
+    """Set the defaults of the fields of obj, the defaults are not checked."""
+    for name, default in obj._DEFAULTS:
+        setattr(obj, name, default)
+
+
+# The built-in types of each field type, checked first as the abstract
+# numbers types are slow to check against.
+_EXACT_TYPES = {
+    BOOL: (bool,),
+    INTEGER: (int,),
+    REAL: (float, int),
+    STRING: (str,)
+}
+
+
+def exact_types(fields):
+    """
+    Dict of the built-in types (None included) accepted without further
+    check by each field, by name; values of other types go to "check".
+    """
+    return dict((field.name, _EXACT_TYPES.get(field.type, ()) + (type(None),)) for field in fields)
+
+
+def check(owner, field, value):
+    """
+    Raise TypeError if value does not fit field, owner is the class named in
+    the message.
+    """
+    if value is None or type(value) in _EXACT_TYPES.get(field.type, ()):
+        return
+    # Booleans are integers too, but are not taken as numbers.
+    if isinstance(value, field.type) and (field.type is BOOL or not isinstance(value, bool)):
+        return
+    raise TypeError('%s: %s expects %s, got %r' % (owner.__name__, field.name, _type_name(field.type), value))
+
+
+def serialization_plan(fields, sort=False):
+    """
+    The INI sections of fields in order of first appearance, as a tuple of
+    (section, field names) pairs, the field names sorted if sort is True.
+    """
+    sections = []
+    names = {}
+    for field in fields:
+        if field.section is None:
+            continue
+        if field.section not in names:
+            sections.append(field.section)
+            names[field.section] = []
+        names[field.section].append(field.name)
+    return tuple(
+        (section, tuple(sorted(names[section]) if sort else names[section])) for section in sections)
+
+
+def values_getter(names):
+    """A function returning the tuple of the values of names of an object."""
+    getter = operator.attrgetter(*names)
+    return getter if len(names) > 1 else lambda obj: (getter(obj),)
+
+
+def same_values(values, other):
+    """
+    Whether the tuples of values hold the same objects, e.g. 90 and 90.0 are
+    equal but not written the same.
+    """
+    return len(values) == len(other) and all(map(operator.is_, values, other))
+
+
+class _FieldsType(type):
+    """
+    Metaclass of the classes declaring a _FIELDS tuple. Adds the fields to
+    __slots__ (the ones not already declared by a base class) and builds
+    the class attributes derived from them:
+
+      _FIELD_INDEX  the fields by name
+      _EXACT_TYPES  see exact_types
+      _DEFAULTS     the (name, default) pairs used by set_defaults
+      _INI_PLAN     see serialization_plan, the field names sorted if the
+                    class sets _INI_SORTED
+      _INI_KEYS     the field names in the INI, in order
+      _INI_VALUES   a function returning the values of _INI_KEYS of an object
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get('_FIELDS', None)
+        if fields is None:
+            return super(_FieldsType, mcs).__new__(mcs, name, bases, namespace)
+        inherited = set(field.name for base in bases for field in getattr(base, '_FIELDS', ()))
+        namespace = dict(namespace)
+        namespace['__slots__'] = tuple(
+            field.name for field in fields if field.name not in inherited) + tuple(namespace.get('__slots__', ()))
+        cls = super(_FieldsType, mcs).__new__(mcs, name, bases, namespace)
+        cls._FIELD_INDEX = index(fields)
+        cls._EXACT_TYPES = exact_types(fields)
+        cls._DEFAULTS = tuple((field.name, field.default) for field in fields)
+        cls._INI_PLAN = serialization_plan(fields, sort=getattr(cls, '_INI_SORTED', False))
+        cls._INI_KEYS = sum((keys for _, keys in cls._INI_PLAN), ())
+        cls._INI_VALUES = staticmethod(values_getter(cls._INI_KEYS))
+        return cls
+
+
+# Base of the classes declaring fields, created through the metaclass to
+# work the same on Python 2 and 3.
+Declared = _FieldsType('Declared', (object,), {'__slots__': ()})
+
+
+def _type_name(field_type):
+    return {BOOL: 'a bool', INTEGER: 'an integer', REAL: 'a real number', STRING: 'a string'}.get(
+        field_type, field_type.__name__)
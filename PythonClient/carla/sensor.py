@@ -16,7 +16,9 @@ try:
 except ImportError:
     raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
 
-from .transform import Transform, Translation, Rotation, Scale
+from . import schema
+from .schema import Field
+from .transform import Transform, Translation, Rotation, Scale, apply_transforms
 
 
 # ==============================================================================
@@ -32,45 +34,187 @@ Point = namedtuple('Point', 'x y z color')
 Point.__new__.__defaults__ = (0.0, 0.0, 0.0, None)
 
 
-def _append_extension(filename, ext):
+def append_extension(filename, ext):
+    """Return filename with the extension ext appended, unless it has it already."""
     return filename if filename.lower().endswith(ext.lower()) else filename + ext
 
 
+PLY_BINARY = 'binary_little_endian'
+PLY_ASCII = 'ascii'
+NPZ = 'npz'
+
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8'
+}
+
+_PLY_COLORS = ('diffuse_red', 'diffuse_green', 'diffuse_blue')
+
+
+def _ply_header(file_format, points, has_colors):
+    header = [
+        'ply',
+        'format %s 1.0' % file_format,
+        'element vertex %d' % points,
+        'property float32 x',
+        'property float32 y',
+        'property float32 z']
+    if has_colors:
+        header += ['property uchar %s' % name for name in _PLY_COLORS]
+    header.append('end_header')
+    return '\n'.join(header)
+
+
+def _write_ascii_ply(filename, array, color_array):
+    if color_array is None:
+        ply = '\n'.join(['{:.2f} {:.2f} {:.2f}'.format(*p) for p in array.tolist()])
+    else:
+        points_3d = numpy.concatenate((array, color_array), axis=1)
+        ply = '\n'.join(['{:.2f} {:.2f} {:.2f} {:.0f} {:.0f} {:.0f}'
+                         .format(*p) for p in points_3d.tolist()])
+    with open(filename, 'w+') as ply_file:
+        ply_file.write('\n'.join([_ply_header(PLY_ASCII, len(array), color_array is not None), ply]))
+
+
+def _write_binary_ply(filename, array, color_array):
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if color_array is not None:
+        fields += [(name, 'u1') for name in _PLY_COLORS]
+    vertices = numpy.empty(len(array), dtype=fields)
+    for index, name in enumerate('xyz'):
+        vertices[name] = array[:, index]
+    if color_array is not None:
+        for index, name in enumerate(_PLY_COLORS):
+            vertices[name] = color_array[:, index]
+    header = _ply_header(PLY_BINARY, len(array), color_array is not None) + '\n'
+    with open(filename, 'wb') as ply_file:
+        ply_file.write(header.encode('ascii'))
+        vertices.tofile(ply_file)
+
+
+def _read_ply(filename):
+    """Return the (points, colors) arrays of a PLY file, colors may be None."""
+    with open(filename, 'rb') as ply_file:
+        if ply_file.readline().strip() != b'ply':
+            raise ValueError('%s: not a PLY file' % filename)
+        file_format = None
+        count = None
+        fields = []
+        while True:
+            line = ply_file.readline()
+            if not line:
+                raise ValueError('%s: PLY header not terminated' % filename)
+            words = line.decode('ascii').split()
+            if not words or words[0] in ('comment', 'obj_info'):
+                continue
+            if words[0] == 'end_header':
+                break
+            if words[0] == 'format':
+                file_format = words[1]
+            elif words[0] == 'element':
+                if count is not None:
+                    # Only the vertices are read, other elements must follow them.
+                    line = ply_file.readline()
+                    while line and line.strip() != b'end_header':
+                        line = ply_file.readline()
+                    break
+                if words[1] != 'vertex':
+                    raise ValueError('%s: the first PLY element must be "vertex"' % filename)
+                count = int(words[2])
+            elif words[0] == 'property':
+                if words[1] == 'list':
+                    raise ValueError('%s: PLY list properties are not supported' % filename)
+                fields.append((words[2], _PLY_TYPES[words[1]]))
+        if count is None:
+            raise ValueError('%s: no vertex element in PLY file' % filename)
+        if file_format == PLY_ASCII:
+            vertices = numpy.loadtxt(
+                ply_file, dtype=[(name, t) for name, t in fields], max_rows=count, ndmin=1)
+        elif file_format in (PLY_BINARY, 'binary_big_endian'):
+            order = '<' if file_format == PLY_BINARY else '>'
+            vertices = numpy.fromfile(ply_file, dtype=[(name, order + t) for name, t in fields], count=count)
+        else:
+            raise ValueError('%s: unknown PLY format %r' % (filename, file_format))
+    if len(vertices) != count:
+        raise ValueError('%s: PLY file truncated' % filename)
+    names = vertices.dtype.names
+    points = numpy.stack([vertices[name] for name in 'xyz'], axis=1)
+    colors = None
+    for color_names in (_PLY_COLORS, ('red', 'green', 'blue')):
+        if all(name in names for name in color_names):
+            colors = numpy.stack([vertices[name] for name in color_names], axis=1).astype(numpy.uint8)
+            break
+    return points, colors
+
+
 # ==============================================================================
 # -- Sensor --------------------------------------------------------------------
 # ==============================================================================
 
 
-class Sensor(object):
+class Sensor(schema.Declared):
     """
     Base class for sensor descriptions. Used to add sensors to CarlaSettings.
     """
 
+    # Fields of the sensor, subclasses add theirs.
+    _FIELDS = (
+        Field('SensorName', schema.STRING, None, schema.SENSOR),
+        Field('SensorType', schema.STRING, None, schema.SENSOR),
+        Field('PositionX', schema.REAL, 0.2, schema.SENSOR),
+        Field('PositionY', schema.REAL, 0.0, schema.SENSOR),
+        Field('PositionZ', schema.REAL, 1.3, schema.SENSOR),
+        Field('RotationPitch', schema.REAL, 0.0, schema.SENSOR),
+        Field('RotationRoll', schema.REAL, 0.0, schema.SENSOR),
+        Field('RotationYaw', schema.REAL, 0.0, schema.SENSOR))
+    # Keys of the INI section of the sensor are sorted.
+    _INI_SORTED = True
+
+    # The slots of the fields are added by schema.Declared.
+    __slots__ = (
+        '_ini',
+        # (position and rotation, matrix) of the last unreal transform.
+        '_unreal_transform')
+
     def __init__(self, name, sensor_type):
+        schema.set_defaults(self)
         self.SensorName = name
         self.SensorType = sensor_type
-        self.PositionX = 0.2
-        self.PositionY = 0.0
-        self.PositionZ = 1.3
-        self.RotationPitch = 0.0
-        self.RotationRoll = 0.0
-        self.RotationYaw = 0.0
+        self._ini = None
+        self._unreal_transform = None
 
     def set(self, **kwargs):
-        for key, value in kwargs.items():
-            if not hasattr(self, key):
-                raise ValueError('sensor.Sensor: no key named %r' % key)
+        """Set fields by name, values are type-checked but not converted."""
+        self._update(kwargs)
+
+    def _update(self, values):
+        exact_types = self._EXACT_TYPES
+        for key, value in values.items():
+            if type(value) not in exact_types.get(key, ()):
+                field = self._FIELD_INDEX.get(key, None)
+                if field is not None:
+                    schema.check(type(self), field, value)
+                elif not hasattr(self, key):
+                    raise ValueError('sensor.Sensor: no key named %r' % key)
             setattr(self, key, value)
 
     def set_position(self, x, y, z):
         self.PositionX = x
         self.PositionY = y
         self.PositionZ = z
+        self._unreal_transform = None
 
     def set_rotation(self, pitch, yaw, roll):
         self.RotationPitch = pitch
         self.RotationYaw = yaw
         self.RotationRoll = roll
+        self._unreal_transform = None
 
     def get_transform(self):
         '''
@@ -88,8 +232,65 @@ class Sensor(object):
 
         @todo Do we need to expose this?
         '''
-        to_unreal_transform = Transform(Rotation(roll=-90, yaw=90), Scale(x=-1))
-        return self.get_transform() * to_unreal_transform
+        return Transform(matrix=self._unreal_matrix().copy())
+
+    def _ini_section(self):
+        """
+        The name and the (key, value) items of the INI section of the sensor,
+        kept until a field changes. Keys are sorted, and the ones with None
+        value skipped.
+        """
+        values = self._INI_VALUES(self)
+        if self._ini is None or not schema.same_values(values, self._ini[0]):
+            items = tuple((key, str(value)) for key, value in zip(self._INI_KEYS, values) if value is not None)
+            self._ini = (values, (self.SensorName, items))
+        return self._ini[1]
+
+    def _unreal_matrix(self):
+        """
+        The matrix of get_unreal_transform, computed again only when the
+        position or the rotation of the sensor change.
+        """
+        key = (self.PositionX, self.PositionY, self.PositionZ,
+               self.RotationPitch, self.RotationYaw, self.RotationRoll)
+        if self._unreal_transform is None or self._unreal_transform[0] != key:
+            matrix = (self.get_transform() * _TO_UNREAL_TRANSFORM).matrix
+            self._unreal_transform = (key, matrix)
+        return self._unreal_transform[1]
+
+
+_TO_UNREAL_TRANSFORM = Transform(Rotation(roll=-90, yaw=90), Scale(x=-1))
+
+
+class SensorToWorld(object):
+    """
+    Moves points from the frame of a sensor (e.g. the points of
+    image_converter.depth_to_local_point_cloud) to world frame, given the
+    transform of the player each frame. The player transform and the cached
+    unreal transform of the sensor are combined in a single matrix, applied
+    at once to the points.
+    """
+
+    def __init__(self, sensor):
+        self._sensor = sensor
+        self._matrix = numpy.empty((4, 4))
+
+    def matrix(self, player_transform):
+        """
+        Return the 4x4 sensor to world matrix for player_transform, a
+        transform.Transform or the transform of the player measurements. The
+        array is reused by the next call.
+        """
+        if not isinstance(player_transform, Transform):
+            player_transform = Transform(player_transform)
+        return numpy.dot(player_transform.matrix, self._sensor._unreal_matrix(), out=self._matrix)
+
+    def transform_points(self, player_transform, points, out=None):
+        """
+        Return the (N, 3) points moved to world frame, written to out if
+        given (out may be points itself).
+        """
+        return apply_transforms(self.matrix(player_transform), points, out=out)
 
 
 class Camera(Sensor):
@@ -98,13 +299,16 @@ class Camera(Sensor):
     a camera to the player vehicle.
     """
 
+    _FIELDS = Sensor._FIELDS + (
+        Field('PostProcessing', schema.STRING, 'SceneFinal', schema.SENSOR),
+        Field('ImageSizeX', schema.INTEGER, 720, schema.SENSOR),
+        Field('ImageSizeY', schema.INTEGER, 512, schema.SENSOR),
+        Field('FOV', schema.REAL, 90.0, schema.SENSOR))
+
     def __init__(self, name, **kwargs):
         super(Camera, self).__init__(name, sensor_type="CAMERA")
-        self.PostProcessing = 'SceneFinal'
-        self.ImageSizeX = 720
-        self.ImageSizeY = 512
-        self.FOV = 90.0
-        self.set(**kwargs)
+        if kwargs:
+            self._update(kwargs)
 
     def set_image_size(self, pixels_x, pixels_y):
         '''Sets the image size in pixels'''
@@ -118,16 +322,19 @@ class Lidar(Sensor):
     a Lidar to the player vehicle.
     """
 
+    _FIELDS = Sensor._FIELDS + (
+        Field('Channels', schema.INTEGER, 32, schema.SENSOR),
+        Field('Range', schema.REAL, 50.0, schema.SENSOR),
+        Field('PointsPerSecond', schema.INTEGER, 56000, schema.SENSOR),
+        Field('RotationFrequency', schema.REAL, 10.0, schema.SENSOR),
+        Field('UpperFovLimit', schema.REAL, 10.0, schema.SENSOR),
+        Field('LowerFovLimit', schema.REAL, -30.0, schema.SENSOR),
+        Field('ShowDebugPoints', schema.BOOL, False, schema.SENSOR))
+
     def __init__(self, name, **kwargs):
         super(Lidar, self).__init__(name, sensor_type="LIDAR_RAY_CAST")
-        self.Channels = 32
-        self.Range = 50.0
-        self.PointsPerSecond = 56000
-        self.RotationFrequency = 10.0
-        self.UpperFovLimit = 10.0
-        self.LowerFovLimit = -30.0
-        self.ShowDebugPoints = False
-        self.set(**kwargs)
+        if kwargs:
+            self._update(kwargs)
 
 
 # ==============================================================================
@@ -137,13 +344,25 @@ class Lidar(Sensor):
 
 class SensorData(object):
     """Base class for sensor data returned from the server."""
+
+    __slots__ = ('frame_number',)
+
     def __init__(self, frame_number):
         self.frame_number = frame_number
 
 
+# Conversion policies of Image.convert.
+CACHE = 'cache'
+VIEW = 'view'
+RELEASE_RAW = 'release_raw'
+INTO_BUFFER = 'into_buffer'
+
+
 class Image(SensorData):
     """Data generated by a Camera."""
 
+    __slots__ = ('width', 'height', 'type', 'fov', 'raw_data', '_converted_data')
+
     def __init__(self, frame_number, width, height, image_type, fov, raw_data):
         super(Image, self).__init__(frame_number=frame_number)
         assert len(raw_data) == 4 * width * height
@@ -160,20 +379,70 @@ class Image(SensorData):
         Lazy initialization for data property, stores converted data in its
         default format.
         """
-        if self._converted_data is None:
-            from . import image_converter
+        return self.convert(CACHE)
 
-            if self.type == 'Depth':
-                self._converted_data = image_converter.depth_to_array(self)
-            elif self.type == 'SemanticSegmentation':
-                self._converted_data = image_converter.labels_to_array(self)
-            else:
-                self._converted_data = image_converter.to_rgb_array(self)
-        return self._converted_data
+    def convert(self, policy=CACHE, out=None):
+        """
+        Convert the image to its default format, an RGB array for scene
+        images, the labels for semantic segmentation and the normalized depth
+        for depth-maps (see image_converter), following policy:
+
+            CACHE        the converted data is kept with the image, as "data"
+                         does. Holds both the raw and the converted data.
+            VIEW         nothing is kept, the images other than depth-maps
+                         are views of the raw data.
+            RELEASE_RAW  the converted data is copied and kept, the raw data
+                         is dropped (raw_data becomes None). Also detaches the
+                         image from the receive buffers of the client.
+            INTO_BUFFER  the data is written to out, an array of the shape and
+                         a dtype of the converted data, nothing is kept.
+        """
+        if (policy == INTO_BUFFER) != (out is not None):
+            raise ValueError('sensor.Image: out must be given with INTO_BUFFER, and only then')
+        if policy not in (CACHE, VIEW, RELEASE_RAW, INTO_BUFFER):
+            raise ValueError('sensor.Image: unknown conversion policy %r' % policy)
+        array = self._converted_data
+        if array is not None:
+            if out is not None:
+                numpy.copyto(out, array)
+                return out
+            if policy != RELEASE_RAW or self.raw_data is None:
+                return array
+        else:
+            if self.raw_data is None:
+                raise RuntimeError('sensor.Image: raw data released')
+            array = self._convert(out)
+            if out is not None:
+                return array
+        if policy == RELEASE_RAW:
+            # The data cached or just converted may be a view of the raw data
+            # (even a contiguous one), which lives in the receive buffers.
+            if not array.flags.owndata or not array.flags.c_contiguous:
+                array = numpy.array(array, order='C')
+            self.raw_data = None
+        if policy in (CACHE, RELEASE_RAW):
+            self._converted_data = array
+        return array
+
+    def _convert(self, out):
+        from . import image_converter
+
+        if self.type == 'Depth':
+            return image_converter.depth_to_array(self, out=out)
+        if self.type == 'SemanticSegmentation':
+            array = image_converter.labels_to_array(self)
+        else:
+            array = image_converter.to_rgb_array(self)
+        if out is not None:
+            numpy.copyto(out, array)
+            return out
+        return array
 
     def save_to_disk(self, filename):
         """Save this image to disk (requires PIL installed)."""
-        filename = _append_extension(filename, '.png')
+        if self.raw_data is None:
+            raise RuntimeError('sensor.Image: raw data released')
+        filename = append_extension(filename, '.png')
 
         try:
             from PIL import Image as PImage
@@ -198,6 +467,8 @@ class Image(SensorData):
 class PointCloud(SensorData):
     """A list of points."""
 
+    __slots__ = ('_array', '_color_array', '_has_colors')
+
     def __init__(self, frame_number, array, color_array=None):
         super(PointCloud, self).__init__(frame_number=frame_number)
         self._array = array
@@ -235,46 +506,56 @@ class PointCloud(SensorData):
         """Modify the PointCloud instance transforming its points"""
         self._array = transformation.transform_points(self._array)
 
-    def save_to_disk(self, filename):
-        """Save this point-cloud to disk as PLY format."""
-        filename = _append_extension(filename, '.ply')
-
-        def construct_ply_header():
-            """Generates a PLY header given a total number of 3D points and
-            coloring property if specified
-            """
-            points = len(self)  # Total point number
-            header = ['ply',
-                      'format ascii 1.0',
-                      'element vertex {}',
-                      'property float32 x',
-                      'property float32 y',
-                      'property float32 z',
-                      'property uchar diffuse_red',
-                      'property uchar diffuse_green',
-                      'property uchar diffuse_blue',
-                      'end_header']
-            if not self._has_colors:
-                return '\n'.join(header[0:6] + [header[-1]]).format(points)
-            return '\n'.join(header).format(points)
-
-        if not self._has_colors:
-            ply = '\n'.join(['{:.2f} {:.2f} {:.2f}'.format(
-                *p) for p in self._array.tolist()])
+    def voxel_downsample(self, voxel_size, mode='mean'):
+        """
+        Return a new PointCloud with one point per voxel of voxel_size side,
+        the mean of the points of the voxel or the first of them if mode is
+        "first". Colors are averaged the same way. See voxel_grid.downsample.
+        """
+        from . import voxel_grid
+
+        points, colors = voxel_grid.downsample(self._array, voxel_size, mode, self._color_array)
+        return PointCloud(self.frame_number, points, color_array=colors)
+
+    def save_to_disk(self, filename, file_format=PLY_BINARY):
+        """
+        Save this point-cloud to disk. file_format is one of PLY_BINARY
+        (binary little endian PLY), PLY_ASCII or NPZ (compressed NumPy
+        arrays "points" and "colors").
+        """
+        if file_format == NPZ:
+            filename = append_extension(filename, '.npz')
+        elif file_format in (PLY_BINARY, PLY_ASCII):
+            filename = append_extension(filename, '.ply')
         else:
-            points_3d = numpy.concatenate(
-                (self._array, self._color_array), axis=1)
-            ply = '\n'.join(['{:.2f} {:.2f} {:.2f} {:.0f} {:.0f} {:.0f}'
-                             .format(*p) for p in points_3d.tolist()])
+            raise ValueError('sensor.PointCloud: unknown file format %r' % file_format)
 
         # Create folder to save if does not exist.
         folder = os.path.dirname(filename)
         if not os.path.isdir(folder):
             os.makedirs(folder)
 
-        # Open the file and save with the specific PLY format.
-        with open(filename, 'w+') as ply_file:
-            ply_file.write('\n'.join([construct_ply_header(), ply]))
+        if file_format == NPZ:
+            arrays = {'points': self._array}
+            if self._has_colors:
+                arrays['colors'] = self._color_array
+            numpy.savez_compressed(filename, **arrays)
+        elif file_format == PLY_BINARY:
+            _write_binary_ply(filename, self._array, self._color_array)
+        else:
+            _write_ascii_ply(filename, self._array, self._color_array)
+
+    @staticmethod
+    def load_from_disk(filename, frame_number=0):
+        """
+        Load a point-cloud saved with "save_to_disk" in any of its formats,
+        or any PLY file whose first element holds the vertices.
+        """
+        if filename.lower().endswith('.npz'):
+            with numpy.load(filename) as arrays:
+                colors = arrays['colors'] if 'colors' in arrays else None
+                return PointCloud(frame_number, arrays['points'], colors)
+        return PointCloud(frame_number, *_read_ply(filename))
 
     def __len__(self):
         return len(self.array)
@@ -308,7 +589,14 @@ class PointCloud(SensorData):
 
 
 class LidarMeasurement(SensorData):
-    """Data generated by a Lidar."""
+    """
+    Data generated by a Lidar. The points of the point-cloud are grouped by
+    channel (laser), point_count_by_channel gives the number of points of
+    each one.
+    """
+
+    __slots__ = ('horizontal_angle', 'channels', 'point_count_by_channel', 'point_cloud',
+                 '_channel_offsets', '_ring_index')
 
     def __init__(self, frame_number, horizontal_angle, channels, point_count_by_channel, point_cloud):
         super(LidarMeasurement, self).__init__(frame_number=frame_number)
@@ -317,6 +605,36 @@ class LidarMeasurement(SensorData):
         self.channels = channels
         self.point_count_by_channel = point_count_by_channel
         self.point_cloud = point_cloud
+        self._channel_offsets = None
+        self._ring_index = None
+
+    @property
+    def channel_offsets(self):
+        """
+        Array of channels + 1 offsets, the points of channel i are the rows
+        channel_offsets[i]:channel_offsets[i + 1] of the point-cloud.
+        """
+        if self._channel_offsets is None:
+            offsets = numpy.zeros(self.channels + 1, dtype=numpy.intp)
+            numpy.cumsum(self.point_count_by_channel, out=offsets[1:])
+            self._channel_offsets = offsets
+        return self._channel_offsets
+
+    @property
+    def ring_index(self):
+        """uint16 array with the channel of each point."""
+        if self._ring_index is None:
+            self._ring_index = numpy.repeat(
+                numpy.arange(self.channels, dtype=numpy.uint16),
+                numpy.asarray(self.point_count_by_channel, dtype=numpy.intp))
+        return self._ring_index
+
+    def channel(self, index):
+        """The (n, 3) points of a channel, a view of the point-cloud."""
+        if not 0 <= index < self.channels:
+            raise IndexError('sensor.LidarMeasurement: channel %d out of range' % index)
+        offsets = self.channel_offsets
+        return self.point_cloud.array[offsets[index]:offsets[index + 1]]
 
     @property
     def data(self):
@@ -329,6 +647,6 @@ class LidarMeasurement(SensorData):
         """
         return self.point_cloud.array
 
-    def save_to_disk(self, filename):
-        """Save point-cloud to disk as PLY format."""
-        self.point_cloud.save_to_disk(filename)
+    def save_to_disk(self, filename, file_format=PLY_BINARY):
+        """Save point-cloud to disk, see PointCloud.save_to_disk."""
+        self.point_cloud.save_to_disk(filename, file_format)
@@ -0,0 +1,129 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Parsers for the raw sensor data sent by the CARLA server."""
+
+import logging
+import struct
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
+
+from . import sensor
+
+try:
+    from . import carla_server_pb2 as carla_protocol
+except ImportError:
+    raise RuntimeError('cannot import "carla_server_pb2.py", run the protobuf compiler to generate this file')
+
+
+# ==============================================================================
+# -- Registry ------------------------------------------------------------------
+# ==============================================================================
+
+
+_SENSOR_ID = struct.Struct('<L')
+
+_parser_factories = {}
+
+
+def register_sensor_parser(sensor_type, parser_factory):
+    """
+    Register the parser factory for a type of sensor of carla_protocol.Sensor.
+    The factory is called once per sensor each time a scene description is
+    received, with the protobuf sensor description as argument, and must
+    return a function converting the raw data of that sensor to a SensorData.
+    The raw data is a memoryview to the receive buffer.
+    """
+    _parser_factories[sensor_type] = parser_factory
+
+
+class SensorDefinition(object):
+    def __init__(self, s, parse_raw_data):
+        self.id = s.id
+        self.name = s.name
+        self.type = s.type
+        self.parse_raw_data = parse_raw_data
+
+
+def make_sensor_parsers(sensors):
+    """
+    Return a dict of SensorDefinition by sensor id for the sensors of a scene
+    description.
+    """
+    parsers = {}
+    for s in sensors:
+        factory = _parser_factories.get(s.type, None)
+        if factory is None:
+            logging.error('unknown sensor type %s', s.type)
+            parse_raw_data = lambda x: x
+        else:
+            parse_raw_data = factory(s)
+        parsers[s.id] = SensorDefinition(s, parse_raw_data)
+    return parsers
+
+
+def parse_sensor_data(parsers, data):
+    """
+    Parse a sensor message using the parsers returned by make_sensor_parsers.
+    Return a pair with the name of the sensor and its data.
+    """
+    parser = parsers[_SENSOR_ID.unpack_from(data)[0]]
+    return parser.name, parser.parse_raw_data(memoryview(data)[_SENSOR_ID.size:])
+
+
+# ==============================================================================
+# -- Camera --------------------------------------------------------------------
+# ==============================================================================
+
+
+# frame_number, width, height, image_type, fov.
+_IMAGE_HEADER = struct.Struct('<QLLLf')
+
+_IMAGE_TYPES = ['None', 'SceneFinal', 'Depth', 'SemanticSegmentation']
+
+
+def make_image_parser(sensor_description):
+    def parse_image(data):
+        frame_number, width, height, image_type, fov = _IMAGE_HEADER.unpack_from(data)
+        image_type = _IMAGE_TYPES[image_type] if image_type < len(_IMAGE_TYPES) else 'Unknown'
+        return sensor.Image(frame_number, width, height, image_type, fov, data[_IMAGE_HEADER.size:])
+    return parse_image
+
+
+# ==============================================================================
+# -- Lidar ---------------------------------------------------------------------
+# ==============================================================================
+
+
+# frame_number, horizontal_angle, channels.
+_LIDAR_HEADER = struct.Struct('<QfL')
+
+
+def make_lidar_parser(sensor_description):
+    uint32 = numpy.dtype('uint32')
+    float32 = numpy.dtype('f4')
+
+    def parse_lidar(data):
+        frame_number, horizontal_angle, channels = _LIDAR_HEADER.unpack_from(data)
+        point_count_by_channel = numpy.frombuffer(
+            data, dtype=uint32, count=channels, offset=_LIDAR_HEADER.size)
+        points = numpy.frombuffer(
+            data, dtype=float32, offset=_LIDAR_HEADER.size + channels * uint32.itemsize)
+        points = numpy.reshape(points, (-1, 3))
+        return sensor.LidarMeasurement(
+            frame_number,
+            horizontal_angle,
+            channels,
+            point_count_by_channel,
+            sensor.PointCloud(frame_number, points))
+    return parse_lidar
+
+
+register_sensor_parser(carla_protocol.Sensor.CAMERA, make_image_parser)
+register_sensor_parser(carla_protocol.Sensor.LIDAR_RAY_CAST, make_lidar_parser)
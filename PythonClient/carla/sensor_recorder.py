@@ -0,0 +1,253 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Background saving of sensor data to disk."""
+
+import copy
+import logging
+import os
+import struct
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import sensor
+
+
+PNG = 'png'
+JPEG = 'jpeg'
+RAW = 'raw'
+
+_EXTENSIONS = {PNG: '.png', JPEG: '.jpg', RAW: '.raw'}
+
+# Raw container: the file starts with _RAW_MAGIC, followed by one record per
+# image made of a _RAW_RECORD header, frame_number, width, height, image_type,
+# fov, and the BGRA bytes of the image.
+_RAW_MAGIC = b'CARLARAW'
+_RAW_RECORD = struct.Struct('<QLLLf')
+_RAW_IMAGE_TYPES = ['None', 'SceneFinal', 'Depth', 'SemanticSegmentation']
+
+
+def read_raw_images(filename):
+    """Generate the sensor.Image stored in a raw container file."""
+    with open(filename, 'rb') as fd:
+        if fd.read(len(_RAW_MAGIC)) != _RAW_MAGIC:
+            raise ValueError('%s: not a raw image container' % filename)
+        while True:
+            header = fd.read(_RAW_RECORD.size)
+            if len(header) < _RAW_RECORD.size:
+                return
+            frame_number, width, height, image_type, fov = _RAW_RECORD.unpack(header)
+            raw_data = fd.read(4 * width * height)
+            if len(raw_data) < 4 * width * height:
+                logging.warning('%s: truncated image record', filename)
+                return
+            if image_type < len(_RAW_IMAGE_TYPES):
+                image_type = _RAW_IMAGE_TYPES[image_type]
+            else:
+                image_type = 'Unknown'
+            yield sensor.Image(frame_number, width, height, image_type, fov, raw_data)
+
+
+def _raw_image_type(image_type):
+    try:
+        return _RAW_IMAGE_TYPES.index(image_type)
+    except ValueError:
+        return len(_RAW_IMAGE_TYPES)
+
+
+def _make_folder(filename):
+    folder = os.path.dirname(filename)
+    if folder and not os.path.isdir(folder):
+        try:
+            os.makedirs(folder)
+        except OSError:
+            # Another worker may have created it.
+            if not os.path.isdir(folder):
+                raise
+
+
+def _save_image(image, filename, file_format):
+    try:
+        from PIL import Image as PImage
+    except ImportError:
+        raise RuntimeError('cannot import PIL, make sure pillow package is installed')
+    # Read the BGRA bytes as RGB directly, dropping the alpha channel.
+    pil_image = PImage.frombuffer(
+        'RGB', (image.width, image.height), image.raw_data, 'raw', 'BGRX', 0, 1)
+    _make_folder(filename)
+    pil_image.save(filename, format='JPEG' if file_format == JPEG else 'PNG')
+
+
+class SensorRecorder(object):
+    """
+    Saves sensor data to disk in a pool of background threads, so encoding
+    and writing the images does not stall the simulation loop.
+
+    Images are saved in file_format, PNG, JPEG or RAW. With RAW, all the
+    images given the same filename are appended to a single container file,
+    that can be read back with read_raw_images. Other sensor data is saved
+    with its own "save_to_disk".
+
+    At most max_queued items wait to be saved. When the queue is full "save"
+    waits for room if block is True, otherwise the item is dropped. The
+    counters "saved", "dropped", "blocked" (saves that had to wait) and
+    "blocked_seconds" can be read at any time, "queued" gives the number of
+    items waiting.
+
+    Errors occurred while saving are raised by "flush", that waits until
+    everything queued so far is on disk.
+    """
+
+    def __init__(self, file_format=PNG, workers=2, max_queued=16, block=True):
+        if file_format not in _EXTENSIONS:
+            raise ValueError('SensorRecorder: unknown file format %r' % file_format)
+        if workers < 1 or max_queued < 1:
+            raise ValueError('SensorRecorder: workers and max_queued must be positive')
+        self._file_format = file_format
+        self._block = block
+        # One queue per worker, the images of a raw container always go to
+        # the same worker so its records are written in order.
+        self._queues = [queue.Queue(max(1, max_queued // workers)) for _ in range(workers)]
+        self._next_queue = 0
+        self._lock = threading.Lock()
+        self._error = None
+        self.saved = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self._threads = []
+        for index, work_queue in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._run, args=(work_queue,), name='SensorRecorder-%d' % index)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def file_format(self):
+        return self._file_format
+
+    @property
+    def extension(self):
+        """Extension of the files of images, including the dot."""
+        return _EXTENSIONS[self._file_format]
+
+    @property
+    def queued(self):
+        """Number of items waiting to be saved."""
+        return sum(work_queue.qsize() for work_queue in self._queues)
+
+    def save(self, filename, sensor_data):
+        """
+        Queue sensor_data to be saved to filename, the extension of the file
+        format is appended if missing. The data is copied, the receive buffers
+        it refers to can be reused right away. Return False if dropped.
+        """
+        if isinstance(sensor_data, sensor.Image):
+            filename = sensor.append_extension(filename, self.extension)
+            sensor_data = sensor.Image(
+                sensor_data.frame_number,
+                sensor_data.width,
+                sensor_data.height,
+                sensor_data.type,
+                sensor_data.fov,
+                bytes(sensor_data.raw_data))
+        else:
+            sensor_data = copy.deepcopy(sensor_data)
+        if self._file_format == RAW:
+            work_queue = self._queues[hash(filename) % len(self._queues)]
+        else:
+            work_queue = self._queues[self._next_queue]
+            self._next_queue = (self._next_queue + 1) % len(self._queues)
+        item = (filename, sensor_data)
+        try:
+            work_queue.put_nowait(item)
+        except queue.Full:
+            if not self._block:
+                with self._lock:
+                    self.dropped += 1
+                return False
+            start = time.time()
+            work_queue.put(item)
+            with self._lock:
+                self.blocked += 1
+                self.blocked_seconds += time.time() - start
+        return True
+
+    def flush(self):
+        """
+        Wait until every queued item is saved and close the raw containers.
+        Raise the first error occurred since the last flush, if any.
+        """
+        for work_queue in self._queues:
+            work_queue.put(None)
+        for work_queue in self._queues:
+            work_queue.join()
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Flush and stop the worker threads."""
+        try:
+            self.flush()
+        finally:
+            for work_queue in self._queues:
+                work_queue.put(False)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def _run(self, work_queue):
+        containers = {}
+        while True:
+            item = work_queue.get()
+            try:
+                if item is None or item is False:
+                    for fd in containers.values():
+                        fd.close()
+                    containers.clear()
+                    if item is False:
+                        return
+                    continue
+                self._save(containers, *item)
+                with self._lock:
+                    self.saved += 1
+            except Exception as exception:
+                logging.error('failed to save sensor data: %s', exception)
+                with self._lock:
+                    if self._error is None:
+                        self._error = exception
+            finally:
+                work_queue.task_done()
+
+    def _save(self, containers, filename, sensor_data):
+        if not isinstance(sensor_data, sensor.Image):
+            sensor_data.save_to_disk(filename)
+        elif self._file_format == RAW:
+            fd = containers.get(filename, None)
+            if fd is None:
+                _make_folder(filename)
+                new_file = not os.path.exists(filename)
+                fd = open(filename, 'ab')
+                if new_file:
+                    fd.write(_RAW_MAGIC)
+                containers[filename] = fd
+            fd.write(_RAW_RECORD.pack(
+                sensor_data.frame_number,
+                sensor_data.width,
+                sensor_data.height,
+                _raw_image_type(sensor_data.type),
+                sensor_data.fov))
+            fd.write(sensor_data.raw_data)
+        else:
+            _save_image(sensor_data, filename, self._file_format)
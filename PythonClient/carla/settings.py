@@ -6,53 +6,59 @@
 
 """CARLA Settings"""
 
-import io
+import collections
 import random
-import sys
-
-
-if sys.version_info >= (3, 0):
-
-    from configparser import ConfigParser
-
-else:
-
-    from ConfigParser import RawConfigParser as ConfigParser
 
 
+from . import schema
 from . import sensor as carla_sensor
+from .schema import Field
 
 
 MAX_NUMBER_OF_WEATHER_IDS = 14
 
 
-class CarlaSettings(object):
+class CarlaSettings(schema.Declared):
     """
     The CarlaSettings object controls the settings of an episode.  The __str__
     method retrieves an str with a CarlaSettings.ini file contents.
     """
 
+    _FIELDS = (
+        Field('SynchronousMode', schema.BOOL, True, 'CARLA/Server'),
+        Field('SendNonPlayerAgentsInfo', schema.BOOL, False, 'CARLA/Server'),
+        Field('QualityLevel', schema.STRING, 'Epic', 'CARLA/QualitySettings'),
+        Field('PlayerVehicle', schema.STRING, None, None),
+        Field('NumberOfVehicles', schema.INTEGER, 20, 'CARLA/LevelSettings'),
+        Field('NumberOfPedestrians', schema.INTEGER, 30, 'CARLA/LevelSettings'),
+        Field('WeatherId', schema.INTEGER, 1, 'CARLA/LevelSettings'),
+        Field('SeedVehicles', schema.INTEGER, None, 'CARLA/LevelSettings'),
+        Field('SeedPedestrians', schema.INTEGER, None, 'CARLA/LevelSettings'),
+        Field('DisableTwoWheeledVehicles', schema.BOOL, False, 'CARLA/LevelSettings'))
+
+    # The slots of the fields are added by schema.Declared.
+    __slots__ = ('_sensors', '_ini')
+
     def __init__(self, **kwargs):
-        # [CARLA/Server]
-        self.SynchronousMode = True
-        self.SendNonPlayerAgentsInfo = False
-        # [CARLA/QualitySettings]
-        self.QualityLevel = 'Epic'
-        # [CARLA/LevelSettings]
-        self.PlayerVehicle = None
-        self.NumberOfVehicles = 20
-        self.NumberOfPedestrians = 30
-        self.WeatherId = 1
-        self.SeedVehicles = None
-        self.SeedPedestrians = None
-        self.DisableTwoWheeledVehicles = False
-        self.set(**kwargs)
+        schema.set_defaults(self)
         self._sensors = []
+        self._ini = None
+        if kwargs:
+            self._update(kwargs)
 
     def set(self, **kwargs):
-        for key, value in kwargs.items():
-            if not hasattr(self, key):
-                raise ValueError('CarlaSettings: no key named %r' % key)
+        """Set settings by name, values are type-checked but not converted."""
+        self._update(kwargs)
+
+    def _update(self, values):
+        exact_types = self._EXACT_TYPES
+        for key, value in values.items():
+            if type(value) not in exact_types.get(key, ()):
+                field = self._FIELD_INDEX.get(key, None)
+                if field is not None:
+                    schema.check(CarlaSettings, field, value)
+                elif not hasattr(self, key):
+                    raise ValueError('CarlaSettings: no key named %r' % key)
             setattr(self, key, value)
 
     def randomize_seeds(self):
@@ -75,47 +81,44 @@ class CarlaSettings(object):
 
     def __str__(self):
         """Converts this object to an INI formatted string."""
-        ini = ConfigParser()
-        ini.optionxform = str
-        S_SERVER = 'CARLA/Server'
-        S_QUALITY = 'CARLA/QualitySettings'
-        S_LEVEL = 'CARLA/LevelSettings'
-        S_SENSOR = 'CARLA/Sensor'
-
-        def get_attribs(obj):
-            return [a for a in dir(obj) if not a.startswith('_') and not callable(getattr(obj, a))]
-
-        def add_section(section, obj, keys):
-            for key in keys:
-                if hasattr(obj, key) and getattr(obj, key) is not None:
-                    if not ini.has_section(section):
-                        ini.add_section(section)
-                    ini.set(section, key, str(getattr(obj, key)))
-
-        add_section(S_SERVER, self, [
-            'SynchronousMode',
-            'SendNonPlayerAgentsInfo'])
-        add_section(S_QUALITY, self, [
-            'QualityLevel'])
-        add_section(S_LEVEL, self, [
-            'NumberOfVehicles',
-            'NumberOfPedestrians',
-            'WeatherId',
-            'SeedVehicles',
-            'SeedPedestrians',
-            'DisableTwoWheeledVehicles'])
-
-        ini.add_section(S_SENSOR)
-        ini.set(S_SENSOR, 'Sensors', ','.join(s.SensorName for s in self._sensors))
-
-        for sensor_def in self._sensors:
-            section = S_SENSOR + '/' + sensor_def.SensorName
-            add_section(section, sensor_def, get_attribs(sensor_def))
-
-        if sys.version_info >= (3, 0):
-            text = io.StringIO()
-        else:
-            text = io.BytesIO()
-
-        ini.write(text)
-        return text.getvalue().replace(' = ', '=')
+        # The text is kept until a setting changes, or a sensor section.
+        sensor_sections = tuple(sensor_def._ini_section() for sensor_def in self._sensors)
+        values = self._INI_VALUES(self) + sensor_sections
+        if self._ini is None or not schema.same_values(values, self._ini[0]):
+            self._ini = (values, self._write_ini(sensor_sections))
+        return self._ini[1]
+
+    def _write_ini(self, sensor_sections):
+        """
+        Write the INI text as ConfigParser would: sections in order of
+        addition, keys set twice in a section keep their first position, and
+        options with None values are skipped.
+        """
+        sections = []
+
+        def add_section(section, items):
+            for index, (name, options) in enumerate(sections):
+                if name == section:
+                    options = collections.OrderedDict(options)
+                    options.update(items)
+                    sections[index] = (section, list(options.items()))
+                    return
+            if items:
+                sections.append((section, items))
+
+        def items_of(keys):
+            return [(key, str(getattr(self, key))) for key in keys if getattr(self, key) is not None]
+
+        for section, keys in self._INI_PLAN:
+            add_section(section, items_of(keys))
+        sections.append((schema.SENSOR, [('Sensors', ','.join(s.SensorName for s in self._sensors))]))
+        for name, items in sensor_sections:
+            add_section(schema.SENSOR + '/' + name, list(items))
+
+        lines = []
+        for section, items in sections:
+            lines.append('[%s]\n' % section)
+            for key, value in items:
+                lines.append('%s = %s\n' % (key, value.replace('\n', '\n\t')))
+            lines.append('\n')
+        return ''.join(lines).replace(' = ', '=')
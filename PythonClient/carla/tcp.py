@@ -11,10 +11,52 @@ import socket
 import struct
 import time
 
+
+# Not available on Windows.
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
+
 class TCPConnectionError(Exception):
     pass
 
 
+class BufferPool(object):
+    """
+    Pool of reusable receive buffers. Buffers handed out by "acquire" are
+    recycled once given back with "release". A buffer too small for a request
+    is replaced rather than resized, since views to it may still be alive.
+
+    New buffers get some headroom and are rounded up to whole pages, so
+    messages whose size changes slightly between frames fit in the buffers of
+    the previous frame.
+    """
+
+    PAGE_SIZE = 4096
+
+    def __init__(self):
+        self._free = []
+        self.allocations = 0
+
+    def acquire(self, size):
+        """Return a bytearray of at least size bytes."""
+        best = None
+        for index, buf in enumerate(self._free):
+            if len(buf) >= size and (best is None or len(buf) < len(self._free[best])):
+                best = index
+        if best is not None:
+            return self._free.pop(best)
+        if self._free:
+            # Drop the largest free buffer, it is going to be replaced anyway.
+            self._free.remove(max(self._free, key=len))
+        self.allocations += 1
+        capacity = size + size // 8 + self.PAGE_SIZE - 1
+        return bytearray(capacity - capacity % self.PAGE_SIZE)
+
+    def release(self, buf):
+        """Give back a buffer obtained with "acquire"."""
+        self._free.append(buf)
+
+
 class TCPClient(object):
     """
     Basic networking client for TCP connections. Errors occurred during
@@ -22,35 +64,75 @@ class TCPClient(object):
 
     Received messages are expected to be prepended by a int32 defining the
     message size. Messages are sent following this convention.
+
+    If a BufferPool is given, messages read with "read_view" are received into
+    buffers of the pool; these are given back to the pool on
+    "recycle_buffers", after which the views previously returned must not be
+    used anymore.
+
+    If low_latency is True, Nagle's algorithm is disabled (TCP_NODELAY) so
+    small messages are sent right away. receive_buffer_size and
+    send_buffer_size set the kernel socket buffers (SO_RCVBUF and SO_SNDBUF)
+    before connecting, None keeps the system default (and on Linux its
+    autotuning).
     """
 
-    def __init__(self, host, port, timeout):
+    def __init__(self, host, port, timeout, buffer_pool=None, low_latency=False,
+                 receive_buffer_size=None, send_buffer_size=None):
         self._host = host
         self._port = port
         self._timeout = timeout
         self._socket = None
         self._logprefix = '(%s:%s) ' % (self._host, self._port)
+        self._buffer_pool = buffer_pool
+        self._outstanding_buffers = []
+        self._header = bytearray(4)
+        self._low_latency = low_latency
+        self._receive_buffer_size = receive_buffer_size
+        self._send_buffer_size = send_buffer_size
+
+    def connect(self, connection_attempts=10, retry_delay=1.0, max_retry_delay=1.0, deadline=None):
+        """
+        Try to establish a connection to the given host:port.
 
-    def connect(self, connection_attempts=10):
-        """Try to establish a connection to the given host:port."""
+        Failed attempts are retried after retry_delay seconds, doubling the
+        delay after each failure up to max_retry_delay. No more attempts are
+        made after connection_attempts attempts or, if given, once deadline
+        seconds passed since the first one.
+        """
         connection_attempts = max(1, connection_attempts)
+        start = time.time()
+        delay = retry_delay
         error = None
         for attempt in range(1, connection_attempts + 1):
+            timeout = self._timeout
+            if deadline is not None:
+                timeout = max(0.001, min(timeout, start + deadline - time.time()))
             try:
-                self._socket = socket.create_connection(address=(self._host, self._port), timeout=self._timeout)
+                self._socket = self._create_connection(timeout)
                 self._socket.settimeout(self._timeout)
                 logging.debug('%sconnected', self._logprefix)
                 return
             except socket.error as exception:
                 error = exception
                 logging.debug('%sconnection attempt %d: %s', self._logprefix, attempt, error)
-                time.sleep(1)
+            if attempt == connection_attempts:
+                break
+            if deadline is not None and time.time() + delay > start + deadline:
+                break
+            time.sleep(delay)
+            delay = min(2.0 * delay, max_retry_delay)
         self._reraise_exception_as_tcp_error('failed to connect', error)
 
     def disconnect(self):
         """Disconnect any active connection."""
         if self._socket is not None:
             logging.debug('%sdisconnecting', self._logprefix)
+            try:
+                # Wake up any thread blocked reading from this socket.
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
             self._socket.close()
             self._socket = None
 
@@ -64,34 +146,105 @@ class TCPClient(object):
             raise TCPConnectionError(self._logprefix + 'not connected')
         header = struct.pack('<L', len(message))
         try:
-            self._socket.sendall(header + message)
+            if _HAS_SENDMSG:
+                self._send_buffers([header, message])
+            else:
+                self._socket.sendall(header + message)
         except socket.error as exception:
             self._reraise_exception_as_tcp_error('failed to write data', exception)
 
     def read(self):
         """Read a message from the server."""
-        header = self._read_n(4)
-        if not header:
-            raise TCPConnectionError(self._logprefix + 'connection closed')
-        length = struct.unpack('<L', header)[0]
-        data = self._read_n(length)
-        return data
-
-    def _read_n(self, length):
-        """Read n bytes from the socket."""
-        if self._socket is None:
-            raise TCPConnectionError(self._logprefix + 'not connected')
-        buf = bytes()
-        while length > 0:
+        buf = bytearray(self._read_header())
+        self._read_into(memoryview(buf))
+        return bytes(buf)
+
+    def read_view(self):
+        """
+        Read a message from the server and return a memoryview to it. The
+        message is received in place, without intermediate copies.
+        """
+        length = self._read_header()
+        if self._buffer_pool is None:
+            buf = bytearray(length)
+        else:
+            buf = self._buffer_pool.acquire(length)
+            self._outstanding_buffers.append(buf)
+        view = memoryview(buf)[:length]
+        self._read_into(view)
+        return view
+
+    def recycle_buffers(self):
+        """
+        Give back to the pool the buffers of every message read since the last
+        call. Views returned by "read_view" are invalidated.
+        """
+        if self._buffer_pool is not None:
+            for buf in self._outstanding_buffers:
+                self._buffer_pool.release(buf)
+        self._outstanding_buffers = []
+
+    def _create_connection(self, timeout):
+        """
+        Connect a new socket as socket.create_connection does, but with its
+        options set before connecting: the window scale is negotiated in the
+        handshake from the receive buffer size.
+        """
+        error = None
+        for family, socktype, proto, _, address in socket.getaddrinfo(
+                self._host, self._port, 0, socket.SOCK_STREAM):
+            sock = socket.socket(family, socktype, proto)
+            try:
+                self._configure_socket(sock)
+                sock.settimeout(timeout)
+                sock.connect(address)
+                return sock
+            except socket.error as exception:
+                error = exception
+                sock.close()
+        raise error if error is not None else socket.error('getaddrinfo returns an empty list')
+
+    def _configure_socket(self, sock):
+        if self._low_latency:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Only if asked for, on Linux a fixed receive buffer size disables the
+        # autotuning of the kernel.
+        if self._receive_buffer_size is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._receive_buffer_size)
+        if self._send_buffer_size is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self._send_buffer_size)
+
+    def _send_buffers(self, buffers):
+        """Send the buffers with scatter/gather writes, without joining them."""
+        views = [memoryview(x) for x in buffers if len(x) > 0]
+        while views:
+            sent = self._socket.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            if sent > 0:
+                views[0] = views[0][sent:]
+
+    def _read_header(self):
+        """Read the size of the next message."""
+        self._read_into(memoryview(self._header))
+        return struct.unpack('<L', self._header)[0]
+
+    def _read_into(self, view):
+        """Fill view with bytes read from the socket."""
+        while view:
+            # Checked on every read, another thread may disconnect meanwhile
+            # (a closed socket fails to read).
+            sock = self._socket
+            if sock is None:
+                raise TCPConnectionError(self._logprefix + 'not connected')
             try:
-                data = self._socket.recv(length)
+                received = sock.recv_into(view)
             except socket.error as exception:
                 self._reraise_exception_as_tcp_error('failed to read data', exception)
-            if not data:
+            if not received:
                 raise TCPConnectionError(self._logprefix + 'connection closed')
-            buf += data
-            length -= len(data)
-        return buf
+            view = view[received:]
 
     def _reraise_exception_as_tcp_error(self, message, exception):
         raise TCPConnectionError('%s%s: %s' % (self._logprefix, message, exception))
@@ -31,6 +31,83 @@ Scale = namedtuple('Scale', 'x y z')
 Scale.__new__.__defaults__ = (1.0, 1.0, 1.0)
 
 
+def transform_matrices(translation=None, rotation=None, scale=None, out=None):
+    """
+    Build a stack of 4x4 transformation matrices, one per row of the (N, 3)
+    arrays of translations (x, y, z), rotations in degrees (pitch, yaw, roll)
+    and scales (x, y, z). Missing arrays default to the identity, and single
+    rows are broadcast to the rest. Return an (N, 4, 4) array, written to out
+    if given.
+    """
+    arrays = [numpy.asarray(a, dtype=numpy.float64) for a in (translation, rotation, scale) if a is not None]
+    counts = [len(a) for a in arrays if a.ndim > 1]
+    count = max(counts) if counts else 1
+    if out is None:
+        out = numpy.empty((count, 4, 4))
+    out[:, 3, :3] = 0.0
+    out[:, 3, 3] = 1.0
+    out[:, :3, 3] = 0.0 if translation is None else translation
+    if rotation is None:
+        out[:, :3, :3] = numpy.identity(3)
+    else:
+        radians = numpy.radians(numpy.asarray(rotation, dtype=numpy.float64).reshape(-1, 3))
+        cp, cy, cr = numpy.cos(radians).T
+        sp, sy, sr = numpy.sin(radians).T
+        out[:, 0, 0] = cp * cy
+        out[:, 0, 1] = cy * sp * sr - sy * cr
+        out[:, 0, 2] = -(cy * sp * cr + sy * sr)
+        out[:, 1, 0] = sy * cp
+        out[:, 1, 1] = sy * sp * sr + cy * cr
+        out[:, 1, 2] = cy * sr - sy * sp * cr
+        out[:, 2, 0] = sp
+        out[:, 2, 1] = -(cp * sr)
+        out[:, 2, 2] = cp * cr
+    if scale is not None:
+        # Scaling first, i.e. scaling the columns of the rotation.
+        out[:, :3, :3] *= numpy.asarray(scale, dtype=numpy.float64).reshape(-1, 1, 3)
+    return out
+
+
+def compose(first, second, out=None):
+    """
+    Compose (..., 4, 4) transformation matrices, broadcasting. The result
+    applies second and then first, as first * second does with Transforms.
+    """
+    return numpy.matmul(first, second, out=out)
+
+
+def apply_transforms(matrices, points, out=None):
+    """
+    Apply a 4x4 transformation matrix to an (N, 3) array of points, or a
+    stack of them to a stack of (..., N, 3) arrays, as points * R^T + t
+    without building homogeneous coordinates. out may be points itself to
+    transform them in place.
+    """
+    matrices = numpy.asarray(matrices)
+    rotation = numpy.swapaxes(matrices[..., :3, :3], -1, -2)
+    translation = matrices[..., numpy.newaxis, :3, 3]
+    out = numpy.matmul(points, rotation, out=out)
+    out += translation
+    return out
+
+
+def rigid_inverses(matrices, out=None):
+    """
+    Invert (..., 4, 4) rigid transformation matrices, i.e. without scaling
+    other than mirroring, as [R^T | -R^T t]. out may be matrices itself.
+    """
+    matrices = numpy.asarray(matrices)
+    rotation = numpy.swapaxes(matrices[..., :3, :3], -1, -2)
+    translation = -numpy.matmul(rotation, matrices[..., :3, 3, numpy.newaxis])
+    if out is None:
+        out = numpy.empty(matrices.shape)
+    out[..., :3, :3] = rotation
+    out[..., :3, 3] = translation[..., 0]
+    out[..., 3, :3] = 0.0
+    out[..., 3, 3] = 1.0
+    return out
+
+
 class Transform(object):
     """A 3D transformation.
 
@@ -39,7 +116,7 @@ class Transform(object):
 
     def __init__(self, *args, **kwargs):
         if 'matrix' in kwargs:
-            self.matrix = kwargs['matrix']
+            self.matrix = numpy.asarray(kwargs['matrix'], dtype=numpy.float64)
             return
         if isinstance(args[0], carla_protocol.Transform):
             args = [
@@ -52,7 +129,6 @@ class Transform(object):
                     args[0].rotation.yaw,
                     args[0].rotation.roll)
             ]
-        self.matrix = numpy.matrix(numpy.identity(4))
         self.set(*args, **kwargs)
 
     def set(self, *args):
@@ -91,44 +167,40 @@ class Transform(object):
                     "'" + str(type(param)) + "' type not match with \
                     'Translation', 'Rotation' or 'Scale'")
 
-        # Transformation matrix
-        cy = math.cos(numpy.radians(rotation.yaw))
-        sy = math.sin(numpy.radians(rotation.yaw))
-        cr = math.cos(numpy.radians(rotation.roll))
-        sr = math.sin(numpy.radians(rotation.roll))
-        cp = math.cos(numpy.radians(rotation.pitch))
-        sp = math.sin(numpy.radians(rotation.pitch))
-        self.matrix[0, 3] = translation.x
-        self.matrix[1, 3] = translation.y
-        self.matrix[2, 3] = translation.z
-        self.matrix[0, 0] = scale.x * (cp * cy)
-        self.matrix[0, 1] = scale.y * (cy * sp * sr - sy * cr)
-        self.matrix[0, 2] = -scale.z * (cy * sp * cr + sy * sr)
-        self.matrix[1, 0] = scale.x * (sy * cp)
-        self.matrix[1, 1] = scale.y * (sy * sp * sr + cy * cr)
-        self.matrix[1, 2] = scale.z * (cy * sr - sy * sp * cr)
-        self.matrix[2, 0] = scale.x * (sp)
-        self.matrix[2, 1] = -scale.y * (cp * sr)
-        self.matrix[2, 2] = scale.z * (cp * cr)
+        # Transformation matrix, same as transform_matrices but faster for a
+        # single one.
+        cy = math.cos(math.radians(rotation.yaw))
+        sy = math.sin(math.radians(rotation.yaw))
+        cr = math.cos(math.radians(rotation.roll))
+        sr = math.sin(math.radians(rotation.roll))
+        cp = math.cos(math.radians(rotation.pitch))
+        sp = math.sin(math.radians(rotation.pitch))
+        self.matrix = numpy.array([
+            [scale.x * (cp * cy), scale.y * (cy * sp * sr - sy * cr), -scale.z * (cy * sp * cr + sy * sr),
+             translation.x],
+            [scale.x * (sy * cp), scale.y * (sy * sp * sr + cy * cr), scale.z * (cy * sr - sy * sp * cr),
+             translation.y],
+            [scale.x * sp, -scale.y * (cp * sr), scale.z * (cp * cr), translation.z],
+            [0.0, 0.0, 0.0, 1.0]])
 
     def inverse(self):
         """Return the inverse transform."""
         return Transform(matrix=numpy.linalg.inv(self.matrix))
 
-    def transform_points(self, points):
+    def rigid_inverse(self):
+        """
+        Return the inverse transform, faster than "inverse" but only valid if
+        there is no scaling other than mirroring (see rigid_inverses).
+        """
+        return Transform(matrix=rigid_inverses(self.matrix))
+
+    def transform_points(self, points, out=None):
         """
-        Given a 4x4 transformation matrix, transform an array of 3D points.
-        Expected point foramt: [[X0,Y0,Z0],..[Xn,Yn,Zn]]
+        Transform an array of 3D points, returns a new array unless out is
+        given (out may be points itself).
+        Expected point format: [[X0,Y0,Z0],..[Xn,Yn,Zn]]
         """
-        # Needed foramt: [[X0,..Xn],[Z0,..Zn],[Z0,..Zn]]. So let's transpose
-        # the point matrix.
-        points = points.transpose()
-        # Add 0s row: [[X0..,Xn],[Y0..,Yn],[Z0..,Zn],[0,..0]]
-        points = numpy.append(points, numpy.ones((1, points.shape[1])), axis=0)
-        # Point transformation
-        points = self.matrix * points
-        # Return all but last row
-        return points[0:3].transpose()
+        return apply_transforms(self.matrix, points, out=out)
 
     def __mul__(self, other):
         return Transform(matrix=numpy.dot(self.matrix, other.matrix))
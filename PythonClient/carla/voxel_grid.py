@@ -0,0 +1,188 @@
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Voxel-grid downsampling and accumulation of point-clouds."""
+
+try:
+    import numpy
+except ImportError:
+    raise RuntimeError('cannot import numpy, make sure numpy package is installed.')
+
+from . import sensor
+
+
+MEAN = 'mean'
+FIRST = 'first'
+
+# Voxel coordinates are packed in an int64 key, 21 bits per axis.
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+
+
+def voxel_keys(points, voxel_size):
+    """
+    Return the int64 key of the voxel of each of the (N, 3) points, voxels
+    are cubes of voxel_size side aligned with the origin. Keys are unique
+    for voxels within 2^20 voxels from the origin on each axis.
+    """
+    voxels = numpy.floor(numpy.asarray(points) * (1.0 / voxel_size)).astype(numpy.int64)
+    voxels += _KEY_OFFSET
+    keys = voxels[:, 0] << (2 * _KEY_BITS)
+    keys |= voxels[:, 1] << _KEY_BITS
+    keys |= voxels[:, 2]
+    return keys
+
+
+def _voxel_sums(keys, points, colors):
+    """
+    Return the sorted unique keys, and the sum of the points, the number of
+    points and the sum of the colors (None if no colors) of each voxel.
+    """
+    keys, index, inverse, counts = numpy.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    sums = numpy.empty((len(keys), 3))
+    for axis in range(3):
+        sums[:, axis] = numpy.bincount(inverse, weights=points[:, axis], minlength=len(keys))
+    color_sums = None
+    if colors is not None:
+        color_sums = numpy.empty((len(keys), 3))
+        for channel in range(3):
+            color_sums[:, channel] = numpy.bincount(inverse, weights=colors[:, channel], minlength=len(keys))
+    return keys, index, sums, counts, color_sums
+
+
+def _average_colors(color_sums, counts):
+    return numpy.round(color_sums / counts[:, numpy.newaxis]).astype(numpy.uint8)
+
+
+def downsample(points, voxel_size, mode=MEAN, colors=None):
+    """
+    Downsample (N, 3) points keeping one per voxel, either the MEAN of the
+    points of the voxel or the FIRST of them. If given, the (N, 3) colors of
+    the points are averaged the same way, FIRST keeps the color of the point
+    kept. Return the points and colors (None if no colors given), sorted by
+    voxel.
+    """
+    if mode not in (MEAN, FIRST):
+        raise ValueError('voxel_grid: unknown mode %r' % mode)
+    points = numpy.asarray(points)
+    if mode == FIRST:
+        _, index = numpy.unique(voxel_keys(points, voxel_size), return_index=True)
+        return points[index], None if colors is None else colors[index]
+    _, _, sums, counts, color_sums = _voxel_sums(voxel_keys(points, voxel_size), points, colors)
+    points = sums / counts[:, numpy.newaxis]
+    return points, None if colors is None else _average_colors(color_sums, counts)
+
+
+def _merge(old, new, is_new):
+    merged = numpy.empty((len(is_new),) + old.shape[1:], dtype=old.dtype)
+    merged[is_new] = new
+    merged[~is_new] = old
+    return merged
+
+
+class VoxelMap(object):
+    """
+    A map accumulating point-clouds in world frame, holding the mean point
+    (and color) of each voxel of voxel_size side seen.
+
+    Voxels not seen in the last max_age frames are evicted, and if the map
+    grows beyond max_voxels the least recently seen ones are evicted too.
+    Each call to "add" counts as a frame.
+    """
+
+    def __init__(self, voxel_size=0.1, max_voxels=2000000, max_age=None):
+        self.voxel_size = voxel_size
+        self.max_voxels = max_voxels
+        self.max_age = max_age
+        self._frame = 0
+        # Sorted keys and per voxel data, in the same order.
+        self._keys = numpy.empty(0, dtype=numpy.int64)
+        self._sums = numpy.empty((0, 3))
+        self._counts = numpy.empty(0, dtype=numpy.int64)
+        self._color_sums = None
+        self._last_seen = numpy.empty(0, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def points(self):
+        """(N, 3) array of the mean point of each voxel."""
+        return self._sums / self._counts[:, numpy.newaxis]
+
+    @property
+    def colors(self):
+        """(N, 3) uint8 array of the mean color of each voxel, None without colors."""
+        if self._color_sums is None:
+            return None
+        return _average_colors(self._color_sums, self._counts)
+
+    def add(self, point_cloud, transform=None):
+        """
+        Merge a sensor.PointCloud into the map, transformed to world frame by
+        transform if given. Colors are kept only if every cloud has them.
+        """
+        points = point_cloud.array
+        if transform is not None:
+            points = transform.transform_points(points)
+        points = numpy.asarray(points, dtype=numpy.float64)
+        colors = point_cloud.color_array if point_cloud.has_colors() else None
+        if colors is None or (self._color_sums is None and len(self._keys) > 0):
+            self._color_sums = None
+            colors = None
+        elif self._color_sums is None:
+            self._color_sums = numpy.empty((0, 3))
+        self._frame += 1
+
+        keys, _, sums, counts, color_sums = _voxel_sums(voxel_keys(points, self.voxel_size), points, colors)
+        position = numpy.searchsorted(self._keys, keys)
+        found = position < len(self._keys)
+        found[found] = self._keys[position[found]] == keys[found]
+        # Voxels already in the map, keys are unique so there are no
+        # repeated positions.
+        old = position[found]
+        self._sums[old] += sums[found]
+        self._counts[old] += counts[found]
+        self._last_seen[old] = self._frame
+        if colors is not None:
+            self._color_sums[old] += color_sums[found]
+        # New voxels, inserted keeping the keys sorted: the i-th new voxel
+        # goes before the voxel at its position in the map, i places later.
+        new = ~found
+        is_new = numpy.zeros(len(self._keys) + numpy.count_nonzero(new), dtype=bool)
+        is_new[position[new] + numpy.arange(numpy.count_nonzero(new))] = True
+        self._keys = _merge(self._keys, keys[new], is_new)
+        self._sums = _merge(self._sums, sums[new], is_new)
+        self._counts = _merge(self._counts, counts[new], is_new)
+        self._last_seen = _merge(self._last_seen, self._frame, is_new)
+        if colors is not None:
+            self._color_sums = _merge(self._color_sums, color_sums[new], is_new)
+        self._evict()
+
+    def to_point_cloud(self, frame_number=0):
+        """The map as a sensor.PointCloud."""
+        return sensor.PointCloud(frame_number, self.points, color_array=self.colors)
+
+    def _evict(self):
+        keep = None
+        if self.max_age is not None:
+            keep = self._last_seen > self._frame - self.max_age
+        if len(self._keys) - (0 if keep is None else numpy.count_nonzero(~keep)) > self.max_voxels:
+            last_seen = self._last_seen if keep is None else numpy.where(keep, self._last_seen, -1)
+            # The max_voxels most recently seen.
+            newest = numpy.argpartition(-last_seen, self.max_voxels - 1)[:self.max_voxels]
+            keep = numpy.zeros(len(self._keys), dtype=bool)
+            keep[newest] = True
+        if keep is None or keep.all():
+            return
+        self._keys = self._keys[keep]
+        self._sums = self._sums[keep]
+        self._counts = self._counts[keep]
+        self._last_seen = self._last_seen[keep]
+        if self._color_sums is not None:
+            self._color_sums = self._color_sums[keep]
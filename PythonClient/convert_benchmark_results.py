@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Convert the recording of a driving benchmark to a memory-mapped dataset."""
+
+from __future__ import print_function
+
+import argparse
+import logging
+
+from carla import dataset
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        'results',
+        help='folder of the benchmark recording, e.g. _benchmarks_results/Test')
+    argparser.add_argument(
+        'output',
+        help='folder to write the dataset to')
+    argparser.add_argument(
+        '--sensor-type',
+        metavar='NAME=TYPE',
+        action='append',
+        default=[],
+        help='image type of a sensor, e.g. CameraDepth=Depth (default: SceneFinal)')
+    argparser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='print debug information')
+    args = argparser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=log_level)
+
+    sensor_types = dict(item.split('=', 1) for item in args.sensor_type)
+    frames = dataset.convert_benchmark_results(args.results, args.output, sensor_types)
+    data = dataset.Dataset(args.output)
+    logging.info('converted %d frames of %d episodes, sensors: %s',
+                 frames, len(data.episodes), ', '.join(data.sensors))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -38,6 +38,11 @@ if __name__ == '__main__':
         default=2000,
         type=int,
         help='TCP port to listen to (default: 2000)')
+    argparser.add_argument(
+        '--servers',
+        metavar='H:P,H:P',
+        default=None,
+        help='run the episodes in parallel on these servers instead of host:port')
     argparser.add_argument(
         '-c', '--city-name',
         metavar='C',
@@ -86,7 +91,12 @@ if __name__ == '__main__':
                ' python driving_benchmark_example.py --corl-2017')
         experiment_suite = BasicExperimentSuite(args.city_name)
 
+    servers = None
+    if args.servers:
+        servers = [(server.split(':')[0], int(server.split(':')[1]))
+                   for server in args.servers.split(',')]
+
     # Now actually run the driving_benchmark
     run_driving_benchmark(agent, experiment_suite, args.city_name,
                           args.log_name, args.continue_experiment,
-                          args.host, args.port)
+                          args.host, args.port, servers)
@@ -56,6 +56,8 @@ except ImportError:
     raise RuntimeError('cannot import numpy, make sure numpy package is installed')
 
 from carla import image_converter
+from carla import lidar_converter
+from carla import measurements as carla_measurements
 from carla import sensor
 from carla.client import make_carla_client, VehicleControl
 from carla.planner.map import CarlaMap
@@ -138,10 +140,13 @@ class CarlaGame(object):
         self._timer = None
         self._display = None
         self._main_image = None
+        self._main_image_buffer = None
         self._mini_view_image1 = None
         self._mini_view_image2 = None
         self._enable_autopilot = args.autopilot
         self._lidar_measurement = None
+        # 200x200 pixels of 0.5 meters.
+        self._lidar_view = lidar_converter.BirdEyeView(size=200, resolution=0.5, channels=3)
         self._map_view = None
         self._is_on_reverse = False
         self._display_map = args.map
@@ -150,7 +155,7 @@ class CarlaGame(object):
         self._map_shape = None
         self._map_view = None
         self._position = None
-        self._agent_positions = None
+        self._agents = carla_measurements.AgentArrays()
 
     def execute(self):
         """Launch the PyGame."""
@@ -240,7 +245,7 @@ class CarlaGame(object):
                 measurements.player_measurements.transform.location.x,
                 measurements.player_measurements.transform.location.y,
                 measurements.player_measurements.transform.location.z])
-            self._agent_positions = measurements.non_player_agents
+            self._agents.update(measurements.non_player_agents)
 
         if control is None:
             self._on_new_episode()
@@ -312,36 +317,34 @@ class CarlaGame(object):
         gap_x = (WINDOW_WIDTH - 2 * MINI_WINDOW_WIDTH) / 3
         mini_image_y = WINDOW_HEIGHT - MINI_WINDOW_HEIGHT - gap_x
 
+        # The converted images are contiguous RGB, the surfaces are created
+        # on top of them without copies.
         if self._main_image is not None:
-            array = image_converter.to_rgb_array(self._main_image)
-            surface = pygame.surfarray.make_surface(array.swapaxes(0, 1))
+            image = self._main_image
+            if self._main_image_buffer is None or self._main_image_buffer.shape != (image.height, image.width, 3):
+                self._main_image_buffer = np.empty((image.height, image.width, 3), dtype=np.uint8)
+            array = image_converter.to_rgb_array(image, out=self._main_image_buffer)
+            surface = pygame.image.frombuffer(array, (image.width, image.height), 'RGB')
             self._display.blit(surface, (0, 0))
 
         if self._mini_view_image1 is not None:
-            array = image_converter.depth_to_logarithmic_grayscale(self._mini_view_image1)
-            surface = pygame.surfarray.make_surface(array.swapaxes(0, 1))
+            image = self._mini_view_image1
+            array = image_converter.depth_to_logarithmic_grayscale(image)
+            surface = pygame.image.frombuffer(array, (image.width, image.height), 'RGB')
             self._display.blit(surface, (gap_x, mini_image_y))
 
         if self._mini_view_image2 is not None:
-            array = image_converter.labels_to_cityscapes_palette(
-                self._mini_view_image2)
-            surface = pygame.surfarray.make_surface(array.swapaxes(0, 1))
+            image = self._mini_view_image2
+            array = image_converter.labels_to_cityscapes_palette(image)
+            surface = pygame.image.frombuffer(array, (image.width, image.height), 'RGB')
 
             self._display.blit(
                 surface, (2 * gap_x + MINI_WINDOW_WIDTH, mini_image_y))
 
         if self._lidar_measurement is not None:
-            lidar_data = np.array(self._lidar_measurement.data[:, :2])
-            lidar_data *= 2.0
-            lidar_data += 100.0
-            lidar_data = np.fabs(lidar_data)
-            lidar_data = lidar_data.astype(np.int32)
-            lidar_data = np.reshape(lidar_data, (-1, 2))
             #draw lidar
-            lidar_img_size = (200, 200, 3)
-            lidar_img = np.zeros(lidar_img_size)
-            lidar_img[tuple(lidar_data.T)] = (255, 255, 255)
-            surface = pygame.surfarray.make_surface(lidar_img)
+            lidar_img = self._lidar_view.rasterize(self._lidar_measurement.data)
+            surface = pygame.image.frombuffer(lidar_img, (self._lidar_view.size, self._lidar_view.size), 'RGB')
             self._display.blit(surface, (10, 10))
 
         if self._map_view is not None:
@@ -357,17 +360,12 @@ class CarlaGame(object):
             h_pos = int(self._position[1] *(new_window_width/float(self._map_shape[1])))
 
             pygame.draw.circle(surface, [255, 0, 0, 255], (w_pos, h_pos), 6, 0)
-            for agent in self._agent_positions:
-                if agent.HasField('vehicle'):
-                    agent_position = self._map.convert_to_pixel([
-                        agent.vehicle.transform.location.x,
-                        agent.vehicle.transform.location.y,
-                        agent.vehicle.transform.location.z])
-
-                    w_pos = int(agent_position[0]*(float(WINDOW_HEIGHT)/float(self._map_shape[0])))
-                    h_pos = int(agent_position[1] *(new_window_width/float(self._map_shape[1])))
-
-                    pygame.draw.circle(surface, [255, 0, 255, 255], (w_pos, h_pos), 4, 0)
+            vehicles = self._agents.location[self._agents.kind == carla_measurements.VEHICLE]
+            agent_positions = self._map.convert_world_array_to_pixel(vehicles)
+            agent_positions[:, 0] *= float(WINDOW_HEIGHT) / float(self._map_shape[0])
+            agent_positions[:, 1] *= new_window_width / float(self._map_shape[1])
+            for w_pos, h_pos in agent_positions.astype(np.int32).tolist():
+                pygame.draw.circle(surface, [255, 0, 255, 255], (w_pos, h_pos), 4, 0)
 
             self._display.blit(surface, (WINDOW_WIDTH, 0))
 
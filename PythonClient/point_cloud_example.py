@@ -19,12 +19,11 @@ import random
 import time
 
 from carla.client import make_carla_client
-from carla.sensor import Camera
+from carla.sensor import Camera, SensorToWorld
 from carla.settings import CarlaSettings
 from carla.tcp import TCPConnectionError
 from carla.util import print_over_same_line, StopWatch
 from carla.image_converter import depth_to_local_point_cloud, to_rgb_array
-from carla.transform import Transform
 
 
 def run_carla_client(host, port, far):
@@ -68,8 +67,9 @@ def run_carla_client(host, port, far):
         # Start at location index id '0'
         client.start_episode(0)
 
-        # Compute the camera transform matrix
-        camera_to_car_transform = camera2.get_unreal_transform()
+        # Camera to world transformation, the camera transform matrix is
+        # computed once and combined with the player transform each frame.
+        camera_to_world = SensorToWorld(camera2)
 
         # Iterate every frame in the episode except for the first one.
         for frame in range(1, number_of_frames):
@@ -94,25 +94,20 @@ def run_carla_client(host, port, far):
                     max_depth=far
                 )
 
-                # (Camera) local 3d to world 3d.
-                # Get the transform from the player protobuf transformation.
-                world_transform = Transform(
-                    measurements.player_measurements.transform
+                # (Camera) local 3d to world 3d, in place, given the player
+                # protobuf transformation.
+                camera_to_world.transform_points(
+                    measurements.player_measurements.transform,
+                    point_cloud.array,
+                    out=point_cloud.array
                 )
 
-                # Compute the final transformation matrix.
-                car_to_world_transform = world_transform * camera_to_car_transform
-
-                # Car to World transformation given the 3D points and the
-                # transformation matrix.
-                point_cloud.apply_transform(car_to_world_transform)
-
                 # End transformations time mesure.
                 timer.stop()
 
                 # Save PLY to disk
-                # This generates the PLY string with the 3D points and the RGB colors
-                # for each row of the file.
+                # This writes a binary PLY with the 3D points and the RGB colors
+                # of each vertex, pass file_format=carla.sensor.PLY_ASCII for a text file.
                 point_cloud.save_to_disk(os.path.join(
                     output_folder, '{:0>5}.ply'.format(frame))
                 )
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Frames per second of the synchronous and the asyncio clients in synchronous
+mode, against the fake CARLA server of the unit tests.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'unit_tests'))
+
+from carla.async_client import AsyncCarlaClient
+from carla.client import make_carla_client
+from carla.sensor import Camera
+from carla.settings import CarlaSettings
+
+from fake_carla_server import FakeCarlaServer
+
+TEXT = \
+"""{name:<24s} {fps:8.1f} FPS"""
+
+
+def make_settings(args):
+    settings = CarlaSettings(SynchronousMode=True)
+    camera = Camera('CameraRGB')
+    camera.set_image_size(args.width, args.height)
+    settings.add_sensor(camera)
+    return settings
+
+
+def agent_work(args):
+    """Stands for the time an agent takes to compute a control."""
+    if args.agent_ms > 0.0:
+        time.sleep(args.agent_ms / 1000.0)
+
+
+def run_sync(port, args):
+    with make_carla_client('127.0.0.1', port, timeout=10) as client:
+        client.load_settings(make_settings(args))
+        client.start_episode(0)
+        start = time.time()
+        for _ in range(args.frames):
+            measurements, _ = client.read_data()
+            agent_work(args)
+            client.send_control(throttle=0.5)
+        return args.frames / (time.time() - start)
+
+
+def run_async(port, args):
+
+    async def run():
+        async with AsyncCarlaClient('127.0.0.1', port, timeout=10) as client:
+            await client.load_settings(make_settings(args))
+            await client.start_episode(0)
+            count = 0
+            start = time.time()
+            async for measurements, _ in client.frames():
+                agent_work(args)
+                await client.send_control(throttle=0.5)
+                count += 1
+                if count == args.frames:
+                    break
+            return args.frames / (time.time() - start)
+
+    return asyncio.run(run())
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=500,
+        type=int,
+        help='number of frames (default: 500)')
+    argparser.add_argument(
+        '--width',
+        default=800,
+        type=int,
+        help='camera image width (default: 800)')
+    argparser.add_argument(
+        '--height',
+        default=600,
+        type=int,
+        help='camera image height (default: 600)')
+    argparser.add_argument(
+        '--agent-ms',
+        default=0.0,
+        type=float,
+        help='milliseconds the agent takes per frame (default: 0)')
+    args = argparser.parse_args()
+
+    print('%d frames, a %dx%d camera' % (args.frames, args.width, args.height))
+    for name, run in (('CarlaClient', run_sync), ('AsyncCarlaClient', run_async)):
+        server = FakeCarlaServer().start()
+        try:
+            print(TEXT.format(name=name, fps=run(server.port, args)))
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
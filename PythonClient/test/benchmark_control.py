@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Benchmark of the controls sent per second against a local sink."""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from carla.client import VehicleControl
+from carla.control import ControlEncoder
+from carla.tcp import TCPClient
+from carla.util import StopWatch
+
+
+def start_sink():
+    """Accept one connection and discard everything received."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def run():
+        connection, _ = server.accept()
+        while connection.recv(1 << 16):
+            pass
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+
+def legacy_sender(client):
+    """What send_control did before: a new message and a joined write."""
+    def send(steer, throttle, brake):
+        pb_message = VehicleControl()
+        pb_message.steer = steer
+        pb_message.throttle = throttle
+        pb_message.brake = brake
+        pb_message.hand_brake = False
+        pb_message.reverse = False
+        message = pb_message.SerializeToString()
+        client._socket.sendall(struct.pack('<L', len(message)) + message)
+    return send
+
+
+def reused_message_sender(client):
+    pb_message = VehicleControl()
+
+    def send(steer, throttle, brake):
+        pb_message.steer = steer
+        pb_message.throttle = throttle
+        pb_message.brake = brake
+        client.write(pb_message.SerializeToString())
+    return send
+
+
+def encoder_sender(client):
+    encoder = ControlEncoder()
+
+    def send(steer, throttle, brake):
+        client.write(encoder.encode(steer, throttle, brake))
+    return send
+
+
+def run(name, make_sender, count):
+    client = TCPClient('127.0.0.1', start_sink(), 10, low_latency=True)
+    client.connect()
+    send = make_sender(client)
+    watch = StopWatch()
+    for index in range(count):
+        send(0.001 * (index % 1000) - 0.5, 0.5, 0.0)
+    watch.stop()
+    client.disconnect()
+    seconds = watch.milliseconds() / 1000.0
+    print('{:<16s} {:10.0f} sends/s {:8.2f} us/send'.format(name, count / seconds, 1e6 * seconds / count))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--count',
+        metavar='N',
+        default=100000,
+        type=int,
+        help='number of controls to send (default: 100000)')
+    args = argparser.parse_args()
+
+    run('new message', legacy_sender, args.count)
+    run('reused message', reused_message_sender, args.count)
+    run('ControlEncoder', encoder_sender, args.count)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
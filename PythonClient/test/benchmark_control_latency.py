@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Round-trip latency from sending a control to receiving the next frame, as in
+synchronous mode, against a local stub server.
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from carla.client import CarlaClient
+from carla.client import VehicleControl
+from carla.tcp import TCPClient
+from carla.util import StopWatch
+
+TEXT = \
+"""{name:<26s} {mean:8.1f} us mean {median:8.1f} us median {p99:8.1f} us p99"""
+
+
+def _recv_n(connection, length):
+    buf = bytearray()
+    while len(buf) < length:
+        data = connection.recv(length - len(buf))
+        if not data:
+            raise socket.error('connection closed')
+        buf += data
+    return buf
+
+
+def start_stub_server(frame_messages, frames):
+    """
+    Accept a stream and a control connection, then send a frame each time a
+    control is received. Return the port of the stream connection.
+    """
+    while True:
+        stream_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        stream_server.bind(('127.0.0.1', 0))
+        port = stream_server.getsockname()[1]
+        control_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            control_server.bind(('127.0.0.1', port + 1))
+            break
+        except socket.error:
+            stream_server.close()
+            control_server.close()
+    stream_server.listen(1)
+    control_server.listen(1)
+    frame = [struct.pack('<L', len(x)) + x for x in frame_messages + [b'']]
+
+    def run():
+        stream, _ = stream_server.accept()
+        control, _ = control_server.accept()
+        try:
+            for _ in range(frames):
+                length = struct.unpack('<L', _recv_n(control, 4))[0]
+                _recv_n(control, length)
+                for message in frame:
+                    stream.sendall(message)
+        except socket.error:
+            pass
+        stream.close()
+        control.close()
+        stream_server.close()
+        control_server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return port
+
+
+def run(name, args, **kwargs):
+    image = b'\x00' * (4 * args.width * args.height)
+    port = start_stub_server([b'\x00' * 200] + [image] * args.cameras, args.frames)
+    stream = TCPClient('127.0.0.1', port, 10, **kwargs)
+    control = TCPClient('127.0.0.1', port + 1, 10, **kwargs)
+    stream.connect()
+    control.connect()
+    message = VehicleControl(steer=0.1, throttle=0.5).SerializeToString()
+    times = []
+    for _ in range(args.frames):
+        watch = StopWatch()
+        control.write(message)
+        while stream.read_view():
+            pass
+        watch.stop()
+        times.append(1000.0 * watch.milliseconds())
+    stream.disconnect()
+    control.disconnect()
+    times.sort()
+    print(TEXT.format(
+        name=name,
+        mean=sum(times) / len(times),
+        median=times[len(times) // 2],
+        p99=times[int(0.99 * (len(times) - 1))]))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=500,
+        type=int,
+        help='number of round trips (default: 500)')
+    argparser.add_argument(
+        '--cameras',
+        default=1,
+        type=int,
+        help='number of camera images per frame (default: 1)')
+    argparser.add_argument(
+        '--width',
+        default=800,
+        type=int,
+        help='camera image width (default: 800)')
+    argparser.add_argument(
+        '--height',
+        default=600,
+        type=int,
+        help='camera image height (default: 600)')
+    args = argparser.parse_args()
+
+    print('%d round trips, %d image(s) of %dx%d per frame' % (args.frames, args.cameras, args.width, args.height))
+    run('default', args)
+    run('low latency', args, low_latency=True)
+    run('low latency, fixed buffer', args, low_latency=True,
+        receive_buffer_size=CarlaClient.STREAM_RECEIVE_BUFFER_SIZE)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the image conversions against the implementations they
+replaced, kept here for reference.
+"""
+
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import image_converter
+from carla import sensor
+
+
+# ==============================================================================
+# -- Previous implementations --------------------------------------------------
+# ==============================================================================
+
+
+def legacy_to_rgb_array(image):
+    array = image_converter.to_bgra_array(image)
+    array = array[:, :, :3]
+    array = array[:, :, ::-1]
+    return array
+
+
+def legacy_to_rgb_batch(images):
+    return numpy.stack([legacy_to_rgb_array(image) for image in images])
+
+
+def legacy_labels_to_cityscapes_palette(image):
+    classes = {
+        0: [0, 0, 0],         # None
+        1: [70, 70, 70],      # Buildings
+        2: [190, 153, 153],   # Fences
+        3: [72, 0, 90],       # Other
+        4: [220, 20, 60],     # Pedestrians
+        5: [153, 153, 153],   # Poles
+        6: [157, 234, 50],    # RoadLines
+        7: [128, 64, 128],    # Roads
+        8: [244, 35, 232],    # Sidewalks
+        9: [107, 142, 35],    # Vegetation
+        10: [0, 0, 255],      # Vehicles
+        11: [102, 102, 156],  # Walls
+        12: [220, 220, 0]     # TrafficSigns
+    }
+    array = image_converter.labels_to_array(image)
+    result = numpy.zeros((array.shape[0], array.shape[1], 3))
+    for key, value in classes.items():
+        result[numpy.where(array == key)] = value
+    return result
+
+
+def legacy_depth_to_array(image):
+    array = image_converter.to_bgra_array(image)
+    array = array.astype(numpy.float32)
+    normalized_depth = numpy.dot(array[:, :, :3], [65536.0, 256.0, 1.0])
+    normalized_depth /= 16777215.0
+    return normalized_depth
+
+
+def legacy_depth_to_logarithmic_grayscale(image):
+    normalized_depth = legacy_depth_to_array(image)
+    logdepth = numpy.ones(normalized_depth.shape) + \
+        (numpy.log(normalized_depth) / 5.70378)
+    logdepth = numpy.clip(logdepth, 0.0, 1.0)
+    logdepth *= 255.0
+    return numpy.repeat(logdepth[:, :, numpy.newaxis], 3, axis=2)
+
+
+def legacy_depth_to_local_point_cloud(image, color=None, max_depth=0.9):
+    far = 1000.0
+    normalized_depth = legacy_depth_to_array(image)
+    k = numpy.identity(3)
+    k[0, 2] = image.width / 2.0
+    k[1, 2] = image.height / 2.0
+    k[0, 0] = k[1, 1] = image.width / (2.0 * math.tan(image.fov * math.pi / 360.0))
+    pixel_length = image.width * image.height
+    u_coord = numpy.tile(numpy.r_[image.width-1:-1:-1], (image.height, 1)).reshape(pixel_length)
+    v_coord = numpy.tile(numpy.c_[image.height-1:-1:-1], (1, image.width)).reshape(pixel_length)
+    if color is not None:
+        color = color.reshape(pixel_length, 3)
+    normalized_depth = numpy.reshape(normalized_depth, pixel_length)
+    max_depth_indexes = numpy.where(normalized_depth > max_depth)
+    normalized_depth = numpy.delete(normalized_depth, max_depth_indexes)
+    u_coord = numpy.delete(u_coord, max_depth_indexes)
+    v_coord = numpy.delete(v_coord, max_depth_indexes)
+    if color is not None:
+        color = numpy.delete(color, max_depth_indexes, axis=0)
+    p2d = numpy.array([u_coord, v_coord, numpy.ones_like(u_coord)])
+    p3d = numpy.dot(numpy.linalg.inv(k), p2d)
+    p3d *= normalized_depth * far
+    return sensor.PointCloud(image.frame_number, numpy.transpose(p3d), color_array=color)
+
+
+# ==============================================================================
+# -- Benchmark -----------------------------------------------------------------
+# ==============================================================================
+
+
+def measure(function, repetitions):
+    """Best time in milliseconds out of several runs."""
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repetitions))
+
+
+def compare(name, legacy, new, repetitions):
+    legacy_ms = measure(legacy, repetitions)
+    new_ms = measure(new, repetitions)
+    print('{:<40s} {:8.2f} ms -> {:8.2f} ms {:6.1f}x'.format(name, legacy_ms, new_ms, legacy_ms / new_ms))
+
+
+def make_image(width, height, image_type, high=256):
+    raw_data = numpy.random.randint(0, high, (height, width, 4)).astype(numpy.uint8)
+    return sensor.Image(0, width, height, image_type, 90.0, raw_data.tobytes())
+
+
+def make_depth_image(width, height):
+    """A road-like depth map: sky on the upper 40% rows, ground below."""
+    rows = numpy.arange(height, dtype=numpy.float64)[:, numpy.newaxis]
+    horizon = 0.4 * height
+    normalized_depth = numpy.where(rows < horizon, 1.0, 0.002 * height / numpy.maximum(rows - horizon, 1.0))
+    normalized_depth = numpy.minimum(normalized_depth, 1.0) * numpy.ones((1, width))
+    encoded = numpy.round(normalized_depth * 16777215.0).astype(numpy.uint32)
+    raw_data = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    raw_data[:, :, 0] = encoded >> 16
+    raw_data[:, :, 1] = (encoded >> 8) & 255
+    raw_data[:, :, 2] = encoded & 255
+    raw_data[:, :, 3] = 255
+    return sensor.Image(0, width, height, 'Depth', 90.0, raw_data.tobytes())
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '--width',
+        default=800,
+        type=int,
+        help='image width (default: 800)')
+    argparser.add_argument(
+        '--height',
+        default=600,
+        type=int,
+        help='image height (default: 600)')
+    argparser.add_argument(
+        '-n', '--repetitions',
+        metavar='N',
+        default=20,
+        type=int,
+        help='number of runs of each conversion, the best is kept (default: 20)')
+    args = argparser.parse_args()
+
+    n = args.repetitions
+    depth = make_depth_image(args.width, args.height)
+    color = image_converter.to_rgb_array(make_image(args.width, args.height, 'SceneFinal'))
+    labels = make_image(args.width, args.height, 'SemanticSegmentation', high=13)
+    points = numpy.empty((args.width * args.height, 3))
+    depth_buffer = numpy.empty((args.height, args.width), dtype=numpy.float32)
+    encoded_buffer = numpy.empty((args.height, args.width), dtype=numpy.uint32)
+    palette = numpy.empty((args.height, args.width, 3), dtype=numpy.uint8)
+    batch = [make_image(args.width, args.height, 'SceneFinal') for _ in range(12)]
+    batch_buffer = numpy.empty((len(batch), args.height, args.width, 3), dtype=numpy.uint8)
+
+    print('%dx%d images' % (args.width, args.height))
+    compare('contiguous to_rgb_array',
+            lambda: numpy.ascontiguousarray(legacy_to_rgb_array(batch[0])),
+            lambda: image_converter.to_rgb_array(batch[0], out=palette), n)
+    compare('to_rgb_batch (3 cameras x 4 frames)',
+            lambda: legacy_to_rgb_batch(batch),
+            lambda: image_converter.to_rgb_batch(batch), n)
+    compare('  into a preallocated buffer',
+            lambda: legacy_to_rgb_batch(batch),
+            lambda: image_converter.to_rgb_batch(batch, out=batch_buffer), n)
+    compare('labels_to_cityscapes_palette',
+            lambda: legacy_labels_to_cityscapes_palette(labels),
+            lambda: image_converter.labels_to_cityscapes_palette(labels), n)
+    compare('  into a preallocated buffer',
+            lambda: legacy_labels_to_cityscapes_palette(labels),
+            lambda: image_converter.labels_to_cityscapes_palette(labels, out=palette), n)
+    compare('depth_to_array',
+            lambda: legacy_depth_to_array(depth),
+            lambda: image_converter.depth_to_array(depth), n)
+    compare('  into a float32 buffer',
+            lambda: legacy_depth_to_array(depth),
+            lambda: image_converter.depth_to_array(depth, out=depth_buffer), n)
+    compare('  in meters',
+            lambda: legacy_depth_to_array(depth) * 1000.0,
+            lambda: image_converter.depth_to_meters(depth, out=depth_buffer), n)
+    compare('  encoded uint32',
+            lambda: legacy_depth_to_array(depth),
+            lambda: image_converter.depth_to_encoded_array(depth, out=encoded_buffer), n)
+    compare('depth_to_logarithmic_grayscale',
+            lambda: legacy_depth_to_logarithmic_grayscale(depth),
+            lambda: image_converter.depth_to_logarithmic_grayscale(depth), n)
+    compare('  into a preallocated buffer',
+            lambda: legacy_depth_to_logarithmic_grayscale(depth),
+            lambda: image_converter.depth_to_logarithmic_grayscale(depth, out=palette), n)
+    for max_depth in (0.9, 1.0):
+        compare('depth_to_local_point_cloud(max_depth=%.1f)' % max_depth,
+                lambda: legacy_depth_to_local_point_cloud(depth, None, max_depth),
+                lambda: image_converter.depth_to_local_point_cloud(depth, None, max_depth), n)
+        compare('  into a preallocated buffer',
+                lambda: legacy_depth_to_local_point_cloud(depth, None, max_depth),
+                lambda: image_converter.depth_to_local_point_cloud(depth, None, max_depth, out=points), n)
+        compare('  with colors',
+                lambda: legacy_depth_to_local_point_cloud(depth, color, max_depth),
+                lambda: image_converter.depth_to_local_point_cloud(depth, color, max_depth, out=points), n)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
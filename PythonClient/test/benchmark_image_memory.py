@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the memory held by an agent keeping the last N frames of three
+cameras (scene, depth and semantic segmentation) with each conversion policy
+of sensor.Image.
+"""
+
+import argparse
+import collections
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import sensor
+
+
+def make_frames(width, height):
+    raw_data = numpy.random.randint(0, 256, (height, width, 4)).astype(numpy.uint8).tobytes()
+    return [(image_type, raw_data) for image_type in ('SceneFinal', 'Depth', 'SemanticSegmentation')]
+
+
+def run(name, policy, frames, history, cameras, width, height):
+    tracemalloc.start()
+    buffers = None
+    if policy == sensor.INTO_BUFFER:
+        # A ring of buffers, as many as frames kept.
+        buffers = [dict(
+            (image_type, numpy.empty(
+                (height, width, 3) if image_type == 'SceneFinal' else (height, width),
+                dtype=numpy.float32 if image_type == 'Depth' else numpy.uint8))
+            for image_type, _ in cameras) for _ in range(history)]
+    kept = collections.deque(maxlen=history)
+    for frame in range(frames):
+        converted = []
+        for image_type, raw_data in cameras:
+            # Every frame is received in a new buffer.
+            image = sensor.Image(frame, width, height, image_type, 90.0, bytes(bytearray(raw_data)))
+            if policy is None:
+                image.data
+            elif policy == sensor.INTO_BUFFER:
+                image.convert(policy, buffers[frame % history][image_type])
+                image = buffers[frame % history][image_type]
+            else:
+                image.convert(policy)
+            converted.append(image)
+        kept.append(converted)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<30s} {:8.1f} MB held, {:8.1f} MB peak'.format(name, current / 1e6, peak / 1e6))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--history',
+        metavar='N',
+        default=10,
+        type=int,
+        help='number of frames kept (default: 10)')
+    argparser.add_argument(
+        '--width',
+        default=800,
+        type=int,
+        help='image width (default: 800)')
+    argparser.add_argument(
+        '--height',
+        default=600,
+        type=int,
+        help='image height (default: 600)')
+    args = argparser.parse_args()
+
+    cameras = make_frames(args.width, args.height)
+    frames = 2 * args.history
+    print('last %d frames of 3 %dx%d cameras' % (args.history, args.width, args.height))
+    run('raw only', sensor.VIEW, frames, args.history, cameras, args.width, args.height)
+    run('Image.data (CACHE)', None, frames, args.history, cameras, args.width, args.height)
+    run('RELEASE_RAW', sensor.RELEASE_RAW, frames, args.history, cameras, args.width, args.height)
+    run('INTO_BUFFER (float32 depth)', sensor.INTO_BUFFER, frames, args.history, cameras, args.width, args.height)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
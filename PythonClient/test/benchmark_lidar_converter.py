@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the bird's-eye view of a lidar measurement against the
+rasterization manual_control did before.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import lidar_converter
+
+
+def legacy_rasterize(points):
+    lidar_data = numpy.array(points[:, :2])
+    lidar_data *= 2.0
+    lidar_data += 100.0
+    lidar_data = numpy.fabs(lidar_data)
+    lidar_data = lidar_data.astype(numpy.int32)
+    lidar_data = numpy.reshape(lidar_data, (-1, 2))
+    lidar_img_size = (200, 200, 3)
+    lidar_img = numpy.zeros(lidar_img_size)
+    lidar_img[tuple(lidar_data.T)] = (255, 255, 255)
+    return lidar_img
+
+
+def measure(function, repetitions):
+    """Best time in milliseconds out of several runs."""
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repetitions))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '--points',
+        metavar='N',
+        default=56000,
+        type=int,
+        help='number of points per measurement (default: 56000)')
+    argparser.add_argument(
+        '-n', '--repetitions',
+        metavar='N',
+        default=50,
+        type=int,
+        help='number of runs of each rasterization, the best is kept (default: 50)')
+    args = argparser.parse_args()
+
+    # Within the 50 m range of the lidar of manual_control.
+    points = numpy.random.uniform(-49.9, 49.9, (args.points, 3)).astype(numpy.float32)
+    occupancy = lidar_converter.BirdEyeView(size=200, resolution=0.5, channels=3)
+    height = lidar_converter.BirdEyeView(size=200, resolution=0.5, mode=lidar_converter.HEIGHT, channels=3)
+
+    legacy_ms = measure(lambda: legacy_rasterize(points), args.repetitions)
+    print('{:<30s} {:8.2f} ms'.format('legacy', legacy_ms))
+    for name, view in (('BirdEyeView (occupancy)', occupancy), ('BirdEyeView (height)', height)):
+        view_ms = measure(lambda: view.rasterize(points), args.repetitions)
+        print('{:<30s} {:8.2f} ms {:6.1f}x'.format(name, view_ms, legacy_ms / view_ms))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
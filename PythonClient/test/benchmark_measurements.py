@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Benchmark of the decoding of measurements with non-player agents."""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from carla import carla_server_pb2 as carla_protocol
+from carla.measurements import AgentArrays
+from carla.measurements import LazyMeasurements
+from carla.util import StopWatch
+
+
+def make_measurements(frame, number_of_vehicles, number_of_pedestrians, number_of_traffic_lights):
+    """
+    Measurements of a frame, vehicles and pedestrians move every frame while
+    traffic lights stay the same.
+    """
+    measurements = carla_protocol.Measurements()
+    measurements.frame_number = frame
+    measurements.player_measurements.transform.location.x = 1.0
+    measurements.player_measurements.forward_speed = 10.0
+    for index in range(number_of_vehicles + number_of_pedestrians):
+        agent = measurements.non_player_agents.add()
+        agent.id = index + 1
+        body = agent.vehicle if index < number_of_vehicles else agent.pedestrian
+        body.transform.location.x = float(index) + 0.1 * frame
+        body.transform.location.y = 2.0
+        body.transform.orientation.x = 1.0
+        body.transform.rotation.yaw = 90.0
+        body.bounding_box.transform.location.z = 0.5
+        body.bounding_box.extent.x = 2.0
+        body.bounding_box.extent.y = 1.0
+        body.bounding_box.extent.z = 0.5
+        body.forward_speed = float(index)
+    for index in range(number_of_traffic_lights):
+        agent = measurements.non_player_agents.add()
+        agent.id = 10000 + index
+        agent.traffic_light.transform.location.x = float(index)
+        agent.traffic_light.transform.location.y = -2.0
+        agent.traffic_light.transform.orientation.x = 1.0
+        agent.traffic_light.state = carla_protocol.TrafficLight.GREEN
+    return memoryview(bytearray(measurements.SerializeToString()))
+
+
+def parse_full(data):
+    pb_message = carla_protocol.Measurements()
+    pb_message.ParseFromString(data)
+    return pb_message.player_measurements.forward_speed
+
+
+def parse_lazy(data):
+    return LazyMeasurements(data).player_measurements.forward_speed
+
+
+def parse_lazy_agents(data):
+    return len(LazyMeasurements(data).non_player_agents)
+
+
+def parse_lazy_columns(data):
+    return LazyMeasurements(data).agent_columns
+
+
+def make_incremental_arrays():
+    arrays = AgentArrays()
+
+    def update_arrays(data):
+        return arrays.update(LazyMeasurements(data).non_player_agents)
+    return update_arrays
+
+
+def make_serialized_arrays():
+    arrays = AgentArrays()
+
+    def update_arrays(data):
+        return arrays.update_serialized(LazyMeasurements(data).serialized_agents)
+    return update_arrays
+
+
+def run(name, parse, frames, count):
+    watch = StopWatch()
+    for index in range(count):
+        parse(frames[index % len(frames)])
+    watch.stop()
+    print('{:<28s} {:8.1f} us/frame'.format(name, 1000.0 * watch.milliseconds() / count))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=500,
+        type=int,
+        help='number of frames to decode (default: 500)')
+    argparser.add_argument(
+        '--vehicles',
+        default=60,
+        type=int,
+        help='number of vehicles (default: 60)')
+    argparser.add_argument(
+        '--pedestrians',
+        default=90,
+        type=int,
+        help='number of pedestrians (default: 90)')
+    argparser.add_argument(
+        '--traffic-lights',
+        default=100,
+        type=int,
+        help='number of traffic lights (default: 100)')
+    args = argparser.parse_args()
+
+    frames = [make_measurements(frame, args.vehicles, args.pedestrians, args.traffic_lights) for frame in range(10)]
+    print('measurements of %d bytes' % len(frames[0]))
+    run('full decoding', parse_full, frames, args.frames)
+    run('lazy, player only', parse_lazy, frames, args.frames)
+    run('lazy, player and agents', parse_lazy_agents, frames, args.frames)
+    run('lazy, agent columns', parse_lazy_columns, frames, args.frames)
+    run('lazy, incremental arrays', make_incremental_arrays(), frames, args.frames)
+    run('lazy, serialized arrays', make_serialized_arrays(), frames, args.frames)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
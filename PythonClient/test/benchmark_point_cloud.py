@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Benchmark of saving and loading point-clouds in each file format."""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import sensor
+from carla.sensor import PointCloud
+from carla.util import StopWatch
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-p', '--points',
+        metavar='N',
+        default=800 * 600,
+        type=int,
+        help='number of points (default: the pixels of a 800x600 depth image)')
+    args = argparser.parse_args()
+
+    points = numpy.random.uniform(-100.0, 100.0, (args.points, 3))
+    colors = numpy.random.randint(0, 256, (args.points, 3)).astype(numpy.uint8)
+    point_cloud = PointCloud(0, points, colors)
+    folder = tempfile.mkdtemp()
+    try:
+        for file_format, extension in [
+                (sensor.PLY_ASCII, '.ply'),
+                (sensor.PLY_BINARY, '.ply'),
+                (sensor.NPZ, '.npz')]:
+            filename = os.path.join(folder, file_format + extension)
+            watch = StopWatch()
+            point_cloud.save_to_disk(filename, file_format)
+            watch.stop()
+            save = watch.milliseconds()
+            watch.restart()
+            PointCloud.load_from_disk(filename)
+            watch.stop()
+            print('{:<22s} save {:8.1f} ms load {:8.1f} ms {:6.1f} MB'.format(
+                file_format, save, watch.milliseconds(), os.path.getsize(filename) / 1e6))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
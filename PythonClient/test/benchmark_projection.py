@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the projection of the bounding boxes of every agent of a frame
+to a camera image, with carla.projection against a loop of Transforms per
+agent.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import carla_server_pb2 as carla_protocol
+from carla import projection
+from carla import sensor
+from carla.transform import Transform
+
+
+def make_agents(count):
+    rng = numpy.random.RandomState(0)
+    agents = []
+    for index in range(count):
+        agent = carla_protocol.Agent()
+        agent.id = index
+        body = agent.vehicle if index % 2 else agent.pedestrian
+        body.transform.location.x, body.transform.location.y = rng.uniform(-100.0, 100.0, 2)
+        body.transform.rotation.yaw = rng.uniform(-180.0, 180.0)
+        body.bounding_box.transform.location.z = 0.7
+        body.bounding_box.extent.x, body.bounding_box.extent.y, body.bounding_box.extent.z = (2.0, 1.0, 0.7)
+        agents.append(agent)
+    return agents
+
+
+def legacy_project(camera, player_transform, agents):
+    intrinsics = projection.camera_intrinsics(camera)
+    world_to_camera = (Transform(player_transform) * camera.get_unreal_transform()).inverse()
+    labels = []
+    for agent in agents:
+        body = getattr(agent, agent.WhichOneof('agent'))
+        box_to_world = Transform(body.transform) * Transform(body.bounding_box.transform)
+        extent = body.bounding_box.extent
+        corners = numpy.array([[x * extent.x, y * extent.y, z * extent.z]
+                               for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)])
+        local = world_to_camera.transform_points(box_to_world.transform_points(corners))
+        if (local[:, 2] <= 0.1).any():
+            continue
+        pixels = []
+        for x, y, z in local:
+            column = camera.ImageSizeX - 1 - (intrinsics[0, 0] * x / z + intrinsics[0, 2])
+            row = camera.ImageSizeY - 1 - (intrinsics[1, 1] * y / z + intrinsics[1, 2])
+            pixels.append((column, row))
+        pixels = numpy.array(pixels)
+        low = pixels.min(axis=0)
+        high = pixels.max(axis=0)
+        if low[0] < camera.ImageSizeX and low[1] < camera.ImageSizeY and high[0] >= 0 and high[1] >= 0:
+            labels.append((agent.id, low, high))
+    return labels
+
+
+def project(projector, player_transform, agents):
+    ids, matrices, extents = projection.agent_boxes(agents)
+    _, boxes, visible = projector.project(player_transform, matrices, extents)
+    return ids[visible], boxes[visible]
+
+
+def measure(function, repetitions):
+    """Best time in milliseconds out of several runs."""
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repetitions))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '--agents',
+        metavar='N',
+        default=150,
+        type=int,
+        help='number of agents per frame (default: 150)')
+    argparser.add_argument(
+        '-n', '--repetitions',
+        metavar='N',
+        default=20,
+        type=int,
+        help='number of runs of each projection, the best is kept (default: 20)')
+    args = argparser.parse_args()
+
+    camera = sensor.Camera('CameraRGB', FOV=90.0)
+    camera.set_image_size(800, 600)
+    camera.set_position(2.0, 0.0, 1.4)
+    player = carla_protocol.Transform()
+    agents = make_agents(args.agents)
+    projector = projection.BoxProjector(camera)
+
+    ids, _ = project(projector, player, agents)
+    if sorted(ids.tolist()) != sorted(label[0] for label in legacy_project(camera, player, agents)):
+        raise RuntimeError('legacy and vectorized projections differ')
+    ids, matrices, extents = projection.agent_boxes(agents)
+    legacy_ms = measure(lambda: legacy_project(camera, player, agents), args.repetitions)
+    print('{:<40s} {:8.3f} ms'.format('legacy, %d agents' % args.agents, legacy_ms))
+    for name, function in (
+            ('agent_boxes + project', lambda: project(projector, player, agents)),
+            ('project only', lambda: projector.project(player, matrices, extents))):
+        new_ms = measure(function, args.repetitions)
+        print('{:<40s} {:8.3f} ms {:6.1f}x'.format(name, new_ms, legacy_ms / new_ms))
+    print('%d of %d boxes visible' % (len(project(projector, player, agents)[0]), args.agents))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Benchmark of the sensor parsers with 4 cameras and 1 lidar per frame."""
+
+import argparse
+import os
+import struct
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import sensor
+from carla import sensor_parsers
+from carla.carla_server_pb2 import Sensor
+from carla.util import StopWatch
+
+
+def make_legacy_parsers(sensors):
+    """The parsers the client used before, slicing and unpacking each field."""
+    image_types = ['None', 'SceneFinal', 'Depth', 'SemanticSegmentation']
+    getimgtype = lambda id: image_types[id] if len(image_types) > id else 'Unknown'
+    getint32 = lambda data, index: struct.unpack('<L', data[index*4:index*4+4])[0]
+    getint64 = lambda data, index: struct.unpack('<Q', data[index*4:index*4+8])[0]
+    getfloat = lambda data, index: struct.unpack('<f', data[index*4:index*4+4])[0]
+
+    def parse_image(data):
+        frame_number = getint64(data, 0)
+        width = getint32(data, 2)
+        height = getint32(data, 3)
+        image_type = getimgtype(getint32(data, 4))
+        fov = getfloat(data, 5)
+        return sensor.Image(frame_number, width, height, image_type, fov, data[24:])
+
+    def parse_lidar(data):
+        frame_number = getint64(data, 0)
+        horizontal_angle = getfloat(data, 2)
+        channels = getint32(data, 3)
+        header_size = 16
+        point_count_by_channel = numpy.frombuffer(
+            data[header_size:header_size+channels*4],
+            dtype=numpy.dtype('uint32'))
+        points = numpy.frombuffer(
+            data[header_size+channels*4:],
+            dtype=numpy.dtype('f4'))
+        points = numpy.reshape(points, (int(points.shape[0]/3), 3))
+        return sensor.LidarMeasurement(
+            frame_number,
+            horizontal_angle,
+            channels,
+            point_count_by_channel,
+            sensor.PointCloud(frame_number, points))
+
+    parsers = {}
+    for s in sensors:
+        parsers[s.id] = parse_image if s.type == Sensor.CAMERA else parse_lidar
+    return parsers
+
+
+def parse_legacy(parsers, data):
+    sensor_id = struct.unpack('<L', data[0:4])[0]
+    return parsers[sensor_id](data[4:])
+
+
+def make_frame(width, height, channels, points_per_channel):
+    sensors = []
+    messages = []
+    for sensor_id in range(1, 5):
+        pb_sensor = Sensor(id=sensor_id, name='Camera%d' % sensor_id, type=Sensor.CAMERA)
+        sensors.append(pb_sensor)
+        messages.append(
+            struct.pack('<LQLLLf', sensor_id, 1, width, height, 1, 90.0) +
+            b'\x00' * (4 * width * height))
+    sensors.append(Sensor(id=5, name='Lidar', type=Sensor.LIDAR_RAY_CAST))
+    messages.append(
+        struct.pack('<LQfL', 5, 1, 0.0, channels) +
+        struct.pack('<L', points_per_channel) * channels +
+        b'\x00' * (12 * channels * points_per_channel))
+    return sensors, messages
+
+
+def run(name, parse, parsers, messages, frames):
+    watch = StopWatch()
+    for _ in range(frames):
+        for message in messages:
+            parse(parsers, message)
+    watch.stop()
+    print('{:<20s} {:8.1f} us/frame'.format(name, 1000.0 * watch.milliseconds() / frames))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=2000,
+        type=int,
+        help='number of frames to parse (default: 2000)')
+    args = argparser.parse_args()
+
+    sensors, messages = make_frame(800, 600, 32, 175)
+    # The client hands memoryviews of its receive buffers to the parsers.
+    views = [memoryview(bytearray(message)) for message in messages]
+    run('legacy (bytes)', parse_legacy, make_legacy_parsers(sensors), messages, args.frames)
+    run('legacy (memoryview)', parse_legacy, make_legacy_parsers(sensors), views, args.frames)
+    run('registry', sensor_parsers.parse_sensor_data,
+        sensor_parsers.make_sensor_parsers(sensors), views, args.frames)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
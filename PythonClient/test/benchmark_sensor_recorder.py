@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the time the simulation loop spends saving the images of a
+frame, synchronously with Image.save_to_disk and queued to a SensorRecorder.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import sensor
+from carla import sensor_recorder
+from carla.util import StopWatch
+
+
+def make_frame(width, height, cameras):
+    # Smooth gradients, random images would be much slower to compress.
+    raw_data = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+    raw_data[:, :, 0] = numpy.arange(width, dtype=numpy.uint32)[numpy.newaxis, :] % 256
+    raw_data[:, :, 1] = numpy.arange(height, dtype=numpy.uint32)[:, numpy.newaxis] % 256
+    raw_data = raw_data.tobytes()
+    return dict(
+        ('Camera%d' % index, sensor.Image(0, width, height, 'SceneFinal', 90.0, raw_data))
+        for index in range(cameras))
+
+
+def run(name, save, flush, frames, sensor_data):
+    watch = StopWatch()
+    for frame in range(frames):
+        for camera, image in sensor_data.items():
+            save(camera, frame, image)
+    watch.stop()
+    loop_ms = watch.milliseconds()
+    flush()
+    watch.stop()
+    print('{:<28s} {:8.2f} ms/frame in the loop, {:8.2f} ms/frame total'.format(
+        name, loop_ms / frames, watch.milliseconds() / frames))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=50,
+        type=int,
+        help='number of frames to save (default: 50)')
+    argparser.add_argument(
+        '--cameras',
+        metavar='N',
+        default=3,
+        type=int,
+        help='number of cameras (default: 3)')
+    argparser.add_argument(
+        '--workers',
+        metavar='N',
+        default=2,
+        type=int,
+        help='number of background writers (default: 2)')
+    args = argparser.parse_args()
+
+    sensor_data = make_frame(800, 600, args.cameras)
+    folder = tempfile.mkdtemp()
+    try:
+        def filename(camera, frame):
+            return os.path.join(folder, camera, 'image_{:0>5d}'.format(frame))
+
+        run('save_to_disk (png)',
+            lambda camera, frame, image: image.save_to_disk(filename(camera, frame)),
+            lambda: None, args.frames, sensor_data)
+        for file_format in (sensor_recorder.PNG, sensor_recorder.JPEG, sensor_recorder.RAW):
+            recorder = sensor_recorder.SensorRecorder(file_format, args.workers)
+            run('SensorRecorder (%s)' % file_format,
+                lambda camera, frame, image: recorder.save(filename(camera, frame), image),
+                recorder.close, args.frames, sensor_data)
+            print('  blocked %d times, %.1f ms' % (recorder.blocked, 1000.0 * recorder.blocked_seconds))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the serialization of CarlaSettings to INI, as done on every
+episode request, against the ConfigParser implementation it replaced, and
+of the construction and size of settings and sensors against the
+attribute-dict classes they replaced.
+"""
+
+import argparse
+import io
+import os
+import sys
+import timeit
+
+from configparser import ConfigParser
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from carla import sensor
+from carla.driving_benchmark.experiment_suites import CoRL2017
+from carla.settings import CarlaSettings
+
+
+class LegacySettings(object):
+
+    def __init__(self, **kwargs):
+        self.SynchronousMode = True
+        self.SendNonPlayerAgentsInfo = False
+        self.QualityLevel = 'Epic'
+        self.PlayerVehicle = None
+        self.NumberOfVehicles = 20
+        self.NumberOfPedestrians = 30
+        self.WeatherId = 1
+        self.SeedVehicles = None
+        self.SeedPedestrians = None
+        self.DisableTwoWheeledVehicles = False
+        self.set(**kwargs)
+        self._sensors = []
+
+    def set(self, **kwargs):
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise ValueError('CarlaSettings: no key named %r' % key)
+            setattr(self, key, value)
+
+
+class LegacyCamera(object):
+
+    def __init__(self, name, **kwargs):
+        self.SensorName = name
+        self.SensorType = 'CAMERA'
+        self.PositionX = 0.2
+        self.PositionY = 0.0
+        self.PositionZ = 1.3
+        self.RotationPitch = 0.0
+        self.RotationRoll = 0.0
+        self.RotationYaw = 0.0
+        self.PostProcessing = 'SceneFinal'
+        self.ImageSizeX = 720
+        self.ImageSizeY = 512
+        self.FOV = 90.0
+        self.set(**kwargs)
+
+    def set(self, **kwargs):
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise ValueError('sensor.Sensor: no key named %r' % key)
+            setattr(self, key, value)
+
+
+def size_of(obj):
+    """Bytes of the object and its attribute dict, if any."""
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, '__dict__') else 0)
+
+
+def build_conditions(settings_class, camera_class, count):
+    for index in range(count):
+        conditions = settings_class()
+        conditions.set(SendNonPlayerAgentsInfo=True, NumberOfVehicles=20, NumberOfPedestrians=50, WeatherId=1)
+        camera_class('CameraRGB', FOV=100)
+
+
+def legacy_ini(settings):
+    ini = ConfigParser()
+    ini.optionxform = str
+
+    def get_attribs(obj):
+        return [a for a in dir(obj) if not a.startswith('_') and not callable(getattr(obj, a))]
+
+    def add_section(section, obj, keys):
+        for key in keys:
+            if hasattr(obj, key) and getattr(obj, key) is not None:
+                if not ini.has_section(section):
+                    ini.add_section(section)
+                ini.set(section, key, str(getattr(obj, key)))
+
+    add_section('CARLA/Server', settings, ['SynchronousMode', 'SendNonPlayerAgentsInfo'])
+    add_section('CARLA/QualitySettings', settings, ['QualityLevel'])
+    add_section('CARLA/LevelSettings', settings, [
+        'NumberOfVehicles', 'NumberOfPedestrians', 'WeatherId', 'SeedVehicles', 'SeedPedestrians',
+        'DisableTwoWheeledVehicles'])
+    ini.add_section('CARLA/Sensor')
+    ini.set('CARLA/Sensor', 'Sensors', ','.join(s.SensorName for s in settings._sensors))
+    for sensor_def in settings._sensors:
+        add_section('CARLA/Sensor/' + sensor_def.SensorName, sensor_def, get_attribs(sensor_def))
+    text = io.StringIO()
+    ini.write(text)
+    return text.getvalue().replace(' = ', '=')
+
+
+def make_settings(sensor_count):
+    settings = CarlaSettings(NumberOfVehicles=50, NumberOfPedestrians=100)
+    settings.randomize_seeds()
+    for index in range(sensor_count):
+        if index % 2:
+            settings.add_sensor(sensor.Lidar('Lidar%d' % index))
+        else:
+            camera = sensor.Camera('Camera%d' % index, PostProcessing='Depth')
+            camera.set_image_size(800, 600)
+            camera.set_position(0.3 * index, 0.0, 1.3)
+            settings.add_sensor(camera)
+    return settings
+
+
+def measure(function, repetitions):
+    """Best time in seconds out of a few runs of repetitions calls."""
+    return min(timeit.repeat(function, number=repetitions, repeat=3))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '--sensors',
+        metavar='N',
+        default=10,
+        type=int,
+        help='number of sensors (default: 10)')
+    argparser.add_argument(
+        '-n', '--repetitions',
+        metavar='N',
+        default=10000,
+        type=int,
+        help='number of serializations (default: 10000)')
+    args = argparser.parse_args()
+
+    settings = make_settings(args.sensors)
+    if str(settings) != legacy_ini(settings):
+        raise RuntimeError('INI text differs from ConfigParser')
+
+    def new_episode():
+        # A setting changes on every episode, e.g. the weather.
+        settings.WeatherId = 1 + settings.WeatherId % 14
+        return str(settings)
+
+    legacy_s = measure(lambda: legacy_ini(settings), args.repetitions)
+    print('{:<30s} {:8.3f} s'.format('ConfigParser', legacy_s))
+    for name, function in (('str, unchanged', lambda: str(settings)), ('str, a setting changed', new_episode)):
+        new_s = measure(function, args.repetitions)
+        print('{:<30s} {:8.3f} s {:8.1f}x'.format(name, new_s, legacy_s / new_s))
+    print('%d sensors, %d serializations' % (args.sensors, args.repetitions))
+
+    legacy_s = measure(lambda: build_conditions(LegacySettings, LegacyCamera, args.repetitions), 1)
+    new_s = measure(lambda: build_conditions(CarlaSettings, sensor.Camera, args.repetitions), 1)
+    print('{:<30s} {:8.3f} s -> {:8.3f} s'.format('build conditions + camera', legacy_s, new_s))
+    print('{:<30s} {:8d} B -> {:8d} B'.format(
+        'CarlaSettings size', size_of(LegacySettings()), size_of(CarlaSettings())))
+    print('{:<30s} {:8d} B -> {:8d} B'.format(
+        'Camera size', size_of(LegacyCamera('CameraRGB')), size_of(sensor.Camera('CameraRGB'))))
+
+    def corl2017():
+        for city_name in ('Town01', 'Town02'):
+            for experiment in CoRL2017(city_name).get_experiments():
+                str(experiment.conditions)
+    print('{:<30s} {:8.3f} ms'.format('CoRL2017 build + serialize', 1000.0 * measure(corl2017, 1)))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
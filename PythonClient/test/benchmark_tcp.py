@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""Micro-benchmark of the TCP client against a local socket server."""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from carla.tcp import BufferPool
+from carla.tcp import TCPClient
+from carla.util import StopWatch
+
+TEXT = \
+"""{name:<24s} {ms:8.2f} ms/frame {allocs:8.1f} allocs/frame {peak:8.1f} MB peak"""
+
+
+def start_frame_server(frame_size, frames):
+    """Serve "frames" messages of frame_size bytes to a single connection."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    message = struct.pack('<L', frame_size) + b'\x7f' * frame_size
+
+    def run():
+        connection, _ = server.accept()
+        try:
+            for _ in range(frames):
+                connection.sendall(message)
+        except socket.error:
+            pass
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+
+class LegacyReader(object):
+    """The reader TCPClient used before, concatenating immutable bytes."""
+
+    def __init__(self, client):
+        self._socket = client._socket
+        self.allocations = 0
+
+    def read(self):
+        length = struct.unpack('<L', self._read_n(4))[0]
+        return self._read_n(length)
+
+    def _read_n(self, length):
+        buf = bytes()
+        while length > 0:
+            data = self._socket.recv(length)
+            if not data:
+                raise RuntimeError('connection closed')
+            # One allocation for the chunk, one for the concatenation.
+            self.allocations += 2
+            buf += data
+            length -= len(data)
+        return buf
+
+
+def legacy_reader(client, pool):
+    reader = LegacyReader(client)
+    return reader.read, lambda: reader.allocations
+
+
+def read_reader(client, pool):
+    counter = [0]
+
+    def read():
+        # A bytearray to receive into plus the final bytes copy.
+        counter[0] += 2
+        return client.read()
+    return read, lambda: counter[0]
+
+
+def read_view_reader(client, pool):
+    return client.read_view, lambda: pool.allocations
+
+
+def run_reader(name, make_reader, args):
+    pool = BufferPool()
+    client = TCPClient('127.0.0.1', start_frame_server(args.size, args.frames), 30, buffer_pool=pool)
+    client.connect()
+    read, allocations = make_reader(client, pool)
+    tracemalloc.start()
+    watch = StopWatch()
+    for _ in range(args.frames):
+        client.recycle_buffers()
+        read()
+    watch.stop()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    client.disconnect()
+    print(TEXT.format(
+        name=name,
+        ms=watch.milliseconds() / args.frames,
+        allocs=float(allocations()) / args.frames,
+        peak=peak / 1e6))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-s', '--size',
+        metavar='BYTES',
+        default=1920 * 1080 * 4,
+        type=int,
+        help='size of each frame (default: a 1920x1080 BGRA image)')
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=50,
+        type=int,
+        help='number of frames to read (default: 50)')
+    args = argparser.parse_args()
+
+    print('Reading %d frames of %d bytes' % (args.frames, args.size))
+    run_reader('bytes concatenation', legacy_reader, args)
+    run_reader('TCPClient.read', read_reader, args)
+    run_reader('TCPClient.read_view', read_view_reader, args)
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of carla.transform against the numpy.matrix implementation it
+replaced: building the transforms of every agent of a frame, inverting
+them, and moving a camera point-cloud to world frame.
+"""
+
+import argparse
+import math
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import carla_server_pb2 as carla_protocol
+from carla import sensor
+from carla import transform
+from carla.transform import Rotation, Scale, Transform, Translation
+
+
+def legacy_matrix(translation, rotation):
+    matrix = numpy.matrix(numpy.identity(4))
+    cy = math.cos(numpy.radians(rotation.yaw))
+    sy = math.sin(numpy.radians(rotation.yaw))
+    cr = math.cos(numpy.radians(rotation.roll))
+    sr = math.sin(numpy.radians(rotation.roll))
+    cp = math.cos(numpy.radians(rotation.pitch))
+    sp = math.sin(numpy.radians(rotation.pitch))
+    matrix[0, 3] = translation.x
+    matrix[1, 3] = translation.y
+    matrix[2, 3] = translation.z
+    matrix[0, 0] = cp * cy
+    matrix[0, 1] = cy * sp * sr - sy * cr
+    matrix[0, 2] = -(cy * sp * cr + sy * sr)
+    matrix[1, 0] = sy * cp
+    matrix[1, 1] = sy * sp * sr + cy * cr
+    matrix[1, 2] = cy * sr - sy * sp * cr
+    matrix[2, 0] = sp
+    matrix[2, 1] = -cp * sr
+    matrix[2, 2] = cp * cr
+    return matrix
+
+
+def legacy_transform_points(matrix, points):
+    points = points.transpose()
+    points = numpy.append(points, numpy.ones((1, points.shape[1])), axis=0)
+    points = matrix * points
+    return points[0:3].transpose()
+
+
+def legacy_camera_to_world(camera, player_transform, points):
+    to_unreal_transform = Transform(Rotation(roll=-90, yaw=90), Scale(x=-1))
+    camera_to_car = camera.get_transform() * to_unreal_transform
+    car_to_world = Transform(player_transform) * camera_to_car
+    return legacy_transform_points(numpy.matrix(car_to_world.matrix), points)
+
+
+def measure(function, repetitions):
+    """Best time in milliseconds out of several runs."""
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repetitions))
+
+
+def report(name, legacy_ms, new_ms):
+    print('{:<40s} {:8.3f} ms -> {:8.3f} ms {:6.1f}x'.format(name, legacy_ms, new_ms, legacy_ms / new_ms))
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '--agents',
+        metavar='N',
+        default=200,
+        type=int,
+        help='number of agents per frame (default: 200)')
+    argparser.add_argument(
+        '--points',
+        metavar='N',
+        default=100000,
+        type=int,
+        help='number of points of the point-cloud (default: 100000)')
+    argparser.add_argument(
+        '-n', '--repetitions',
+        metavar='N',
+        default=20,
+        type=int,
+        help='number of runs of each test, the best is kept (default: 20)')
+    args = argparser.parse_args()
+
+    rng = numpy.random.RandomState(0)
+    locations = rng.uniform(-100.0, 100.0, (args.agents, 3))
+    rotations = rng.uniform(-180.0, 180.0, (args.agents, 3))
+    agents = [(Translation(*t), Rotation(*r)) for t, r in zip(locations, rotations)]
+    points = rng.uniform(-50.0, 50.0, (args.points, 3))
+    out = numpy.empty_like(points)
+
+    report('%d agent transforms, one by one' % args.agents,
+           measure(lambda: [legacy_matrix(t, r) for t, r in agents], args.repetitions),
+           measure(lambda: [Transform(t, r) for t, r in agents], args.repetitions))
+    report('%d agent transforms, batched' % args.agents,
+           measure(lambda: [legacy_matrix(t, r) for t, r in agents], args.repetitions),
+           measure(lambda: transform.transform_matrices(locations, rotations), args.repetitions))
+    legacy = legacy_matrix(*agents[0])
+    single = Transform(*agents[0])
+    report('transform %d points' % args.points,
+           measure(lambda: legacy_transform_points(legacy, points), args.repetitions),
+           measure(lambda: single.transform_points(points), args.repetitions))
+    report('transform %d points into a buffer' % args.points,
+           measure(lambda: legacy_transform_points(legacy, points), args.repetitions),
+           measure(lambda: single.transform_points(points, out=out), args.repetitions))
+    matrices = transform.transform_matrices(locations, rotations)
+    report('invert %d agent transforms' % args.agents,
+           measure(lambda: numpy.linalg.inv(matrices), args.repetitions),
+           measure(lambda: transform.rigid_inverses(matrices), args.repetitions))
+
+    camera = sensor.Camera('CameraDepth')
+    camera.set_position(0.3, 0.0, 1.3)
+    report('camera extrinsics',
+           measure(lambda: camera.get_transform() * Transform(Rotation(roll=-90, yaw=90), Scale(x=-1)),
+                   args.repetitions),
+           measure(camera.get_unreal_transform, args.repetitions))
+    player = carla_protocol.Transform()
+    player.location.x = 10.0
+    player.rotation.yaw = 30.0
+    camera_to_world = sensor.SensorToWorld(camera)
+    report('camera %d points to world' % args.points,
+           measure(lambda: legacy_camera_to_world(camera, player, points), args.repetitions),
+           measure(lambda: camera_to_world.transform_points(player, points, out=out), args.repetitions))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
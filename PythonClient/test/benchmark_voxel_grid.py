@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2017 Computer Vision Center (CVC) at the Universitat Autonoma de
+# Barcelona (UAB).
+#
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the voxel-grid downsampling and of accumulating the clouds of
+a car driving forward into a VoxelMap, against keeping every cloud.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from carla import sensor
+from carla import voxel_grid
+from carla.transform import Transform, Translation
+from carla.util import StopWatch
+
+
+def make_cloud(points):
+    """Ground and walls around the sensor, 40 meters ahead."""
+    random = numpy.random.RandomState(0)
+    cloud = random.uniform([0.0, -10.0, -2.0], [40.0, 10.0, 3.0], (points, 3))
+    cloud[: points // 2, 2] = -2.0
+    colors = random.randint(0, 256, (points, 3)).astype(numpy.uint8)
+    return sensor.PointCloud(0, cloud, colors)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        '-n', '--frames',
+        metavar='N',
+        default=300,
+        type=int,
+        help='number of frames accumulated (default: 300)')
+    argparser.add_argument(
+        '--points',
+        metavar='N',
+        default=50000,
+        type=int,
+        help='number of points per frame (default: 50000)')
+    argparser.add_argument(
+        '--voxel-size',
+        metavar='S',
+        default=0.2,
+        type=float,
+        help='side of the voxels in meters (default: 0.2)')
+    argparser.add_argument(
+        '--max-age',
+        metavar='N',
+        default=100,
+        type=int,
+        help='frames a voxel is kept after last seen (default: 100)')
+    args = argparser.parse_args()
+
+    cloud = make_cloud(args.points)
+    downsample_ms = 1000.0 * min(timeit.repeat(
+        lambda: cloud.voxel_downsample(args.voxel_size), number=1, repeat=10))
+    print('voxel_downsample of %d points: %.1f ms, %d points left' % (
+        args.points, downsample_ms, len(cloud.voxel_downsample(args.voxel_size))))
+
+    voxel_map = voxel_grid.VoxelMap(args.voxel_size, max_age=args.max_age)
+    watch = StopWatch()
+    for frame in range(args.frames):
+        # Driving forward at 10 m/s, 10 frames per second.
+        voxel_map.add(cloud, Transform(Translation(frame * 1.0, 0.0, 0.0)))
+    watch.stop()
+    map_bytes = sum(array.nbytes for array in (
+        voxel_map._keys, voxel_map._sums, voxel_map._counts, voxel_map._color_sums, voxel_map._last_seen))
+    print('VoxelMap: %.1f ms/frame, %d voxels, %.1f MB' % (
+        watch.milliseconds() / args.frames, len(voxel_map), map_bytes / 1e6))
+    print('every cloud kept: %.1f MB' % (args.frames * args.points * (3 * 8 + 3) / 1e6))
+
+
+if __name__ == '__main__':
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('\nCancelled by user. Bye!')
@@ -0,0 +1,249 @@
+"""
+A fake CARLA server speaking the client protocol over local sockets, used to
+test the clients without a simulator.
+
+The sensors of the scene are taken from the CarlaSettings.ini sent by the
+client; cameras stream constant images and lidars a few points per channel.
+"""
+
+import socket
+import struct
+import threading
+import time
+
+from configparser import ConfigParser
+
+from carla import carla_server_pb2 as carla_protocol
+
+
+IMAGE_TYPES = ['None', 'SceneFinal', 'Depth', 'SemanticSegmentation']
+
+
+def _bind_consecutive_ports(count):
+    """Return "count" listening sockets bound to consecutive ports."""
+    while True:
+        sockets = []
+        try:
+            for index in range(count):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sockets.append(sock)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                port = 0 if index == 0 else sockets[0].getsockname()[1] + index
+                sock.bind(('127.0.0.1', port))
+                sock.listen(1)
+            return sockets
+        except socket.error:
+            for sock in sockets:
+                sock.close()
+
+
+def _send(connection, message):
+    connection.sendall(struct.pack('<L', len(message)) + message)
+
+
+def _recv_n(connection, length):
+    buf = bytearray()
+    while len(buf) < length:
+        data = connection.recv(length - len(buf))
+        if not data:
+            raise socket.error('connection closed')
+        buf += data
+    return bytes(buf)
+
+
+def _recv(connection):
+    length = struct.unpack('<L', _recv_n(connection, 4))[0]
+    return _recv_n(connection, length)
+
+
+class FakeSensor(object):
+    def __init__(self, sensor_id, name, options):
+        self.id = sensor_id
+        self.name = name
+        self.options = options
+        if options.get('SensorType', 'CAMERA') == 'CAMERA':
+            self.type = carla_protocol.Sensor.CAMERA
+        else:
+            self.type = carla_protocol.Sensor.LIDAR_RAY_CAST
+
+    def make_data(self, frame_number):
+        header = struct.pack('<L', self.id)
+        if self.type == carla_protocol.Sensor.CAMERA:
+            width = int(self.options.get('ImageSizeX', 720))
+            height = int(self.options.get('ImageSizeY', 512))
+            image_type = IMAGE_TYPES.index(self.options.get('PostProcessing', 'SceneFinal'))
+            fov = float(self.options.get('FOV', 90.0))
+            header += struct.pack('<QLLLf', frame_number, width, height, image_type, fov)
+            return header + bytes(bytearray([frame_number % 256])) * (4 * width * height)
+        channels = int(self.options.get('Channels', 32))
+        points_per_channel = 10
+        header += struct.pack('<QfL', frame_number, 0.0, channels)
+        header += struct.pack('<L', points_per_channel) * channels
+        points = struct.pack('<fff', 1.0, 2.0, 3.0) * (channels * points_per_channel)
+        return header + points
+
+
+class FakeCarlaServer(object):
+    """
+    Serves episodes on three consecutive ports starting at "port", as the
+    CARLA server does. In synchronous mode every frame waits for a control
+    message, otherwise frames are streamed every "frame_interval" seconds.
+    """
+
+    def __init__(self, number_of_player_starts=10, frame_interval=0.0, timestep=100):
+        self._world, self._stream, self._control = _bind_consecutive_ports(3)
+        self.port = self._world.getsockname()[1]
+        self.number_of_player_starts = number_of_player_starts
+        self.frame_interval = frame_interval
+        self.timestep = timestep
+        self.controls = []
+        self.episodes = []
+        self._episode = None
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_episode()
+        for sock in (self._world, self._stream, self._control):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+
+    def _serve(self):
+        try:
+            while True:
+                connection, _ = self._world.accept()
+                try:
+                    self._serve_world(connection)
+                except socket.error:
+                    pass
+                finally:
+                    self._stop_episode()
+                    connection.close()
+        except socket.error:
+            pass
+
+    def _serve_world(self, connection):
+        sensors = []
+        settings = {}
+        while True:
+            data = _recv(connection)
+            if data[:1] == b'\x0a':
+                self._stop_episode()
+                request = carla_protocol.RequestNewEpisode()
+                request.ParseFromString(data)
+                settings, sensors = self._parse_settings(request.ini_file)
+                _send(connection, self._make_scene(sensors).SerializeToString())
+            else:
+                start = carla_protocol.EpisodeStart()
+                start.ParseFromString(data)
+                self.episodes.append(start.player_start_spot_index)
+                _send(connection, carla_protocol.EpisodeReady(ready=True).SerializeToString())
+                self._start_episode(settings, sensors)
+
+    def _parse_settings(self, ini_file):
+        ini = ConfigParser()
+        ini.optionxform = str
+        ini.read_string(ini_file)
+        settings = dict(ini.items('CARLA/Server')) if ini.has_section('CARLA/Server') else {}
+        if ini.has_section('CARLA/LevelSettings'):
+            settings.update(ini.items('CARLA/LevelSettings'))
+        sensors = []
+        names = ini.get('CARLA/Sensor', 'Sensors') if ini.has_section('CARLA/Sensor') else ''
+        for index, name in enumerate(x for x in names.split(',') if x):
+            options = dict(ini.items('CARLA/Sensor/' + name))
+            sensors.append(FakeSensor(index + 1, name, options))
+        return settings, sensors
+
+    def _make_scene(self, sensors):
+        scene = carla_protocol.SceneDescription()
+        scene.map_name = 'Town01'
+        for index in range(self.number_of_player_starts):
+            spot = scene.player_start_spots.add()
+            spot.location.x = 100.0 * index
+            spot.location.y = 50.0
+            spot.orientation.x = 1.0
+        for fake_sensor in sensors:
+            pb_sensor = scene.sensors.add()
+            pb_sensor.id = fake_sensor.id
+            pb_sensor.name = fake_sensor.name
+            pb_sensor.type = fake_sensor.type
+        return scene
+
+    def _start_episode(self, settings, sensors):
+        stream, _ = self._stream.accept()
+        control, _ = self._control.accept()
+        episode = {'stream': stream, 'control': control, 'running': True}
+        thread = threading.Thread(target=self._stream_episode, args=(episode, settings, sensors))
+        thread.daemon = True
+        episode['thread'] = thread
+        self._episode = episode
+        thread.start()
+
+    def _stop_episode(self):
+        episode, self._episode = self._episode, None
+        if episode is not None:
+            episode['running'] = False
+            for sock in (episode['stream'], episode['control']):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+                sock.close()
+            episode['thread'].join()
+
+    def _stream_episode(self, episode, settings, sensors):
+        synchronous = settings.get('SynchronousMode', 'True') == 'True'
+        send_agents = settings.get('SendNonPlayerAgentsInfo', 'False') == 'True'
+        number_of_vehicles = int(settings.get('NumberOfVehicles', 0)) if send_agents else 0
+        number_of_pedestrians = int(settings.get('NumberOfPedestrians', 0)) if send_agents else 0
+        frame_number = 0
+        try:
+            while episode['running']:
+                frame_number += 1
+                measurements = self._make_measurements(
+                    frame_number, number_of_vehicles, number_of_pedestrians)
+                _send(episode['stream'], measurements.SerializeToString())
+                for fake_sensor in sensors:
+                    _send(episode['stream'], fake_sensor.make_data(frame_number))
+                _send(episode['stream'], b'')
+                if synchronous:
+                    control = carla_protocol.Control()
+                    control.ParseFromString(_recv(episode['control']))
+                    self.controls.append(control)
+                elif self.frame_interval > 0.0:
+                    time.sleep(self.frame_interval)
+        except socket.error:
+            pass
+
+    def _make_measurements(self, frame_number, number_of_vehicles, number_of_pedestrians):
+        measurements = carla_protocol.Measurements()
+        measurements.frame_number = frame_number
+        measurements.platform_timestamp = frame_number
+        measurements.game_timestamp = frame_number * self.timestep
+        player = measurements.player_measurements
+        player.transform.location.x = float(frame_number)
+        player.transform.orientation.x = 1.0
+        player.forward_speed = 10.0
+        player.autopilot_control.throttle = 0.5
+        for index in range(number_of_vehicles + number_of_pedestrians):
+            agent = measurements.non_player_agents.add()
+            agent.id = index + 1
+            if index < number_of_vehicles:
+                body = agent.vehicle
+            else:
+                body = agent.pedestrian
+            body.transform.location.x = float(index)
+            body.transform.location.y = float(frame_number)
+            body.transform.rotation.yaw = 90.0
+            body.bounding_box.extent.x = 2.0
+            body.bounding_box.extent.y = 1.0
+            body.bounding_box.extent.z = 0.5
+            body.forward_speed = float(index)
+        return measurements
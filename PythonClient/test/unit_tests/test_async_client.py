@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from carla.async_client import AsyncCarlaClient
+from carla.sensor import Camera
+from carla.settings import CarlaSettings
+
+from fake_carla_server import FakeCarlaServer
+
+
+def make_settings():
+    settings = CarlaSettings(SynchronousMode=True)
+    camera = Camera('CameraRGB')
+    camera.set_image_size(320, 240)
+    settings.add_sensor(camera)
+    return settings
+
+
+class testAsyncCarlaClient(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeCarlaServer().start()
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_episode(self):
+
+        async def run():
+            async with AsyncCarlaClient('127.0.0.1', self._server.port, timeout=5) as client:
+                scene = await client.load_settings(make_settings())
+                self.assertEqual(len(scene.player_start_spots), 10)
+                await client.start_episode(3)
+                measurements, sensor_data = await client.read_data()
+                await client.send_control(steer=0.5)
+                return measurements, sensor_data
+
+        measurements, sensor_data = asyncio.run(run())
+        self.assertEqual(measurements.frame_number, 1)
+        self.assertEqual(sorted(sensor_data.keys()), ['CameraRGB'])
+        self.assertEqual(sensor_data['CameraRGB'].width, 320)
+        self.assertEqual(self._server.episodes, [3])
+
+    def test_frames_synchronous_mode(self):
+        number_of_frames = 100
+
+        async def run():
+            async with AsyncCarlaClient('127.0.0.1', self._server.port, timeout=5) as client:
+                await client.load_settings(make_settings())
+                await client.start_episode(0)
+                frame_numbers = []
+                async for measurements, _ in client.frames():
+                    frame_numbers.append(measurements.frame_number)
+                    await client.send_control(measurements.player_measurements.autopilot_control)
+                    if len(frame_numbers) == number_of_frames:
+                        break
+                return frame_numbers
+
+        frame_numbers = asyncio.run(run())
+        self.assertEqual(frame_numbers, list(range(1, number_of_frames + 1)))
+        # The server waits for every control in synchronous mode.
+        self.assertGreaterEqual(len(self._server.controls), number_of_frames - 1)
+        self.assertEqual(self._server.controls[0].throttle, 0.5)
+
+    def test_break_out_of_frames(self):
+        tasks = []
+
+        async def run():
+            loop = asyncio.get_running_loop()
+
+            def task_factory(loop, coroutine):
+                task = asyncio.Task(coroutine, loop=loop)
+                tasks.append(task)
+                return task
+
+            loop.set_task_factory(task_factory)
+            async with AsyncCarlaClient('127.0.0.1', self._server.port, timeout=5) as client:
+                await client.load_settings(make_settings())
+                await client.start_episode(0)
+                frames = client.frames()
+                async for measurements, _ in frames:
+                    break
+            await asyncio.sleep(0.1)
+            # The frame received in advance was cancelled on disconnect, it
+            # did not fail reading from the closed stream.
+            self.assertTrue(all(task.done() for task in tasks))
+            self.assertTrue(any(task.cancelled() for task in tasks))
+            self.assertTrue(all(task.cancelled() or task.exception() is None for task in tasks))
+            await frames.aclose()
+
+        asyncio.run(run())
@@ -0,0 +1,120 @@
+import time
+import unittest
+
+from carla import prefetch
+from carla.client import CarlaClient
+from carla.client import VehicleControl
+from carla.client import make_carla_client
+from carla.sensor import Camera, Lidar
+from carla.settings import CarlaSettings
+from carla.util import make_connection
+
+from fake_carla_server import FakeCarlaServer
+
+
+def make_settings(**kwargs):
+    settings = CarlaSettings(**kwargs)
+    camera = Camera('CameraRGB')
+    camera.set_image_size(80, 60)
+    settings.add_sensor(camera)
+    settings.add_sensor(Lidar('Lidar32'))
+    return settings
+
+
+class testCarlaClient(unittest.TestCase):
+
+    def setUp(self):
+        self._server = FakeCarlaServer().start()
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_episode(self):
+        with make_carla_client('127.0.0.1', self._server.port, timeout=5) as client:
+            scene = client.load_settings(make_settings())
+            self.assertEqual([s.name for s in scene.sensors], ['CameraRGB', 'Lidar32'])
+            client.start_episode(1)
+            self.assertEqual(
+                sorted(client.episode_start_timings),
+                ['episode_ready', 'scene_description', 'settings_upload', 'socket_reconnect'])
+            for frame in range(1, 4):
+                measurements, sensor_data = client.read_data()
+                self.assertEqual(measurements.frame_number, frame)
+                image = sensor_data['CameraRGB']
+                self.assertEqual((image.width, image.height), (80, 60))
+                self.assertEqual(image.data.shape, (60, 80, 3))
+                self.assertEqual(image.frame_number, frame)
+                lidar = sensor_data['Lidar32']
+                self.assertEqual(lidar.data.shape, (320, 3))
+                client.send_control(throttle=1.0)
+            client.read_data()
+            client.send_control(VehicleControl(steer=-0.5, hand_brake=True))
+            client.read_data()
+        self.assertEqual(self._server.episodes, [1])
+        self.assertEqual(self._server.controls[0].throttle, 1.0)
+        self.assertEqual(self._server.controls[3], VehicleControl(steer=-0.5, hand_brake=True))
+
+    def test_lazy_measurements(self):
+        with make_connection(CarlaClient, '127.0.0.1', self._server.port, timeout=5,
+                             reuse_buffers=True, lazy_measurements=True) as client:
+            client.load_settings(make_settings(
+                SendNonPlayerAgentsInfo=True, NumberOfVehicles=3, NumberOfPedestrians=2))
+            client.start_episode(0)
+            first, _ = client.read_data()
+            client.send_control(throttle=1.0)
+            second, _ = client.read_data()
+            # Agents must outlive the receive buffers.
+            self.assertEqual(first.frame_number, 1)
+            self.assertEqual(first.player_measurements.transform.location.x, 1.0)
+            self.assertEqual([a.id for a in first.non_player_agents], [1, 2, 3, 4, 5])
+            self.assertTrue(first.non_player_agents[0].HasField('vehicle'))
+            self.assertTrue(first.non_player_agents[4].HasField('pedestrian'))
+            self.assertEqual(first.agent_columns.location[:, 1].tolist(), [1.0] * 5)
+            self.assertEqual(second.agent_columns.location[:, 1].tolist(), [2.0] * 5)
+
+    def test_reuse_buffers(self):
+        with make_connection(CarlaClient, '127.0.0.1', self._server.port, timeout=5,
+                             reuse_buffers=True) as client:
+            client.load_settings(make_settings())
+            client.start_episode(0)
+            for frame in range(1, 6):
+                measurements, sensor_data = client.read_data()
+                self.assertEqual(measurements.frame_number, frame)
+                self.assertEqual(sensor_data['CameraRGB'].data[0, 0, 0], frame)
+                client.send_control(throttle=1.0)
+            self.assertEqual(client._stream_client._buffer_pool.allocations, 4)
+
+    def test_prefetch_drop_oldest(self):
+        with make_connection(CarlaClient, '127.0.0.1', self._server.port, timeout=5,
+                             prefetch_frames=3, prefetch_policy=prefetch.DROP_OLDEST) as client:
+            client.load_settings(make_settings(SynchronousMode=False))
+            client.start_episode(0)
+            prefetcher = client.prefetcher
+            deadline = time.time() + 5
+            while prefetcher.dropped < 5 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertGreaterEqual(prefetcher.dropped, 5)
+            self.assertEqual(prefetcher.queued, 3)
+            first = client.read_data()[0].frame_number
+            second = client.read_data()[0].frame_number
+            self.assertEqual(second, first + 1)
+            self.assertGreater(first, 1)
+            client.load_settings(make_settings(SynchronousMode=False))
+            self.assertIsNone(client.prefetcher)
+
+    def test_prefetch_keep_latest(self):
+        self._server.frame_interval = 0.01
+        with make_connection(CarlaClient, '127.0.0.1', self._server.port, timeout=5,
+                             prefetch_frames=3, prefetch_policy=prefetch.KEEP_LATEST) as client:
+            client.load_settings(make_settings(SynchronousMode=False))
+            client.start_episode(0)
+            prefetcher = client.prefetcher
+            deadline = time.time() + 5
+            while prefetcher.received < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertGreaterEqual(prefetcher.received, 3)
+            measurements, sensor_data = client.read_data()
+            self.assertEqual(prefetcher.queued, 0)
+            self.assertEqual(measurements.frame_number, sensor_data['CameraRGB'].frame_number)
+            self.assertGreaterEqual(measurements.frame_number, 3)
+            self.assertGreater(client.read_data()[0].frame_number, measurements.frame_number)
@@ -0,0 +1,136 @@
+import csv
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from carla.agent import ForwardAgent
+from carla.client import make_carla_client
+from carla.driving_benchmark.client_pool import CarlaClientPool
+from carla.driving_benchmark.driving_benchmark import DrivingBenchmark
+from carla.driving_benchmark.experiment import Experiment
+from carla.driving_benchmark.experiment_suites.experiment_suite import ExperimentSuite
+from carla.settings import CarlaSettings
+from carla.tcp import TCPConnectionError
+
+from fake_carla_server import FakeCarlaServer
+
+
+class SmallExperimentSuite(ExperimentSuite):
+
+    @property
+    def train_weathers(self):
+        return [1]
+
+    @property
+    def test_weathers(self):
+        return [3]
+
+    def build_experiments(self):
+        experiments = []
+        for task, weather in enumerate([1, 3, 1]):
+            experiment = Experiment()
+            experiment.set(
+                Conditions=CarlaSettings(WeatherId=weather, NumberOfVehicles=task),
+                Poses=[[0, 1], [2, 4], [5, 3]],
+                Task=task,
+                Repetitions=1)
+            experiments.append(experiment)
+        return experiments
+
+
+class StraightRoadBenchmark(DrivingBenchmark):
+    """Does not need the positions to be on the roads of the town."""
+
+    def _get_directions(self, current_point, end_point):
+        return 2.0
+
+    def _get_shortest_path(self, start_point, end_point):
+        return 0.0
+
+
+class BrokenAgent(ForwardAgent):
+    """An agent with a bug."""
+
+    def run_step(self, measurements, sensor_data, directions, target):
+        raise ValueError('broken agent')
+
+
+class DyingAgent(ForwardAgent):
+    """Kills the first worker process running it, without any report."""
+
+    def __init__(self):
+        self._died = multiprocessing.Value('b', False)
+
+    def run_step(self, measurements, sensor_data, directions, target):
+        with self._died.get_lock():
+            die = not self._died.value
+            self._died.value = True
+        if die:
+            os._exit(1)
+        return super(DyingAgent, self).run_step(measurements, sensor_data, directions, target)
+
+
+def read_rows(path, filename):
+    with open(os.path.join(path, filename)) as f:
+        return [row for row in csv.reader(f)]
+
+
+class testCarlaClientPool(unittest.TestCase):
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.mkdtemp()
+        os.chdir(self._tmp)
+        self._servers = [FakeCarlaServer(timestep=200).start() for _ in range(3)]
+
+    def tearDown(self):
+        for server in self._servers:
+            server.stop()
+        os.chdir(self._cwd)
+        shutil.rmtree(self._tmp)
+
+    def run_sequential(self):
+        benchmark = StraightRoadBenchmark(name_to_save='Sequential')
+        with make_carla_client('127.0.0.1', self._servers[0].port, timeout=5) as client:
+            benchmark.benchmark_agent(SmallExperimentSuite('Town01'), ForwardAgent(), client)
+        return benchmark.get_path()
+
+    def run_parallel(self, servers, agent=None):
+        benchmark = StraightRoadBenchmark(name_to_save='Parallel')
+        benchmark.benchmark_agent_in_parallel(
+            SmallExperimentSuite('Town01'), agent or ForwardAgent(),
+            CarlaClientPool(servers, timeout=5, connection_attempts=1))
+        return benchmark.get_path()
+
+    def test_same_results_as_sequential(self):
+        sequential = self.run_sequential()
+        parallel = self.run_parallel([('127.0.0.1', server.port) for server in self._servers])
+        for filename in ['summary.csv', 'measurements.csv']:
+            self.assertEqual(read_rows(sequential, filename), read_rows(parallel, filename))
+        self.assertEqual(len(read_rows(parallel, 'summary.csv')), 10)
+        # Every server ran at least one episode besides the initial reset.
+        for server in self._servers[1:]:
+            self.assertGreater(len(server.episodes), 1)
+
+    def test_failed_server(self):
+        servers = [('127.0.0.1', self._servers[0].port), ('127.0.0.1', 1)]
+        path = self.run_parallel(servers)
+        self.assertEqual(len(read_rows(path, 'summary.csv')), 10)
+
+    def test_all_servers_failed(self):
+        with self.assertRaises(TCPConnectionError):
+            self.run_parallel([('127.0.0.1', 1)])
+
+    def test_agent_exception_is_raised(self):
+        servers = [('127.0.0.1', server.port) for server in self._servers]
+        with self.assertRaises(ValueError) as context:
+            self.run_parallel(servers, BrokenAgent())
+        self.assertIn('broken agent', str(context.exception.__cause__))
+        self.assertIn('run_step', str(context.exception.__cause__))
+
+    def test_dead_worker(self):
+        servers = [('127.0.0.1', server.port) for server in self._servers[:2]]
+        path = self.run_parallel(servers, DyingAgent())
+        self.assertEqual(len(read_rows(path, 'summary.csv')), 10)
@@ -0,0 +1,29 @@
+import itertools
+import unittest
+
+from carla.client import VehicleControl
+from carla.control import ControlEncoder
+
+
+class testControlEncoder(unittest.TestCase):
+
+    def test_same_bytes_as_protobuf(self):
+        encoder = ControlEncoder()
+        values = [0.0, -0.0, 1.0, -1.0, 0.1, 1e-8]
+        for steer, throttle, brake, hand_brake, reverse in itertools.product(
+                values, values, values, [False, True], [False, True]):
+            control = VehicleControl(
+                steer=steer, throttle=throttle, brake=brake, hand_brake=hand_brake, reverse=reverse)
+            expected = control.SerializeToString()
+            self.assertEqual(encoder.encode(steer, throttle, brake, hand_brake, reverse).tobytes(), expected)
+            self.assertEqual(encoder.encode_message(control).tobytes(), expected)
+
+    def test_round_trip(self):
+        data = ControlEncoder().encode(steer=-0.25, brake=0.5, reverse=True)
+        control = VehicleControl()
+        control.ParseFromString(data.tobytes())
+        self.assertEqual(control.steer, -0.25)
+        self.assertEqual(control.throttle, 0.0)
+        self.assertEqual(control.brake, 0.5)
+        self.assertFalse(control.hand_brake)
+        self.assertTrue(control.reverse)
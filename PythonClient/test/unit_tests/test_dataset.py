@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from carla import dataset
+from carla import sensor
+from carla import sensor_recorder
+
+
+def make_image(frame_number, width=8, height=6, image_type='SceneFinal'):
+    raw_data = numpy.random.RandomState(frame_number).randint(0, 256, (height, width, 4)).astype(numpy.uint8)
+    return sensor.Image(frame_number, width, height, image_type, 90.0, raw_data.tobytes())
+
+
+class testDataset(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+
+    def _write(self):
+        path = os.path.join(self._folder, 'dataset')
+        with dataset.DatasetWriter(path) as writer:
+            for episode in ('a', 'b'):
+                for frame in range(5):
+                    sensor_data = {'CameraRGB': make_image(frame), 'CameraDepth': make_image(frame + 10)}
+                    if episode == 'b' and frame == 2:
+                        del sensor_data['CameraDepth']
+                    writer.add_frame(episode, frame, sensor_data, {'steer': frame / 10.0, 'throttle': 1.0})
+        return dataset.Dataset(path)
+
+    def test_read_back(self):
+        data = self._write()
+        self.assertEqual(len(data), 10)
+        self.assertEqual(data.episodes, ['a', 'b'])
+        self.assertEqual(data.sensors, ['CameraDepth', 'CameraRGB'])
+        self.assertEqual(data.columns, ['steer', 'throttle'])
+        row = data.row('b', 3)
+        self.assertEqual(row, 8)
+        self.assertEqual(data.episode_rows('b').tolist(), [5, 6, 7, 8, 9])
+        self.assertIsInstance(data.images('CameraRGB'), numpy.memmap)
+        self.assertIs(data.images('CameraRGB'), data.images('CameraRGB'))
+        image = data.image('CameraRGB', row)
+        self.assertEqual((image.frame_number, image.width, image.height), (3, 8, 6))
+        self.assertEqual(image.raw_data.tobytes(), make_image(3).raw_data)
+        self.assertEqual(data.column('steer')[row], 0.3)
+        self.assertFalse(data.present('CameraDepth')[7])
+        self.assertEqual(data.images('CameraDepth')[7].max(), 0)
+        self.assertTrue(data.present('CameraDepth')[6])
+
+    def test_batches(self):
+        data = self._write()
+        batches = list(data.batches(4, sensors=['CameraRGB'], columns=['steer']))
+        self.assertEqual([len(batch['index']) for batch in batches], [4, 4, 2])
+        self.assertEqual(sorted(batches[0].keys()), ['CameraRGB', 'index', 'steer'])
+        self.assertEqual(batches[1]['CameraRGB'].shape, (4, 6, 8, 4))
+        shuffled = list(data.batches(4, shuffle=True, seed=1))
+        rows = numpy.concatenate([batch['index'] for batch in shuffled])
+        self.assertEqual(sorted(map(tuple, rows.tolist())), sorted(map(tuple, data.index.tolist())))
+
+    def test_convert_benchmark_results(self):
+        results = os.path.join(self._folder, 'results')
+        os.makedirs(results)
+        header = 'exp_id,rep,weather,start_point,end_point,steer\n'
+        rows = ['1,0,3,24,32,%d\n' % frame for frame in range(3)] + ['1,0,3,5,6,%d\n' % frame for frame in range(2)]
+        with open(os.path.join(results, 'measurements.csv'), 'w') as fd:
+            fd.write(header + ''.join(rows))
+        recorder = sensor_recorder.SensorRecorder(sensor_recorder.PNG)
+        for frame in range(3):
+            recorder.save(os.path.join(results, '_images', 'episode_3_1_24.32', 'CameraRGB',
+                                       'image_{:0>5d}'.format(frame)), make_image(frame))
+        recorder.close()
+        recorder = sensor_recorder.SensorRecorder(sensor_recorder.RAW)
+        for frame in range(2):
+            recorder.save(os.path.join(results, '_images', 'episode_3_1_5.6', 'CameraRGB'), make_image(frame))
+        recorder.close()
+
+        path = os.path.join(self._folder, 'dataset')
+        self.assertEqual(dataset.convert_benchmark_results(results, path), 5)
+        data = dataset.Dataset(path)
+        self.assertEqual(data.episodes, ['3_1_24.32_0', '3_1_5.6_0'])
+        self.assertEqual(data.column('steer').tolist(), [0, 1, 2, 0, 1])
+        self.assertEqual(data.index[:, 1].tolist(), [0, 1, 2, 0, 1])
+        self.assertTrue(data.present('CameraRGB').all())
+        for row, frame in enumerate([0, 1, 2, 0, 1]):
+            expected = numpy.frombuffer(make_image(frame).raw_data, dtype=numpy.uint8).reshape(6, 8, 4)
+            numpy.testing.assert_array_equal(data.images('CameraRGB')[row, :, :, :3], expected[:, :, :3])
+
+    def test_convert_repetitions(self):
+        results = os.path.join(self._folder, 'results')
+        os.makedirs(results)
+        header = 'exp_id,rep,weather,start_point,end_point,steer\n'
+        rows = ['1,%d,3,24,32,%d\n' % (rep, frame) for rep in range(2) for frame in range(2)]
+        with open(os.path.join(results, 'measurements.csv'), 'w') as fd:
+            fd.write(header + ''.join(rows))
+        recorder = sensor_recorder.SensorRecorder(sensor_recorder.RAW)
+        for folder, first_frame in (('episode_3_1_24.32', 0), ('episode_3_1_24.32_1', 10)):
+            for frame in range(2):
+                recorder.save(os.path.join(results, '_images', folder, 'CameraRGB'), make_image(first_frame + frame))
+        recorder.close()
+
+        path = os.path.join(self._folder, 'dataset')
+        self.assertEqual(dataset.convert_benchmark_results(results, path), 4)
+        data = dataset.Dataset(path)
+        self.assertEqual(data.episodes, ['3_1_24.32_0', '3_1_24.32_1'])
+        for row, frame in enumerate([0, 1, 10, 11]):
+            expected = numpy.frombuffer(make_image(frame).raw_data, dtype=numpy.uint8).reshape(6, 8, 4)
+            numpy.testing.assert_array_equal(data.images('CameraRGB')[row, :, :, :3], expected[:, :, :3])
+
+        # Repetitions saved to the same folder cannot be told apart.
+        shutil.rmtree(os.path.join(results, '_images', 'episode_3_1_24.32_1'))
+        self.assertRaises(ValueError, dataset.convert_benchmark_results, results, path)
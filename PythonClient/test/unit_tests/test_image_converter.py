@@ -0,0 +1,179 @@
+import math
+import unittest
+
+import numpy
+
+from carla import image_converter
+from carla import sensor
+
+
+def make_image(width, height, image_type='Depth', fov=90.0, seed=0):
+    raw_data = numpy.random.RandomState(seed).randint(0, 256, (height, width, 4)).astype(numpy.uint8)
+    return sensor.Image(0, width, height, image_type, fov, raw_data.tobytes())
+
+
+def reference_point_cloud(image, max_depth):
+    """Back-projection of each pixel with the inverse of the intrinsic matrix."""
+    bgra = numpy.frombuffer(image.raw_data, dtype=numpy.uint8).reshape(image.height, image.width, 4)
+    normalized_depth = numpy.dot(bgra[:, :, :3].astype(numpy.float64), [65536.0, 256.0, 1.0]) / 16777215.0
+    k = numpy.identity(3)
+    k[0, 2] = image.width / 2.0
+    k[1, 2] = image.height / 2.0
+    k[0, 0] = k[1, 1] = image.width / (2.0 * math.tan(image.fov * math.pi / 360.0))
+    points = []
+    for row in range(image.height):
+        for column in range(image.width):
+            depth = normalized_depth[row, column]
+            if depth <= max_depth:
+                u = image.width - 1 - column
+                v = image.height - 1 - row
+                points.append(numpy.dot(numpy.linalg.inv(k), [u, v, 1.0]) * depth * 1000.0)
+    return numpy.reshape(points, (-1, 3))
+
+
+class testToRGBArray(unittest.TestCase):
+
+    def test_contiguous_copy(self):
+        image = make_image(13, 7, 'SceneFinal')
+        bgra = image_converter.to_bgra_array(image)
+        out = numpy.empty((7, 13, 3), dtype=numpy.uint8)
+        self.assertIs(image_converter.to_rgb_array(image, out=out), out)
+        numpy.testing.assert_array_equal(out, bgra[:, :, 2::-1])
+        numpy.testing.assert_array_equal(image_converter.to_rgb_array(image), bgra[:, :, 2::-1])
+        self.assertIs(image_converter.to_bgr_array(image, out=out), out)
+        numpy.testing.assert_array_equal(out, bgra[:, :, :3])
+
+    def test_batch(self):
+        images = [make_image(13, 7, 'SceneFinal', seed=seed) for seed in range(4)]
+        batch = image_converter.to_rgb_batch(images)
+        self.assertEqual(batch.shape, (4, 7, 13, 3))
+        self.assertTrue(batch.flags['C_CONTIGUOUS'])
+        for index, image in enumerate(images):
+            numpy.testing.assert_array_equal(batch[index], image_converter.to_rgb_array(image))
+        bgr = image_converter.to_bgr_batch(images, out=batch)
+        self.assertIs(bgr, batch)
+        numpy.testing.assert_array_equal(bgr[3], image_converter.to_bgr_array(images[3]))
+        self.assertRaises(ValueError, image_converter.to_rgb_batch, images + [make_image(7, 13, 'SceneFinal')])
+
+
+class testLabelsToCityscapesPalette(unittest.TestCase):
+
+    def test_palette(self):
+        image = make_image(13, 7, 'SemanticSegmentation')
+        labels = image_converter.labels_to_array(image)
+        palette = image_converter.labels_to_cityscapes_palette(image)
+        self.assertEqual(palette.dtype, numpy.uint8)
+        self.assertEqual(palette.shape, (7, 13, 3))
+        for row in range(7):
+            for column in range(13):
+                label = labels[row, column]
+                expected = image_converter.CITYSCAPES_PALETTE[label] if label < 13 else [0, 0, 0]
+                self.assertEqual(palette[row, column].tolist(), list(expected))
+
+    def test_custom_palette(self):
+        image = make_image(13, 7, 'SemanticSegmentation')
+        labels = image_converter.labels_to_array(image)
+        out = numpy.empty((7, 13, 3), dtype=numpy.uint8)
+        colors = {int(labels[0, 0]): [1, 2, 3]}
+        for palette in (colors, image_converter.make_palette_lut(colors)):
+            result = image_converter.labels_to_cityscapes_palette(image, palette, out=out)
+            self.assertIs(result, out)
+            self.assertEqual(out[0, 0].tolist(), [1, 2, 3])
+            self.assertEqual(out[labels != labels[0, 0]].max(), 0)
+
+
+class testDepthToLocalPointCloud(unittest.TestCase):
+
+    def test_depth_to_array(self):
+        image = make_image(2, 1)
+        bgra = numpy.frombuffer(image.raw_data, dtype=numpy.uint8).reshape(1, 2, 4)
+        expected = (bgra[0, :, 0] * 65536.0 + bgra[0, :, 1] * 256.0 + bgra[0, :, 2]) / 16777215.0
+        self.assertEqual(image_converter.depth_to_array(image).tolist(), [expected.tolist()])
+
+    def test_depth_decoding(self):
+        image = make_image(13, 7)
+        bgra = numpy.frombuffer(image.raw_data, dtype=numpy.uint8).reshape(7, 13, 4).astype(numpy.int64)
+        encoded = bgra[:, :, 0] * 65536 + bgra[:, :, 1] * 256 + bgra[:, :, 2]
+        self.assertEqual(image_converter.depth_to_encoded_array(image).tolist(), encoded.tolist())
+        out = numpy.empty((7, 13), dtype=numpy.float32)
+        self.assertIs(image_converter.depth_to_array(image, out=out), out)
+        numpy.testing.assert_allclose(out, encoded / 16777215.0, rtol=1e-6)
+        meters = image_converter.depth_to_meters(image)
+        self.assertEqual(meters.dtype, numpy.float32)
+        numpy.testing.assert_allclose(meters, encoded * 1000.0 / 16777215.0, rtol=1e-6)
+
+    def test_logarithmic_grayscale(self):
+        image = make_image(13, 7)
+        with numpy.errstate(divide='ignore'):
+            expected = numpy.log(image_converter.depth_to_array(image)) / 5.70378 + 1.0
+        expected = numpy.clip(expected, 0.0, 1.0) * 255.0
+        grayscale = image_converter.depth_to_logarithmic_grayscale(image)
+        self.assertEqual(grayscale.dtype, numpy.uint8)
+        self.assertEqual(grayscale.shape, (7, 13, 3))
+        for channel in range(3):
+            numpy.testing.assert_allclose(grayscale[:, :, channel], expected, atol=1.0)
+
+    def test_point_cloud(self):
+        image = make_image(13, 7, fov=70.0)
+        color = numpy.random.RandomState(1).randint(0, 256, (7, 13, 3)).astype(numpy.uint8)
+        depth = image_converter.depth_to_array(image).reshape(-1)
+        for max_depth in (0.9, 0.3, 1.0, -1.0):
+            point_cloud = image_converter.depth_to_local_point_cloud(image, color, max_depth)
+            numpy.testing.assert_allclose(point_cloud.array, reference_point_cloud(image, max_depth), atol=1e-9)
+            numpy.testing.assert_array_equal(point_cloud.color_array, color.reshape(-1, 3)[depth <= max_depth])
+
+    def test_preallocated_output(self):
+        image = make_image(13, 7)
+        out = numpy.empty((13 * 7, 3))
+        point_cloud = image_converter.depth_to_local_point_cloud(image, out=out)
+        self.assertTrue(numpy.shares_memory(point_cloud.array, out))
+        numpy.testing.assert_allclose(point_cloud.array, reference_point_cloud(image, 0.9), atol=1e-9)
+
+    def test_projector_cache(self):
+        projector = image_converter.get_depth_projector(13, 7, 90.0)
+        self.assertIs(image_converter.get_depth_projector(13, 7, 90.0), projector)
+        self.assertIsNot(image_converter.get_depth_projector(13, 7, 70.0), projector)
+        self.assertEqual(projector.rays.shape, (13 * 7, 3))
+
+
+class testImageConversion(unittest.TestCase):
+
+    def test_policies(self):
+        for image_type in ('SceneFinal', 'Depth', 'SemanticSegmentation'):
+            expected = make_image(13, 7, image_type).data
+            image = make_image(13, 7, image_type)
+            view = image.convert(sensor.VIEW)
+            numpy.testing.assert_array_equal(view, expected)
+            self.assertIsNot(image.convert(sensor.VIEW), view)
+            out = numpy.empty_like(expected)
+            self.assertIs(image.convert(sensor.INTO_BUFFER, out), out)
+            numpy.testing.assert_array_equal(out, expected)
+            released = image.convert(sensor.RELEASE_RAW)
+            self.assertIsNone(image.raw_data)
+            self.assertTrue(released.flags['C_CONTIGUOUS'])
+            numpy.testing.assert_array_equal(released, expected)
+            self.assertIs(image.data, released)
+            self.assertRaises(RuntimeError, image.save_to_disk, 'image')
+
+    def test_release_raw_after_cache(self):
+        for image_type in ('SceneFinal', 'Depth', 'SemanticSegmentation'):
+            image = make_image(13, 7, image_type)
+            cached = image.data
+            expected = cached.copy()
+            released = image.convert(sensor.RELEASE_RAW)
+            self.assertIsNone(image.raw_data)
+            self.assertTrue(released.flags['C_CONTIGUOUS'])
+            self.assertTrue(released.flags['OWNDATA'])
+            numpy.testing.assert_array_equal(released, expected)
+            self.assertIs(image.data, released)
+
+    def test_invalid_arguments(self):
+        image = make_image(13, 7, 'Depth')
+        self.assertRaises(ValueError, image.convert, sensor.INTO_BUFFER)
+        self.assertRaises(ValueError, image.convert, sensor.VIEW, numpy.empty((7, 13)))
+        self.assertRaises(ValueError, image.convert, 'unknown')
+
+    def test_slots(self):
+        image = make_image(13, 7)
+        self.assertFalse(hasattr(image, '__dict__'))
+        self.assertRaises(AttributeError, setattr, image, 'unknown', 0)
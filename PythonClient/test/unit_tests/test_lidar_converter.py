@@ -0,0 +1,55 @@
+import unittest
+
+import numpy
+
+from carla import lidar_converter
+from carla import sensor
+
+
+def make_lidar(point_count_by_channel, seed=0):
+    count = sum(point_count_by_channel)
+    points = numpy.random.RandomState(seed).uniform(-60.0, 60.0, (count, 3)).astype(numpy.float32)
+    return sensor.LidarMeasurement(
+        0, 0.0, len(point_count_by_channel),
+        numpy.array(point_count_by_channel, dtype=numpy.uint32),
+        sensor.PointCloud(0, points))
+
+
+class testLidarMeasurement(unittest.TestCase):
+
+    def test_channels(self):
+        lidar = make_lidar([3, 0, 5, 2])
+        self.assertEqual(lidar.channel_offsets.tolist(), [0, 3, 3, 8, 10])
+        self.assertEqual(lidar.ring_index.tolist(), [0, 0, 0, 2, 2, 2, 2, 2, 3, 3])
+        channel = lidar.channel(2)
+        self.assertEqual(channel.shape, (5, 3))
+        self.assertTrue(numpy.shares_memory(channel, lidar.data))
+        numpy.testing.assert_array_equal(channel, lidar.data[3:8])
+        self.assertEqual(len(lidar.channel(1)), 0)
+        self.assertRaises(IndexError, lidar.channel, 4)
+
+
+class testBirdEyeView(unittest.TestCase):
+
+    def test_occupancy(self):
+        points = make_lidar([500, 500]).data
+        view = lidar_converter.BirdEyeView(size=200, resolution=0.5)
+        image = view.rasterize(points)
+        expected = numpy.zeros((200, 200), dtype=numpy.uint8)
+        for x, y, _ in points:
+            column, row = int(numpy.floor(x * 2.0 + 100.0)), int(numpy.floor(y * 2.0 + 100.0))
+            if 0 <= column < 200 and 0 <= row < 200:
+                expected[row, column] = 255
+        numpy.testing.assert_array_equal(image, expected)
+        # The buffer is reused and cleared.
+        self.assertIs(view.rasterize(points[:1] * 0.0), image)
+        self.assertEqual(numpy.flatnonzero(image).tolist(), [100 * 200 + 100])
+
+    def test_height(self):
+        points = numpy.array([[0.1, 0.1, -3.0], [0.2, 0.2, 3.0], [0.3, 0.3, 0.0], [-1.0, 0.0, 0.0]])
+        view = lidar_converter.BirdEyeView(size=4, resolution=1.0, mode=lidar_converter.HEIGHT, channels=3)
+        image = view.rasterize(points)
+        self.assertEqual(image.shape, (4, 4, 3))
+        self.assertEqual(image[2, 2].tolist(), [255, 255, 255])
+        self.assertEqual(image[2, 1].tolist(), [128, 128, 128])
+        self.assertEqual(numpy.count_nonzero(image[:, :, 0]), 2)
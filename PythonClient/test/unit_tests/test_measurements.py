@@ -0,0 +1,149 @@
+import unittest
+
+import numpy
+
+from carla import carla_server_pb2 as carla_protocol
+from carla import measurements as carla_measurements
+from carla.measurements import AgentArrays
+from carla.measurements import LazyMeasurements
+
+
+def make_measurements():
+    measurements = carla_protocol.Measurements()
+    measurements.frame_number = 7
+    measurements.platform_timestamp = 100
+    measurements.game_timestamp = 200
+    measurements.player_measurements.forward_speed = 3.5
+    measurements.player_measurements.transform.location.x = 12.0
+    vehicle = measurements.non_player_agents.add()
+    vehicle.id = 1
+    vehicle.vehicle.transform.location.x = 1.0
+    vehicle.vehicle.transform.location.y = 2.0
+    vehicle.vehicle.forward_speed = 4.0
+    vehicle.vehicle.bounding_box.extent.x = 2.0
+    pedestrian = measurements.non_player_agents.add()
+    pedestrian.id = 2
+    pedestrian.pedestrian.transform.location.z = 3.0
+    pedestrian.pedestrian.forward_speed = 1.0
+    pedestrian.pedestrian.bounding_box.extent.y = 0.5
+    traffic_light = measurements.non_player_agents.add()
+    traffic_light.id = 3
+    traffic_light.traffic_light.transform.location.y = -5.0
+    traffic_light.traffic_light.state = carla_protocol.TrafficLight.RED
+    return measurements
+
+
+class testLazyMeasurements(unittest.TestCase):
+
+    def test_fields(self):
+        measurements = make_measurements()
+        data = memoryview(bytearray(measurements.SerializeToString()))
+        lazy = LazyMeasurements(data)
+        self.assertEqual(lazy.frame_number, 7)
+        self.assertEqual(lazy.platform_timestamp, 100)
+        self.assertEqual(lazy.game_timestamp, 200)
+        self.assertEqual(lazy.player_measurements, measurements.player_measurements)
+        self.assertEqual(lazy.number_of_agents, 3)
+        self.assertIsNone(lazy._non_player_agents)
+        self.assertEqual(list(lazy.non_player_agents), list(measurements.non_player_agents))
+        self.assertIs(lazy.non_player_agents, lazy.non_player_agents)
+        self.assertEqual(lazy.to_protobuf(), measurements)
+
+    def test_agent_columns(self):
+        lazy = LazyMeasurements(make_measurements().SerializeToString())
+        columns = lazy.agent_columns
+        self.assertEqual(columns.location.tolist(), [[1, 2, 0], [0, 0, 3], [0, -5, 0]])
+        self.assertEqual(columns.forward_speed.tolist(), [4, 1, 0])
+        self.assertEqual(columns.extent.tolist(), [[2, 0, 0], [0, 0.5, 0], [0, 0, 0]])
+
+
+class testAgentArrays(unittest.TestCase):
+
+    def test_update(self):
+        measurements = make_measurements()
+        measurements.non_player_agents[0].vehicle.transform.rotation.yaw = 90.0
+        arrays = AgentArrays().update(measurements.non_player_agents)
+        self.assertEqual(len(arrays), 3)
+        self.assertEqual(arrays.id.tolist(), [1, 2, 3])
+        self.assertEqual(arrays.kind.tolist(), [
+            carla_measurements.VEHICLE,
+            carla_measurements.PEDESTRIAN,
+            carla_measurements.TRAFFIC_LIGHT])
+        self.assertEqual(arrays.location.tolist(), [[1, 2, 0], [0, 0, 3], [0, -5, 0]])
+        self.assertEqual(arrays.yaw.tolist(), [90, 0, 0])
+        self.assertEqual(arrays.forward_speed.tolist(), [4, 1, 0])
+        self.assertEqual(arrays.extent.tolist(), [[2, 0, 0], [0, 0.5, 0], [0, 0, 0]])
+        self.assertEqual(arrays.traffic_light_state.tolist(), [-1, -1, carla_protocol.TrafficLight.RED])
+
+    def test_incremental_update(self):
+        measurements = make_measurements()
+        arrays = AgentArrays(capacity=3).update(measurements.non_player_agents)
+        location = arrays.location
+        measurements.non_player_agents[0].vehicle.transform.location.x = 10.0
+        measurements.non_player_agents[2].traffic_light.state = carla_protocol.TrafficLight.GREEN
+        arrays.update(measurements.non_player_agents)
+        # Same storage, updated in place.
+        self.assertTrue(numpy.shares_memory(location, arrays.location))
+        self.assertEqual(location[0].tolist(), [10, 2, 0])
+        self.assertEqual(arrays.traffic_light_state[2], carla_protocol.TrafficLight.GREEN)
+        # An agent replaced by another one with a different id.
+        del measurements.non_player_agents[1]
+        pedestrian = measurements.non_player_agents.add()
+        pedestrian.id = 4
+        pedestrian.pedestrian.forward_speed = 2.0
+        arrays.update(measurements.non_player_agents)
+        self.assertEqual(arrays.id.tolist(), [1, 3, 4])
+        self.assertEqual(arrays.kind.tolist(), [
+            carla_measurements.VEHICLE,
+            carla_measurements.TRAFFIC_LIGHT,
+            carla_measurements.PEDESTRIAN])
+        self.assertEqual(arrays.location.tolist(), [[10, 2, 0], [0, -5, 0], [0, 0, 0]])
+        self.assertEqual(arrays.forward_speed.tolist(), [4, 0, 2])
+        self.assertEqual(arrays.traffic_light_state.tolist(), [-1, carla_protocol.TrafficLight.GREEN, -1])
+        # Growing keeps the previous rows.
+        for agent_id in range(5, 10):
+            measurements.non_player_agents.add(id=agent_id).vehicle.forward_speed = agent_id
+        arrays.update(measurements.non_player_agents)
+        self.assertEqual(arrays.id.tolist(), [1, 3, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(arrays.forward_speed.tolist(), [4, 0, 2, 5, 6, 7, 8, 9])
+        arrays.update([])
+        self.assertEqual(len(arrays), 0)
+
+    def test_rows_matched_by_id(self):
+        measurements = make_measurements()
+        sign = measurements.non_player_agents.add(id=5)
+        sign.speed_limit_sign.transform.location.x = 7.0
+        sign.speed_limit_sign.speed_limit = 30.0
+        arrays = AgentArrays().update(measurements.non_player_agents)
+        self.assertEqual((arrays.row(3), arrays.row(5)), (2, 3))
+        # An agent inserted first shifts every other row.
+        agents = list(measurements.non_player_agents)
+        new_agent = carla_protocol.Agent(id=9)
+        new_agent.pedestrian.forward_speed = 2.0
+        agents[2].traffic_light.state = carla_protocol.TrafficLight.YELLOW
+        arrays.update([new_agent] + agents)
+        self.assertEqual(arrays.id.tolist(), [9, 1, 2, 3, 5])
+        self.assertEqual((arrays.row(3), arrays.row(5), arrays.row(9)), (3, 4, 0))
+        self.assertRaises(KeyError, arrays.row, 4)
+        self.assertEqual(arrays.location.tolist(), [[0, 0, 0], [1, 2, 0], [0, 0, 3], [0, -5, 0], [7, 0, 0]])
+        self.assertEqual(arrays.forward_speed.tolist(), [2, 4, 1, 0, 0])
+        self.assertEqual(arrays.kind.tolist()[3:], [
+            carla_measurements.TRAFFIC_LIGHT,
+            carla_measurements.SPEED_LIMIT_SIGN])
+        self.assertEqual(arrays.traffic_light_state.tolist(), [-1, -1, -1, carla_protocol.TrafficLight.YELLOW, -1])
+
+    def test_update_serialized(self):
+        measurements = make_measurements()
+        lazy = LazyMeasurements(measurements.SerializeToString())
+        arrays = AgentArrays().update_serialized(lazy.serialized_agents)
+        expected = AgentArrays().update(measurements.non_player_agents)
+        for name in ('id', 'kind', 'location', 'yaw', 'forward_speed', 'extent', 'traffic_light_state'):
+            numpy.testing.assert_array_equal(getattr(arrays, name), getattr(expected, name))
+        # Moved and removed agents.
+        measurements.non_player_agents[0].vehicle.transform.location.x = 10.0
+        del measurements.non_player_agents[1]
+        arrays.update_serialized(LazyMeasurements(measurements.SerializeToString()).serialized_agents)
+        self.assertEqual(arrays.id.tolist(), [1, 3])
+        self.assertEqual(arrays.row(3), 1)
+        self.assertEqual(arrays.location.tolist(), [[10, 2, 0], [0, -5, 0]])
+        self.assertEqual(arrays.traffic_light_state.tolist(), [-1, carla_protocol.TrafficLight.RED])
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from carla import sensor
+from carla.sensor import PointCloud
+
+
+class testPointCloud(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+        self._points = numpy.array([[0.0, 1.5, -2.25], [10.0, 20.0, 30.0], [-1.0, 0.5, 0.125]])
+        self._colors = numpy.array([[255, 0, 0], [0, 128, 0], [1, 2, 3]], dtype=numpy.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+
+    def _save_and_load(self, point_cloud, file_format):
+        filename = os.path.join(self._folder, 'sub', 'cloud')
+        point_cloud.save_to_disk(filename, file_format)
+        extension = '.npz' if file_format == sensor.NPZ else '.ply'
+        return PointCloud.load_from_disk(filename + extension)
+
+    def test_formats(self):
+        for file_format in (sensor.PLY_BINARY, sensor.PLY_ASCII, sensor.NPZ):
+            for colors in (None, self._colors):
+                loaded = self._save_and_load(PointCloud(0, self._points, colors), file_format)
+                # ASCII PLY keeps two decimals.
+                numpy.testing.assert_allclose(loaded.array, self._points, atol=0.01)
+                self.assertEqual(loaded.has_colors(), colors is not None)
+                if colors is not None:
+                    numpy.testing.assert_array_equal(loaded.color_array, colors)
+
+    def test_binary_ply_layout(self):
+        filename = os.path.join(self._folder, 'cloud.ply')
+        PointCloud(0, self._points, self._colors).save_to_disk(filename)
+        with open(filename, 'rb') as ply_file:
+            data = ply_file.read()
+        header, body = data.split(b'end_header\n')
+        self.assertIn(b'format binary_little_endian 1.0\nelement vertex 3\n', header)
+        self.assertEqual(len(body), 3 * (3 * 4 + 3))
+        self.assertEqual(numpy.frombuffer(body[:12], dtype='<f4').tolist(), [0.0, 1.5, -2.25])
+        self.assertEqual(list(bytearray(body[12:15])), [255, 0, 0])
+
+    def test_ascii_ply_unchanged(self):
+        filename = os.path.join(self._folder, 'cloud.ply')
+        PointCloud(0, self._points[:1]).save_to_disk(filename, sensor.PLY_ASCII)
+        with open(filename) as ply_file:
+            self.assertEqual(ply_file.read(), '\n'.join([
+                'ply',
+                'format ascii 1.0',
+                'element vertex 1',
+                'property float32 x',
+                'property float32 y',
+                'property float32 z',
+                'end_header',
+                '0.00 1.50 -2.25']))
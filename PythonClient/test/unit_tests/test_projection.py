@@ -0,0 +1,73 @@
+import unittest
+
+import numpy
+
+from carla import carla_server_pb2 as carla_protocol
+from carla import image_converter
+from carla import projection
+from carla import sensor
+from carla.transform import Rotation, Transform, Translation
+
+
+def make_agent(agent_id, x, y, yaw, extent, kind='vehicle'):
+    agent = carla_protocol.Agent()
+    agent.id = agent_id
+    body = getattr(agent, kind)
+    body.transform.location.x = x
+    body.transform.location.y = y
+    body.transform.rotation.yaw = yaw
+    body.bounding_box.transform.location.z = extent[2]
+    body.bounding_box.extent.x, body.bounding_box.extent.y, body.bounding_box.extent.z = extent
+    return agent
+
+
+class testBoxProjector(unittest.TestCase):
+
+    def setUp(self):
+        self.camera = sensor.Camera('CameraRGB', FOV=90.0)
+        self.camera.set_image_size(80, 60)
+        self.camera.set_position(2.0, 0.0, 1.4)
+
+    def test_depth_round_trip(self):
+        projector = image_converter.DepthProjector(80, 60, 90.0)
+        depth = numpy.random.RandomState(0).uniform(0.001, 0.01, (60, 80))
+        points, _ = projector.project(depth, max_depth=1.0)
+        pixels = projection.BoxProjector(self.camera).project_points(points)
+        rows, columns = numpy.indices((60, 80))
+        numpy.testing.assert_allclose(pixels[:, 0], columns.reshape(-1), atol=1e-9)
+        numpy.testing.assert_allclose(pixels[:, 1], rows.reshape(-1), atol=1e-9)
+
+    def test_agent_boxes(self):
+        agents = [make_agent(1, 20.0, 3.0, 30.0, (2.0, 1.0, 0.8)),
+                  carla_protocol.Agent(id=2),
+                  make_agent(3, -5.0, 0.0, 0.0, (0.3, 0.3, 0.9), 'pedestrian')]
+        ids, matrices, extents = projection.agent_boxes(agents)
+        self.assertEqual(ids.tolist(), [1, 3])
+        numpy.testing.assert_allclose(extents, [[2.0, 1.0, 0.8], [0.3, 0.3, 0.9]], rtol=1e-6)
+        expected = Transform(Translation(20.0, 3.0, 0.0), Rotation(yaw=30.0)) * Transform(Translation(z=0.8))
+        numpy.testing.assert_allclose(matrices[0], expected.matrix, atol=1e-6)
+        self.assertEqual(projection.agent_boxes([])[1].shape, (0, 4, 4))
+
+    def test_project(self):
+        agents = [make_agent(1, 20.0, 0.0, 0.0, (2.0, 1.0, 0.8)),
+                  make_agent(2, -20.0, 0.0, 0.0, (2.0, 1.0, 0.8)),
+                  make_agent(3, 20.0, 200.0, 0.0, (2.0, 1.0, 0.8)),
+                  make_agent(4, 20.0, 3.0, 90.0, (2.0, 1.0, 0.8))]
+        _, matrices, extents = projection.agent_boxes(agents)
+        player = Transform(Translation(1.0, 0.0, 0.0))
+        projector = projection.BoxProjector(self.camera)
+        pixels, boxes, visible = projector.project(player, matrices, extents)
+        self.assertEqual(pixels.shape, (4, 8, 2))
+        self.assertEqual(visible.tolist(), [True, False, False, True])
+        # Straight ahead, centered on the columns of the image.
+        self.assertAlmostEqual((boxes[0, 0] + boxes[0, 2]) / 2.0, 80 / 2.0 - 1, places=9)
+        self.assertTrue((boxes[:, 0::2] >= 0).all() and (boxes[:, 0::2] <= 79).all())
+        # Same as projecting each corner with Transforms.
+        camera_to_world = player * self.camera.get_unreal_transform()
+        for index in (0, 3):
+            corners = Transform(matrix=matrices[index]).transform_points(
+                projection._UNIT_BOX_CORNERS * extents[index])
+            local = camera_to_world.inverse().transform_points(corners)
+            numpy.testing.assert_allclose(pixels[index], projector.project_points(local), atol=1e-9)
+        far = projection.BoxProjector(self.camera, far=10.0)
+        self.assertFalse(far.project(player, matrices, extents)[2].any())
@@ -229,6 +229,27 @@ class testRecording(unittest.TestCase):
         self.assertEqual(pose, 2)
         self.assertEqual(experiment, 0)
 
+    def test_save_images(self):
+
+        import os
+        import numpy
+        from carla.sensor import Image
+
+        recording = Recording(name_to_save='Test1'
+                              , continue_experiment=False, save_images=True
+                              )
+
+        raw_data = numpy.zeros((6, 8, 4), dtype=numpy.uint8).tobytes()
+        for frame in range(3):
+            recording.save_images({'CameraRGB': Image(frame, 8, 6, 'SceneFinal', 90.0, raw_data)},
+                                  'episode', frame)
+        recording.flush_images()
+
+        folder = os.path.join(recording.path, '_images', 'episode_episode', 'CameraRGB')
+        self.assertEqual(sorted(os.listdir(folder)),
+                         ['image_00000.png', 'image_00001.png', 'image_00002.png'])
+        self.assertEqual(recording.recorder.saved, 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+import struct
+import unittest
+
+import numpy
+
+from carla import sensor_parsers
+from carla.carla_server_pb2 import Sensor
+
+
+def make_sensor(sensor_id, name, sensor_type):
+    pb_sensor = Sensor()
+    pb_sensor.id = sensor_id
+    pb_sensor.name = name
+    pb_sensor.type = sensor_type
+    return pb_sensor
+
+
+class testSensorParsers(unittest.TestCase):
+
+    def test_parse_image(self):
+        parsers = sensor_parsers.make_sensor_parsers([make_sensor(7, 'CameraDepth', Sensor.CAMERA)])
+        pixels = bytes(bytearray(range(4 * 3 * 2)))
+        data = struct.pack('<LQLLLf', 7, 42, 3, 2, 2, 90.0) + pixels
+        name, image = sensor_parsers.parse_sensor_data(parsers, bytearray(data))
+        self.assertEqual(name, 'CameraDepth')
+        self.assertEqual((image.frame_number, image.width, image.height), (42, 3, 2))
+        self.assertEqual((image.type, image.fov), ('Depth', 90.0))
+        self.assertEqual(bytes(image.raw_data), pixels)
+
+    def test_parse_lidar(self):
+        parsers = sensor_parsers.make_sensor_parsers([make_sensor(1, 'Lidar', Sensor.LIDAR_RAY_CAST)])
+        points = numpy.arange(3 * 5, dtype=numpy.float32)
+        data = struct.pack('<LQfL', 1, 9, 0.5, 2) + struct.pack('<LL', 2, 3) + points.tobytes()
+        name, lidar = sensor_parsers.parse_sensor_data(parsers, data)
+        self.assertEqual(name, 'Lidar')
+        self.assertEqual((lidar.frame_number, lidar.horizontal_angle, lidar.channels), (9, 0.5, 2))
+        self.assertEqual(list(lidar.point_count_by_channel), [2, 3])
+        numpy.testing.assert_array_equal(lidar.data, points.reshape(5, 3))
+
+    def test_register_sensor_parser(self):
+        sensor_type = 1000
+
+        def make_parser(sensor_description):
+            return lambda data: (sensor_description.name, bytes(data))
+
+        sensor_parsers.register_sensor_parser(sensor_type, make_parser)
+        try:
+            parsers = sensor_parsers.make_sensor_parsers([make_sensor(3, 'Custom', sensor_type)])
+            result = sensor_parsers.parse_sensor_data(parsers, struct.pack('<L', 3) + b'abc')
+            self.assertEqual(result, ('Custom', ('Custom', b'abc')))
+        finally:
+            del sensor_parsers._parser_factories[sensor_type]
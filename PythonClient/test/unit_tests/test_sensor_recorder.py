@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy
+
+from carla import sensor
+from carla import sensor_recorder
+from carla.sensor_recorder import SensorRecorder
+
+
+def make_image(frame_number, width=8, height=6, seed=0):
+    raw_data = numpy.random.RandomState(seed).randint(0, 256, (height, width, 4)).astype(numpy.uint8)
+    return sensor.Image(frame_number, width, height, 'SceneFinal', 90.0, bytearray(raw_data.tobytes()))
+
+
+class testSensorRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+
+    def test_png(self):
+        from PIL import Image as PImage
+        recorder = SensorRecorder(sensor_recorder.PNG)
+        image = make_image(0)
+        expected = numpy.frombuffer(bytes(image.raw_data), dtype=numpy.uint8).reshape(6, 8, 4)[:, :, 2::-1]
+        recorder.save(os.path.join(self._folder, 'camera', 'image_00000'), image)
+        # The data is copied, the buffer can be reused right away.
+        image.raw_data[:] = b'\x00' * len(image.raw_data)
+        recorder.close()
+        self.assertEqual(recorder.saved, 1)
+        saved = numpy.asarray(PImage.open(os.path.join(self._folder, 'camera', 'image_00000.png')))
+        numpy.testing.assert_array_equal(saved, expected)
+
+    def test_raw_container(self):
+        recorder = SensorRecorder(sensor_recorder.RAW, workers=3)
+        images = [make_image(frame, seed=frame) for frame in range(10)]
+        filename = os.path.join(self._folder, 'camera')
+        for image in images:
+            recorder.save(filename, image)
+        recorder.flush()
+        # Appended to the same container after a flush.
+        recorder.save(filename, make_image(10, seed=10))
+        recorder.close()
+        loaded = list(sensor_recorder.read_raw_images(filename + '.raw'))
+        self.assertEqual([image.frame_number for image in loaded], list(range(11)))
+        for image, expected in zip(loaded, images):
+            self.assertEqual((image.width, image.height, image.type, image.fov), (8, 6, 'SceneFinal', 90.0))
+            self.assertEqual(image.raw_data, bytes(expected.raw_data))
+
+    def test_backpressure(self):
+        recorder = SensorRecorder(sensor_recorder.RAW, workers=1, max_queued=1, block=False)
+        # Keep the worker busy until released.
+        release = threading.Event()
+        original_save = recorder._save
+        recorder._save = lambda *args: release.wait() and original_save(*args)
+        filename = os.path.join(self._folder, 'camera')
+        results = [recorder.save(filename, make_image(frame)) for frame in range(5)]
+        self.assertIn(False, results)
+        self.assertEqual(recorder.dropped, results.count(False))
+        release.set()
+        recorder.close()
+        self.assertEqual(recorder.saved, results.count(True))
+
+    def test_errors_raised_by_flush(self):
+        recorder = SensorRecorder(sensor_recorder.RAW)
+        recorder.save(os.path.join(self._folder, 'file', 'camera'), make_image(0))
+        recorder.flush()
+        # A folder cannot be created under a file.
+        recorder.save(os.path.join(self._folder, 'file', 'camera.raw', 'camera'), make_image(0))
+        self.assertRaises(Exception, recorder.flush)
+        recorder.close()
@@ -0,0 +1,117 @@
+import io
+import pickle
+import unittest
+
+from configparser import ConfigParser
+
+import numpy
+
+from carla import schema
+from carla import sensor
+from carla.settings import CarlaSettings
+
+
+def legacy_ini(settings):
+    """The INI text as CarlaSettings.__str__ wrote it with ConfigParser."""
+    ini = ConfigParser()
+    ini.optionxform = str
+
+    def add_section(section, obj, keys):
+        for key in keys:
+            if hasattr(obj, key) and getattr(obj, key) is not None:
+                if not ini.has_section(section):
+                    ini.add_section(section)
+                ini.set(section, key, str(getattr(obj, key)))
+
+    add_section('CARLA/Server', settings, ['SynchronousMode', 'SendNonPlayerAgentsInfo'])
+    add_section('CARLA/QualitySettings', settings, ['QualityLevel'])
+    add_section('CARLA/LevelSettings', settings, [
+        'NumberOfVehicles', 'NumberOfPedestrians', 'WeatherId', 'SeedVehicles', 'SeedPedestrians',
+        'DisableTwoWheeledVehicles'])
+    ini.add_section('CARLA/Sensor')
+    ini.set('CARLA/Sensor', 'Sensors', ','.join(s.SensorName for s in settings._sensors))
+    for sensor_def in settings._sensors:
+        keys = [a for a in dir(sensor_def) if not a.startswith('_') and not callable(getattr(sensor_def, a))]
+        add_section('CARLA/Sensor/' + sensor_def.SensorName, sensor_def, keys)
+    text = io.StringIO()
+    ini.write(text)
+    return text.getvalue().replace(' = ', '=')
+
+
+class testCarlaSettings(unittest.TestCase):
+
+    def test_same_ini_as_config_parser(self):
+        settings = CarlaSettings(NumberOfVehicles=7, QualityLevel='Low')
+        self.assertEqual(str(settings), legacy_ini(settings))
+        settings.randomize_seeds()
+        settings.add_sensor(sensor.Camera('CameraRGB', FOV=70.0, PostProcessing=None))
+        settings.add_sensor(sensor.Lidar('Lidar32', Range=80.0))
+        self.assertEqual(str(settings), legacy_ini(settings))
+        # Sensors with the same name share a section.
+        duplicate = sensor.Camera('CameraRGB', PostProcessing='Depth')
+        duplicate.set_position(1.0, 2.0, 3.0)
+        settings.add_sensor(duplicate)
+        settings.SynchronousMode = None
+        settings.SendNonPlayerAgentsInfo = None
+        self.assertEqual(str(settings), legacy_ini(settings))
+
+    def test_changes_invalidate_the_text(self):
+        settings = CarlaSettings()
+        camera = sensor.Camera('CameraRGB')
+        settings.add_sensor(camera)
+        text = str(settings)
+        self.assertIs(str(settings), text)
+        settings.set(WeatherId=3)
+        self.assertIn('WeatherId=3\n', str(settings))
+        camera.set_image_size(320, 240)
+        self.assertIn('ImageSizeX=320\n', str(settings))
+        camera.FOV = 110
+        self.assertIn('FOV=110\n', str(settings))
+        camera.FOV = 110.0
+        self.assertIn('FOV=110.0\n', str(settings))
+        self.assertEqual(str(settings), legacy_ini(settings))
+        copy = pickle.loads(pickle.dumps(settings))
+        self.assertEqual(str(copy), str(settings))
+
+    def test_schema(self):
+        settings = CarlaSettings(WeatherId=numpy.int64(3), QualityLevel='Low')
+        camera = sensor.Camera('CameraRGB', FOV=100, ImageSizeX=numpy.uint16(320))
+        lidar = sensor.Lidar('Lidar32', Range=80, ShowDebugPoints=True)
+        for obj in (settings, camera, lidar):
+            self.assertFalse(hasattr(obj, '__dict__'))
+            self.assertRaises(AttributeError, setattr, obj, 'Unknown', 1)
+        self.assertEqual(settings.PlayerVehicle, None)
+        self.assertEqual((camera.PostProcessing, camera.FOV, camera.PositionZ), ('SceneFinal', 100, 1.3))
+        self.assertEqual((lidar.Channels, lidar.Range), (32, 80))
+        self.assertRaises(ValueError, settings.set, Unknown=1)
+        self.assertRaises(TypeError, settings.set, NumberOfVehicles=2.5)
+        self.assertRaises(TypeError, settings.set, NumberOfVehicles=True)
+        self.assertRaises(TypeError, settings.set, SynchronousMode=1)
+        self.assertRaises(TypeError, settings.set, QualityLevel=3)
+        self.assertRaises(TypeError, camera.set, FOV='90')
+        self.assertRaises(TypeError, lidar.set, Channels=32.0)
+        self.assertRaises(TypeError, CarlaSettings, WeatherId='3')
+        self.assertRaises(TypeError, sensor.Camera, 'CameraRGB', FOV='90')
+        settings.set(SeedVehicles=None)
+        settings.add_sensor(camera)
+        settings.add_sensor(lidar)
+        copy = pickle.loads(pickle.dumps(settings))
+        self.assertEqual(str(copy), str(settings))
+        self.assertEqual(str(copy), legacy_ini(settings))
+
+    def test_declared_class(self):
+
+        class Radar(sensor.Sensor):
+            _FIELDS = sensor.Sensor._FIELDS + (
+                schema.Field('Range', schema.REAL, 100.0, schema.SENSOR),
+                schema.Field('Debug', schema.BOOL, False, None))
+
+        self.assertEqual(Radar.__slots__, ('Range', 'Debug'))
+        self.assertEqual(sorted(Radar._FIELD_INDEX), sorted(field.name for field in Radar._FIELDS))
+        self.assertEqual(Radar._INI_KEYS, tuple(sorted(set(Radar._FIELD_INDEX) - set(['Debug']))))
+        radar = Radar('Radar', 'RADAR')
+        self.assertFalse(hasattr(radar, '__dict__'))
+        self.assertEqual((radar.Range, radar.Debug, radar.PositionZ), (100.0, False, 1.3))
+        self.assertRaises(TypeError, radar.set, Range='far')
+        self.assertEqual(CarlaSettings._INI_KEYS[:2], ('SynchronousMode', 'SendNonPlayerAgentsInfo'))
+        self.assertNotIn('PlayerVehicle', CarlaSettings._INI_KEYS)
@@ -0,0 +1,235 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+
+from carla import tcp
+from carla.tcp import BufferPool
+from carla.tcp import TCPClient
+from carla.tcp import TCPConnectionError
+
+
+def serve_messages(messages, chunk_size=4096):
+    """
+    Start a server that accepts one connection and sends every message
+    framed with its int32 size, in small chunks. Return the port.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def run():
+        connection, _ = server.accept()
+        for message in messages:
+            data = struct.pack('<L', len(message)) + message
+            for index in range(0, len(data), chunk_size):
+                connection.sendall(data[index:index + chunk_size])
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+
+def receive_messages(count, received):
+    """
+    Start a server that accepts one connection and appends to received the
+    "count" messages read from it. Return the port and the server thread.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def recv_n(connection, length):
+        buf = bytearray()
+        while len(buf) < length:
+            data = connection.recv(length - len(buf))
+            if not data:
+                raise socket.error('connection closed')
+            buf += data
+        return bytes(buf)
+
+    def run():
+        connection, _ = server.accept()
+        for _ in range(count):
+            length = struct.unpack('<L', recv_n(connection, 4))[0]
+            received.append(recv_n(connection, length))
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1], thread
+
+
+class testTCPClient(unittest.TestCase):
+
+    def _test_write(self, **kwargs):
+        messages = [b'ctrl', b'', bytes(bytearray(range(256))) * 20000, memoryview(b'view')]
+        received = []
+        port, thread = receive_messages(len(messages), received)
+        client = TCPClient('127.0.0.1', port, timeout=5, **kwargs)
+        client.connect()
+        for message in messages:
+            client.write(message)
+        thread.join(5)
+        client.disconnect()
+        self.assertEqual(received, [bytes(x) for x in messages])
+
+    def test_write(self):
+        self._test_write()
+
+    def test_write_without_sendmsg(self):
+        has_sendmsg = tcp._HAS_SENDMSG
+        tcp._HAS_SENDMSG = False
+        try:
+            self._test_write()
+        finally:
+            tcp._HAS_SENDMSG = has_sendmsg
+
+    def test_write_low_latency(self):
+        # A small send buffer forces partial scatter/gather writes.
+        self._test_write(low_latency=True, send_buffer_size=4096)
+
+    def test_low_latency_socket_options(self):
+        port, thread = receive_messages(0, [])
+        client = TCPClient('127.0.0.1', port, timeout=5, low_latency=True, receive_buffer_size=1 << 16)
+        client.connect()
+        sock = client._socket
+        self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+        self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 1 << 16)
+        client.disconnect()
+        thread.join(5)
+
+    def test_socket_options_set_before_connecting(self):
+        calls = []
+
+        class RecordingSocket(socket.socket):
+
+            def setsockopt(self, *args):
+                calls.append('setsockopt')
+                return super(RecordingSocket, self).setsockopt(*args)
+
+            def connect(self, address):
+                calls.append('connect')
+                return super(RecordingSocket, self).connect(address)
+
+        port, thread = receive_messages(0, [])
+        client = TCPClient('127.0.0.1', port, timeout=5, low_latency=True, receive_buffer_size=1 << 16)
+        original = tcp.socket.socket
+        tcp.socket.socket = RecordingSocket
+        try:
+            client.connect()
+        finally:
+            tcp.socket.socket = original
+        self.assertEqual(calls, ['setsockopt', 'setsockopt', 'connect'])
+        client.disconnect()
+        thread.join(5)
+
+        # The buffer sizes are left to the system unless asked for.
+        del calls[:]
+        port, thread = receive_messages(0, [])
+        client = TCPClient('127.0.0.1', port, timeout=5)
+        tcp.socket.socket = RecordingSocket
+        try:
+            client.connect()
+        finally:
+            tcp.socket.socket = original
+        self.assertEqual(calls, ['connect'])
+        client.disconnect()
+        thread.join(5)
+
+    def test_disconnect_while_reading(self):
+        client = TCPClient('127.0.0.1', 0, timeout=5)
+
+        class DisconnectedSocket(object):
+            """Receives part of a message, then the client gets disconnected."""
+
+            def recv_into(self, view):
+                client._socket = None
+                view[:2] = b'\x01\x00'
+                return 2
+
+        client._socket = DisconnectedSocket()
+        self.assertRaises(TCPConnectionError, client.read)
+
+    def test_connect_deadline(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        # Bound but not listening, connections are refused.
+        client = TCPClient('127.0.0.1', port, timeout=5)
+        start = time.time()
+        self.assertRaises(
+            TCPConnectionError, client.connect,
+            connection_attempts=1000, retry_delay=0.001, max_retry_delay=0.05, deadline=0.3)
+        self.assertLess(time.time() - start, 1.0)
+        sock.close()
+
+    def test_connect_backoff(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        timer = threading.Timer(0.1, sock.listen, args=(1,))
+        timer.start()
+        client = TCPClient('127.0.0.1', port, timeout=5)
+        start = time.time()
+        client.connect(connection_attempts=1000, retry_delay=0.001, max_retry_delay=0.05, deadline=5)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertTrue(client.connected())
+        client.disconnect()
+        timer.join()
+        sock.close()
+
+    def test_read(self):
+        messages = [b'', b'abc', bytes(bytearray(range(256))) * 1000]
+        client = TCPClient('127.0.0.1', serve_messages(messages), timeout=5)
+        client.connect()
+        for message in messages:
+            data = client.read()
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(data, message)
+        self.assertRaises(TCPConnectionError, client.read)
+        client.disconnect()
+
+    def test_read_view(self):
+        messages = [b'x' * 10, b'y' * 300000, b'z' * 10]
+        client = TCPClient('127.0.0.1', serve_messages(messages), timeout=5)
+        client.connect()
+        views = [client.read_view() for _ in messages]
+        for view, message in zip(views, messages):
+            self.assertIsInstance(view, memoryview)
+            self.assertEqual(view.tobytes(), message)
+        client.disconnect()
+
+    def test_read_view_with_buffer_pool(self):
+        frame = [b'm' * 100, b'i' * 200000, b'']
+        pool = BufferPool()
+        client = TCPClient('127.0.0.1', serve_messages(frame * 5), timeout=5, buffer_pool=pool)
+        client.connect()
+        for _ in range(5):
+            client.recycle_buffers()
+            for message in frame:
+                self.assertEqual(client.read_view().tobytes(), message)
+        client.disconnect()
+        # Buffers are allocated on the first frame only.
+        self.assertEqual(pool.allocations, len(frame))
+
+    def test_buffer_pool_best_fit(self):
+        pool = BufferPool()
+        small = pool.acquire(10)
+        large = pool.acquire(100000)
+        self.assertGreaterEqual(len(large), 100000)
+        pool.release(large)
+        pool.release(small)
+        self.assertIs(pool.acquire(5), small)
+        self.assertIs(pool.acquire(50000), large)
+        self.assertEqual(pool.allocations, 2)
+        pool.release(small)
+        self.assertGreaterEqual(len(pool.acquire(200000)), 200000)
+        self.assertEqual(pool.allocations, 3)
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy
+
+from carla import carla_server_pb2 as carla_protocol
+from carla import sensor
+from carla import transform
+from carla.transform import Rotation, Scale, Transform, Translation
+
+
+class testTransform(unittest.TestCase):
+
+    def test_single_transform(self):
+        t = Transform(Translation(1.0, 2.0, 3.0), Rotation(yaw=90.0))
+        self.assertIs(type(t.matrix), numpy.ndarray)
+        points = numpy.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+        numpy.testing.assert_allclose(t.transform_points(points), [[1.0, 3.0, 3.0], [0.0, 2.0, 3.0]], atol=1e-12)
+        numpy.testing.assert_allclose((t * t.inverse()).matrix, numpy.identity(4), atol=1e-12)
+        out = points.copy()
+        self.assertIs(t.transform_points(out, out=out), out)
+        numpy.testing.assert_allclose(out, t.transform_points(points))
+
+    def test_batched_matrices_match_single(self):
+        rng = numpy.random.RandomState(0)
+        translations = rng.uniform(-10.0, 10.0, (5, 3))
+        rotations = rng.uniform(-180.0, 180.0, (5, 3))
+        scales = rng.uniform(-2.0, 2.0, (5, 3))
+        matrices = transform.transform_matrices(translations, rotations, scales)
+        self.assertEqual(matrices.shape, (5, 4, 4))
+        for matrix, t, r, s in zip(matrices, translations, rotations, scales):
+            single = Transform(Translation(*t), Rotation(*r), Scale(*s))
+            numpy.testing.assert_allclose(matrix, single.matrix, atol=1e-12)
+        numpy.testing.assert_allclose(
+            transform.transform_matrices(translation=translations)[:, :3, :3], numpy.tile(numpy.identity(3), (5, 1, 1)))
+
+    def test_compose_and_apply(self):
+        rng = numpy.random.RandomState(1)
+        first = transform.transform_matrices(rng.uniform(-5.0, 5.0, (4, 3)), rng.uniform(-90.0, 90.0, (4, 3)))
+        second = transform.transform_matrices([1.0, 0.0, 0.0], [0.0, 90.0, 0.0], [-1.0, 1.0, 1.0])
+        composed = transform.compose(first, second)
+        points = rng.uniform(-1.0, 1.0, (4, 6, 3))
+        result = transform.apply_transforms(composed, points)
+        for index in range(4):
+            expected = Transform(matrix=first[index]).transform_points(
+                Transform(matrix=second[0]).transform_points(points[index]))
+            numpy.testing.assert_allclose(result[index], expected, atol=1e-12)
+
+    def test_rigid_inverse(self):
+        t = Transform(Translation(1.0, -2.0, 0.5), Rotation(10.0, 20.0, 30.0), Scale(x=-1.0))
+        numpy.testing.assert_allclose(t.rigid_inverse().matrix, t.inverse().matrix, atol=1e-12)
+        matrices = transform.transform_matrices(
+            numpy.random.RandomState(2).uniform(-5.0, 5.0, (3, 3)), [[0.0, 45.0, 0.0]])
+        inverses = transform.rigid_inverses(matrices)
+        numpy.testing.assert_allclose(transform.compose(matrices, inverses), numpy.tile(numpy.identity(4), (3, 1, 1)),
+                                      atol=1e-12)
+        transform.rigid_inverses(matrices, out=matrices)
+        numpy.testing.assert_array_equal(matrices, inverses)
+
+
+class testSensorToWorld(unittest.TestCase):
+
+    def test_unreal_transform_cache(self):
+        camera = sensor.Camera('CameraRGB')
+        first = camera.get_unreal_transform()
+        expected = camera.get_transform() * Transform(Rotation(roll=-90, yaw=90), Scale(x=-1))
+        numpy.testing.assert_array_equal(first.matrix, expected.matrix)
+        first.matrix[0, 3] = 100.0
+        numpy.testing.assert_array_equal(camera.get_unreal_transform().matrix, expected.matrix)
+        camera.set_position(1.0, 2.0, 3.0)
+        self.assertEqual(camera.get_unreal_transform().matrix[:3, 3].tolist(), [1.0, 2.0, 3.0])
+        camera.set(RotationYaw=90.0)
+        numpy.testing.assert_allclose(
+            camera.get_unreal_transform().matrix,
+            (camera.get_transform() * Transform(Rotation(roll=-90, yaw=90), Scale(x=-1))).matrix)
+
+    def test_transform_points(self):
+        camera = sensor.Camera('CameraDepth')
+        camera.set_position(0.3, 0.0, 1.3)
+        player = carla_protocol.Transform()
+        player.location.x = 10.0
+        player.rotation.yaw = 30.0
+        points = numpy.random.RandomState(3).uniform(-10.0, 10.0, (20, 3))
+        expected = (Transform(player) * camera.get_unreal_transform()).transform_points(points)
+        to_world = sensor.SensorToWorld(camera)
+        numpy.testing.assert_allclose(to_world.transform_points(player, points), expected, atol=1e-12)
+        to_world.transform_points(Transform(player), points, out=points)
+        numpy.testing.assert_allclose(points, expected, atol=1e-12)
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy
+
+from carla import sensor
+from carla import voxel_grid
+from carla.transform import Transform, Translation
+
+
+class testDownsample(unittest.TestCase):
+
+    def setUp(self):
+        self._points = numpy.array([
+            [0.1, 0.1, 0.1], [0.3, 0.2, 0.4], [1.5, 0.0, 0.0], [-0.2, 0.0, 0.0], [0.9, 0.9, 0.9]])
+        self._colors = numpy.array([
+            [10, 20, 30], [20, 40, 61], [1, 2, 3], [4, 5, 6], [0, 0, 0]], dtype=numpy.uint8)
+
+    def test_keys(self):
+        keys = voxel_grid.voxel_keys(self._points, 1.0)
+        self.assertEqual(len(set(keys.tolist())), 3)
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[4])
+        far = voxel_grid.voxel_keys(numpy.array([[-1e4, 1e4, -3.0], [1e4, -1e4, -3.0]]), 0.1)
+        self.assertNotEqual(far[0], far[1])
+
+    def test_mean(self):
+        points, colors = voxel_grid.downsample(self._points, 1.0, voxel_grid.MEAN, self._colors)
+        # Sorted by voxel: x = -1, 0, 1.
+        numpy.testing.assert_allclose(points, [[-0.2, 0.0, 0.0], [1.3 / 3, 1.2 / 3, 1.4 / 3], [1.5, 0.0, 0.0]])
+        self.assertEqual(colors.tolist(), [[4, 5, 6], [10, 20, 30], [1, 2, 3]])
+
+    def test_first(self):
+        point_cloud = sensor.PointCloud(3, self._points, self._colors).voxel_downsample(1.0, voxel_grid.FIRST)
+        self.assertEqual(point_cloud.frame_number, 3)
+        numpy.testing.assert_array_equal(point_cloud.array, self._points[[3, 0, 2]])
+        numpy.testing.assert_array_equal(point_cloud.color_array, self._colors[[3, 0, 2]])
+
+
+class testVoxelMap(unittest.TestCase):
+
+    def test_accumulate(self):
+        voxel_map = voxel_grid.VoxelMap(voxel_size=1.0)
+        voxel_map.add(sensor.PointCloud(0, numpy.array([[0.25, 0.5, 0.5], [2.5, 0.5, 0.5]])))
+        # The same points seen from one meter forward.
+        voxel_map.add(
+            sensor.PointCloud(1, numpy.array([[-0.25, 0.5, 0.5], [1.5, 0.5, 0.5]])),
+            Transform(Translation(1.0, 0.0, 0.0)))
+        self.assertEqual(len(voxel_map), 2)
+        numpy.testing.assert_allclose(voxel_map.points, [[0.5, 0.5, 0.5], [2.5, 0.5, 0.5]])
+        self.assertIsNone(voxel_map.colors)
+
+    def test_matches_downsample(self):
+        random = numpy.random.RandomState(0)
+        clouds = [random.uniform(-5.0, 5.0, (200, 3)) for _ in range(4)]
+        colors = [random.randint(0, 256, (200, 3)).astype(numpy.uint8) for _ in range(4)]
+        voxel_map = voxel_grid.VoxelMap(voxel_size=1.0)
+        for points, color in zip(clouds, colors):
+            voxel_map.add(sensor.PointCloud(0, points, color))
+        points, color = voxel_grid.downsample(numpy.concatenate(clouds), 1.0, colors=numpy.concatenate(colors))
+        numpy.testing.assert_allclose(voxel_map.points, points)
+        numpy.testing.assert_array_equal(voxel_map.colors, color)
+        self.assertEqual(len(voxel_map.to_point_cloud()), len(points))
+
+    def test_eviction(self):
+        voxel_map = voxel_grid.VoxelMap(voxel_size=1.0, max_age=2)
+        for x in range(4):
+            voxel_map.add(sensor.PointCloud(0, numpy.array([[x + 0.5, 0.5, 0.5]])))
+        numpy.testing.assert_allclose(voxel_map.points[:, 0], [2.5, 3.5])
+        voxel_map = voxel_grid.VoxelMap(voxel_size=1.0, max_voxels=3)
+        for x in range(5):
+            voxel_map.add(sensor.PointCloud(0, numpy.array([[x + 0.5, 0.5, 0.5]])))
+        numpy.testing.assert_allclose(voxel_map.points[:, 0], [2.5, 3.5, 4.5])